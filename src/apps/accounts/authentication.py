@@ -0,0 +1,218 @@
+"""
+JWT authentication with an in-process cache.
+
+`CachedJWTAuthentication` keeps verified access tokens until they expire
+and user rows for `JWT_AUTH_USER_CACHE_TTL` seconds, so a repeat request
+skips both signature verification and the user query. Saving or deleting
+a user (see `signals.py`) drops its cached row here and stamps the user as
+changed in the Django cache. Every process compares that stamp with the
+one its cached row was loaded under, at the cost of one cache lookup.
+With a shared cache (`REDIS_URL`) the change is seen everywhere on the
+next request; under local memory only the saving process sees the stamp,
+and the others see the change once their row expires.
+
+With `JWT_AUTH_CLAIMS_ONLY_READS`, safe-method requests get a `ClaimsUser`
+built from the token instead of a row. It trusts the token for its
+lifetime, except for users stamped as changed since, so it only applies
+when the cache is shared.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.utils.caches import is_shared_cache
+from core.utils.metrics import record_cache
+
+from .utils.tokens import is_revoked
+
+DEFAULT_JWT_AUTH_CACHE_SIZE = 10000
+DEFAULT_JWT_AUTH_USER_CACHE_TTL = 60
+DEFAULT_JWT_AUTH_CLAIMS_ONLY_READS = False
+
+
+class TTLCache:
+    """Thread-safe LRU whose entries also expire after a per-entry TTL"""
+
+    def __init__(self, maxsize=DEFAULT_JWT_AUTH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache_size = getattr(settings, "JWT_AUTH_CACHE_SIZE", DEFAULT_JWT_AUTH_CACHE_SIZE)
+# Verified access tokens by their encoded form
+token_cache = TTLCache(_cache_size)
+# (user row, changed stamp it was loaded under) by token user id claim
+user_cache = TTLCache(_cache_size)
+
+
+def _user_key(user_id):
+    return str(user_id)
+
+
+def _changed_key(key):
+    return f"accounts:user:changed:{key}"
+
+
+def _user_cache_ttl():
+    return getattr(settings, "JWT_AUTH_USER_CACHE_TTL", DEFAULT_JWT_AUTH_USER_CACHE_TTL)
+
+
+def invalidate_user(user):
+    """Forget the cached row of `user` and stop trusting its token claims"""
+    key = _user_key(getattr(user, api_settings.USER_ID_FIELD))
+    user_cache.pop(key)
+    # Kept while tokens issued before the change and rows cached before it
+    # may still be around
+    timeout = max(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(), _user_cache_ttl())
+    cache.set(_changed_key(key), time.time_ns(), timeout=int(timeout))
+
+
+def load_user(user_id):
+    """
+    The user row for a token user id claim, from the cache while fresh and
+    not changed since. Raises `DoesNotExist`. The caller gets its own copy,
+    which it may change.
+    """
+    key = _user_key(user_id)
+    # Read before the row, so a change in between only forces a reload
+    changed = cache.get(_changed_key(key))
+    entry = user_cache.get(key)
+    if entry is not None and entry[1] != changed:
+        entry = None
+    record_cache("jwt_user", entry is not None)
+    if entry is None:
+        user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        user_cache.set(key, (user, changed), _user_cache_ttl())
+    else:
+        user = entry[0]
+    return copy.copy(user)
+
+
+def clear_caches():
+    """Empty this process's caches; changed stamps live in the shared cache"""
+    token_cache.clear()
+    user_cache.clear()
+
+
+class ClaimsUser(TokenUser):
+    """
+    User built from token claims, without a database query. Its `id` has
+    the type of the user model's id field, so ownership checks like
+    `obj.owner_id == request.user.id` work unchanged.
+    """
+
+    @cached_property
+    def id(self):
+        field = get_user_model()._meta.get_field(api_settings.USER_ID_FIELD)
+        return field.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """`JWTAuthentication` backed by the token and user caches"""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if is_revoked(validated_token):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        claims_only = getattr(
+            settings, "JWT_AUTH_CLAIMS_ONLY_READS", DEFAULT_JWT_AUTH_CLAIMS_ONLY_READS
+        )
+        # Other processes' change stamps are only visible in a shared cache
+        if claims_only and request.method in SAFE_METHODS and is_shared_cache():
+            user_id = self._get_user_id(validated_token)
+            if cache.get(_changed_key(_user_key(user_id))) is None:
+                return ClaimsUser(validated_token), validated_token
+
+        return self.get_user(validated_token), validated_token
+
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        record_cache("jwt_token", token is not None)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            token_cache.set(raw_token, token, token["exp"] - time.time())
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user = load_user(self._get_user_id(validated_token))
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        self._check_user(user, validated_token)
+        return user
+
+    def _get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                "Token contained no recognizable user identification"
+            ) from e
+
+    def _check_user(self, user, validated_token):
+        """The checks `JWTAuthentication.get_user` runs on the row"""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    "The user's password has been changed.", code="password_changed"
+                )
@@ -0,0 +1,134 @@
+"""
+Password hashing off the request workers.
+
+A password hash takes tens to hundreds of milliseconds of CPU by design,
+so during a login storm request workers spend their time hashing instead
+of serving reads. `make_password` and `check_password` run the hash in a
+pool of `PASSWORD_HASHING_WORKERS` processes instead (0 hashes in the
+calling thread), which caps the CPU hashing can take. At most
+`PASSWORD_HASHING_MAX_PENDING` hashes may be queued or running; past that
+they fail fast with `HashingUnavailable`, which
+`config.exceptions.exception_handler` and `HashingUnavailableMiddleware`
+turn into a 503 with Retry-After instead of a growing backlog.
+
+Both the pool and the pending bound are per server process: with N
+gunicorn workers, up to N * PASSWORD_HASHING_WORKERS hashes run at once
+and N * PASSWORD_HASHING_MAX_PENDING may be pending.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PASSWORD_HASHING_WORKERS = 0
+DEFAULT_PASSWORD_HASHING_MAX_PENDING = 8
+DEFAULT_PASSWORD_HASHING_RETRY_AFTER = 1
+
+UNAVAILABLE_MESSAGE = "Too many sign-ins in progress, please retry shortly"
+
+
+class HashingUnavailable(Exception):
+    """Raised instead of hashing while too many hashes are pending"""
+
+    def __init__(self, retry_after):
+        super().__init__("Too many password hashes pending")
+        self.retry_after = retry_after
+
+
+_lock = threading.Lock()
+_pending = 0
+_pool = None
+_pool_pid = None
+
+
+def _init_worker(password_hashers):
+    # Only the hashers are needed, so skip loading the project settings
+    if not settings.configured:
+        settings.configure(PASSWORD_HASHERS=password_hashers)
+
+
+def _get_pool(workers):
+    global _pool, _pool_pid
+    with _lock:
+        # A pool inherited through fork has no live workers
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(settings.PASSWORD_HASHERS,),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    """Stop the worker processes; the next hash starts a new pool"""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _run(func, *args):
+    global _pending
+    max_pending = getattr(
+        settings, "PASSWORD_HASHING_MAX_PENDING", DEFAULT_PASSWORD_HASHING_MAX_PENDING
+    )
+    retry_after = getattr(
+        settings, "PASSWORD_HASHING_RETRY_AFTER", DEFAULT_PASSWORD_HASHING_RETRY_AFTER
+    )
+    with _lock:
+        if _pending >= max_pending:
+            raise HashingUnavailable(retry_after)
+        _pending += 1
+    try:
+        workers = getattr(
+            settings, "PASSWORD_HASHING_WORKERS", DEFAULT_PASSWORD_HASHING_WORKERS
+        )
+        if not workers:
+            return func(*args)
+        pool = _get_pool(workers)
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM killed): start over on the next call
+            logger.error(f"Password hashing pool broke: {e}")
+            _discard_pool(pool)
+            raise HashingUnavailable(retry_after) from e
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def make_password(password):
+    """`hashers.make_password` in the hashing pool"""
+    if password is None:
+        # Unusable passwords aren't hashed
+        return hashers.make_password(None)
+    return _run(hashers.make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    """`hashers.check_password` in the hashing pool; `setter` runs here"""
+    is_correct, must_update = _run(hashers.verify_password, password, encoded)
+    if setter and is_correct and must_update:
+        setter(password)
+    return is_correct
@@ -0,0 +1,19 @@
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .hashing import UNAVAILABLE_MESSAGE, HashingUnavailable
+
+
+class HashingUnavailableMiddleware(MiddlewareMixin):
+    """
+    Answer 503 with Retry-After when a non-DRF view, e.g. the admin sign-in,
+    hits a saturated password hashing pool. DRF views are covered by
+    `config.exceptions.exception_handler`.
+    """
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingUnavailable):
+            return None
+        response = JsonResponse({"error": UNAVAILABLE_MESSAGE}, status=503)
+        response["Retry-After"] = str(exception.retry_after)
+        return response
@@ -1,6 +1,56 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.db import models
+
+from . import hashing
 
 
 class User(AbstractUser):
     def __str__(self):
         return self.username
+
+    # Hash in the hashing pool; see `hashing.py`
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return hashing.check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        return await sync_to_async(self.check_password)(raw_password)
+
+
+class RefreshTokenFamily(models.Model):
+    """
+    One login session: the chain of refresh tokens rotated from the token
+    issued at login. Only `current_jti` may be refreshed; presenting an
+    older token of the family is reuse and revokes the whole family.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="token_families",
+    )
+    current_jti = models.CharField(max_length=64)
+    # Accepted for REFRESH_TOKEN_REUSE_GRACE seconds after rotating, so
+    # concurrent refreshes from two tabs don't look like reuse
+    previous_jti = models.CharField(max_length=64, blank=True, default="")
+    rotated_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id}:{self.id}"
@@ -29,8 +29,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
 
     def create(self, validated_data):
+        # What create_user does, with the one hash going through the
+        # hashing pool and a single INSERT
         password = validated_data.pop("password")
-        user = User.objects.create_user(**validated_data)
+        user = User(**validated_data)
+        user.clean()
         user.set_password(password)
         user.save()
         return user
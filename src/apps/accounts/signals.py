@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User, dispatch_uid="accounts_invalidate_on_save")
+@receiver(post_delete, sender=User, dispatch_uid="accounts_invalidate_on_delete")
+def invalidate_cached_user(sender, instance, created=False, **kwargs):
+    """Drop the cached row of a changed user (deactivation, password change)"""
+    # A new user has no tokens or cached row yet
+    if not created:
+        invalidate_user(instance)
@@ -1 +1,379 @@
-# Create your tests here.
+import os
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model, hashers
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import hashing
+from .authentication import (
+    CachedJWTAuthentication,
+    ClaimsUser,
+    TTLCache,
+    clear_caches,
+    load_user,
+    token_cache,
+    user_cache,
+)
+from .models import RefreshTokenFamily
+from .utils.tokens import FAMILY_CLAIM, revoked_families
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    """Test the cached JWT authentication class"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="cook", password="secret-pass")
+
+    def setUp(self):
+        clear_caches()
+        cache.clear()
+        self.addCleanup(clear_caches)
+        self.token = str(AccessToken.for_user(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def _authenticate(self, method="get"):
+        request = getattr(APIRequestFactory(), method)(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        return CachedJWTAuthentication().authenticate(Request(request))
+
+    def test_repeat_requests_skip_verification_and_query(self):
+        """Test that the token is verified and the user fetched only once"""
+        with self.assertNumQueries(1):
+            self.client.post(reverse("core:accounts:logout"))
+
+        with mock.patch(
+            "rest_framework_simplejwt.authentication.JWTAuthentication"
+            ".get_validated_token"
+        ) as verify:
+            with self.assertNumQueries(0):
+                response = self.client.post(reverse("core:accounts:logout"))
+
+        self.assertEqual(response.status_code, 200)
+        verify.assert_not_called()
+        self.assertEqual(len(token_cache), 1)
+
+    def test_deactivation_is_picked_up(self):
+        """Test that a deactivated user is rejected despite the cache"""
+        self.client.post(reverse("core:accounts:logout"))
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post(reverse("core:accounts:logout"))
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_change_drops_cached_row(self):
+        """Test that a password change reloads the user from the database"""
+        self._authenticate()
+
+        self.user.set_password("new-secret-pass")
+        self.user.save()
+        with self.assertNumQueries(1):
+            user, _ = self._authenticate()
+
+        self.assertEqual(user.password, self.user.password)
+
+    def test_change_in_another_process_drops_cached_row(self):
+        """Test that a change saved elsewhere is seen through the shared stamp"""
+        self._authenticate()
+
+        # The saving process only drops its own row
+        with mock.patch.object(user_cache, "pop"):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_revoked_token_is_rejected_from_cache(self):
+        """Test that CHECK_REVOKE_TOKEN also applies to cached rows"""
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            self.token = str(AccessToken.for_user(self.user))
+            self._authenticate()
+
+            # Issued before a password change the row already reflects
+            token = AccessToken.for_user(self.user)
+            token[api_settings.REVOKE_TOKEN_CLAIM] = "old-password-hash"
+            self.token = str(token)
+            with self.assertNumQueries(0):
+                with self.assertRaises(AuthenticationFailed):
+                    self._authenticate()
+
+    @override_settings(JWT_AUTH_CLAIMS_ONLY_READS=True)
+    @mock.patch("apps.accounts.authentication.is_shared_cache", return_value=True)
+    def test_claims_only_reads(self, _):
+        """Test that reads use token claims and writes load the user"""
+        with self.assertNumQueries(0):
+            user, _ = self._authenticate("get")
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(user.id, self.user.pk)
+        self.assertTrue(user.is_authenticated)
+
+        with self.assertNumQueries(1):
+            user, _ = self._authenticate("post")
+        self.assertIsInstance(user, User)
+
+    @override_settings(JWT_AUTH_CLAIMS_ONLY_READS=True)
+    @mock.patch("apps.accounts.authentication.is_shared_cache", return_value=True)
+    def test_claims_only_stops_for_changed_users(self, _):
+        """Test that a changed user's reads are checked against the database"""
+        # Changed in another process: only the shared stamp is visible here
+        with mock.patch.object(user_cache, "pop"):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate("get")
+
+    @override_settings(JWT_AUTH_CLAIMS_ONLY_READS=True)
+    def test_claims_only_needs_shared_cache(self):
+        """Test that reads load the user when the cache is process-local"""
+        with self.assertNumQueries(1):
+            user, _ = self._authenticate("get")
+
+        self.assertIsInstance(user, User)
+
+
+class TTLCacheTestCase(SimpleTestCase):
+    """Test the bounded expiring cache"""
+
+    def test_entries_expire(self):
+        """Test that an entry is gone once its TTL has passed"""
+        cache = TTLCache(maxsize=10)
+        with mock.patch("apps.accounts.authentication.time.monotonic") as now:
+            now.return_value = 100
+            cache.set("a", 1, ttl=5)
+            cache.set("b", 2, ttl=0)
+            now.return_value = 104
+            self.assertEqual(cache.get("a"), 1)
+            now.return_value = 105
+            self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+
+@override_settings(ROTATE_REFRESH_TOKENS=True, REFRESH_TOKEN_REUSE_GRACE=0)
+class RefreshTokenFamilyTestCase(APITestCase):
+    """Test refresh token rotation, revocation and reuse detection"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="baker", password="secret-pass")
+
+    def setUp(self):
+        clear_caches()
+        revoked_families.reset()
+        self.addCleanup(clear_caches)
+        self.addCleanup(revoked_families.reset)
+
+    def _login(self):
+        response = self.client.post(
+            reverse("core:accounts:login"),
+            {"username": "baker", "password": "secret-pass"},
+        )
+        return response.data["access"], response.cookies["refresh_token"].value
+
+    def _refresh(self, refresh_token):
+        self.client.cookies["refresh_token"] = refresh_token
+        return self.client.post(reverse("core:accounts:token_refresh"))
+
+    def test_rotation_is_one_conditional_update(self):
+        """Test that a refresh rotates the token with a user query and an update"""
+        _, refresh_token = self._login()
+
+        with self.assertNumQueries(2):
+            response = self._refresh(refresh_token)
+
+        self.assertEqual(response.status_code, 200)
+        new_refresh_token = response.cookies["refresh_token"].value
+        self.assertNotEqual(new_refresh_token, refresh_token)
+        self.assertEqual(self._refresh(new_refresh_token).status_code, 200)
+
+    def test_refresh_rejects_inactive_user_without_cache(self):
+        """Test that refresh reads the user row instead of the cached one"""
+        _, refresh_token = self._login()
+        load_user(self.user.pk)
+        # update() sends no signal, so a cached row would still be active
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertEqual(self._refresh(refresh_token).status_code, 401)
+
+    def test_reuse_revokes_family(self):
+        """Test that replaying a rotated token revokes the whole family"""
+        _, refresh_token = self._login()
+        new_refresh_token = self._refresh(refresh_token).cookies["refresh_token"].value
+
+        with self.assertLogs("apps.accounts.utils.tokens", "WARNING"):
+            self.assertEqual(self._refresh(refresh_token).status_code, 401)
+
+        self.assertEqual(self._refresh(new_refresh_token).status_code, 401)
+        self.assertIsNotNone(RefreshTokenFamily.objects.get().revoked_at)
+
+    @override_settings(REFRESH_TOKEN_REUSE_GRACE=30)
+    def test_concurrent_refresh_within_grace(self):
+        """Test that a token rotated moments ago still gets an access token"""
+        _, refresh_token = self._login()
+        self._refresh(refresh_token)
+
+        response = self._refresh(refresh_token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+        self.assertNotIn("refresh_token", response.cookies)
+        self.assertIsNone(RefreshTokenFamily.objects.get().revoked_at)
+
+    def test_logout_revokes_refresh_token(self):
+        """Test that a refresh token stops working after logout"""
+        access_token, refresh_token = self._login()
+        other_access, other_refresh = self._login()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+        self.client.post(reverse("core:accounts:logout"))
+
+        self.assertEqual(self._refresh(refresh_token).status_code, 401)
+        # Other sessions of the same user are unaffected
+        self.assertEqual(self._refresh(other_refresh).status_code, 200)
+
+    def test_tokens_without_family_are_moved_into_one(self):
+        """Test that tokens issued before families existed still refresh"""
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        response = self._refresh(str(RefreshToken.for_user(self.user)))
+
+        self.assertEqual(response.status_code, 200)
+        family = RefreshTokenFamily.objects.get()
+        new_token = RefreshToken(response.cookies["refresh_token"].value)
+        self.assertEqual(new_token[FAMILY_CLAIM], family.id.hex)
+
+    @override_settings(REFRESH_TOKEN_REVOCATION_FILTER=True)
+    def test_revocation_filter_rejects_access_tokens(self):
+        """Test that logout also revokes the session's access tokens"""
+        access_token, _ = self._login()
+        other_access, _ = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+        self.assertEqual(
+            self.client.post(reverse("core:accounts:logout")).status_code, 200
+        )
+
+        self.assertEqual(
+            self.client.post(reverse("core:accounts:logout")).status_code, 401
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {other_access}")
+        # Not in the filter, so only the cached user is needed
+        with self.assertNumQueries(0):
+            self.client.get(reverse("core:health_check"))
+        self.assertEqual(
+            self.client.post(reverse("core:accounts:logout")).status_code, 200
+        )
+
+    def test_compaction_deletes_expired_families(self):
+        """Test that compaction keeps only families that can still be used"""
+        self._login()
+        self._login()
+        RefreshTokenFamily.objects.filter(
+            pk=RefreshTokenFamily.objects.first().pk
+        ).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        call_command("compact_token_families", stdout=mock.Mock())
+
+        self.assertEqual(RefreshTokenFamily.objects.count(), 1)
+
+
+class PasswordHashingTestCase(APITestCase):
+    """Test password hashing in the hashing pool"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="grill", password="secret-pass")
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.addClassCleanup(hashing.shutdown)
+
+    def test_hashes_run_in_worker_processes(self):
+        """Test that hashes are computed outside this process"""
+        with self.settings(PASSWORD_HASHING_WORKERS=1):
+            self.assertNotEqual(hashing._run(os.getpid), os.getpid())
+
+            response = self.client.post(
+                reverse("core:accounts:login"),
+                {"username": "grill", "password": "secret-pass"},
+            )
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(PASSWORD_HASHING_WORKERS=0)
+    def test_register_hashes_once_and_writes_once(self):
+        """Test that registration hashes the password once and saves once"""
+        with mock.patch.object(
+            hashers, "make_password", wraps=hashers.make_password
+        ) as make_password:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse("core:accounts:register"),
+                    {"username": "new-cook", "password": "secret-pass"},
+                )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(make_password.call_count, 1)
+        user_writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if '"accounts_user"' in query["sql"]
+            and query["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        self.assertEqual(len(user_writes), 1)
+        self.assertTrue(
+            User.objects.get(username="new-cook").check_password("secret-pass")
+        )
+
+    @override_settings(PASSWORD_HASHING_MAX_PENDING=0, PASSWORD_HASHING_RETRY_AFTER=3)
+    def test_saturated_pool_answers_503(self):
+        """Test that logins are turned away while too many hashes are pending"""
+        response = self.client.post(
+            reverse("core:accounts:login"),
+            {"username": "grill", "password": "secret-pass"},
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+        self.assertEqual(hashing._pending, 0)
+
+    @override_settings(PASSWORD_HASHING_MAX_PENDING=0, PASSWORD_HASHING_RETRY_AFTER=3)
+    def test_saturated_pool_answers_503_outside_drf(self):
+        """Test that admin sign-in also gets a 503 instead of an error page"""
+        response = self.client.post(
+            reverse("admin:login"), {"username": "grill", "password": "secret-pass"}
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
@@ -3,12 +3,15 @@ from typing import Dict, Optional
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .tokens import issue_tokens
+
 User = get_user_model()
 
 
 def generate_tokens_for_user(user: User) -> Dict[str, str]:
     """
-    Generate JWT access and refresh tokens for a user.
+    Generate JWT access and refresh tokens for a user, starting a new
+    refresh token family.
 
     Args:
         user: User instance
@@ -16,7 +19,7 @@ def generate_tokens_for_user(user: User) -> Dict[str, str]:
     Returns:
         Dictionary containing access and refresh tokens
     """
-    refresh = RefreshToken.for_user(user)
+    refresh = issue_tokens(user)
     return {
         "access": str(refresh.access_token),
         "refresh": str(refresh),
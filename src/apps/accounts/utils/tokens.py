@@ -0,0 +1,230 @@
+"""
+Refresh token families.
+
+Each login starts a family, a `RefreshTokenFamily` row whose id is carried
+in the `fam` claim of its refresh and access tokens. The row records the
+one refresh token of the family that is currently valid, so a refresh is
+a single conditional UPDATE by primary key. If the update misses, the
+presented token was rotated, revoked or reused. Reuse of a rotated token
+means it leaked, so the whole family is revoked. Logout revokes the
+family too.
+
+Revoked family ids are also kept in a per-process Bloom filter. With
+`REFRESH_TOKEN_REVOCATION_FILTER`, authentication uses it to reject access
+tokens of revoked families at no cost for everyone else. It is rebuilt
+from the table every `REFRESH_TOKEN_REVOCATION_FILTER_REFRESH` seconds.
+`manage.py compact_token_families` deletes expired families.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from core.utils.bloom import BloomFilter
+
+from ..models import RefreshTokenFamily
+
+logger = logging.getLogger(__name__)
+
+FAMILY_CLAIM = "fam"
+DEFAULT_REFRESH_TOKEN_REUSE_GRACE = 10
+DEFAULT_REFRESH_TOKEN_REVOCATION_FILTER = False
+DEFAULT_REFRESH_TOKEN_REVOCATION_FILTER_CAPACITY = 100000
+DEFAULT_REFRESH_TOKEN_REVOCATION_FILTER_REFRESH = 60
+
+
+class TokenRevoked(TokenError):
+    """The token's family was revoked by logout or reuse detection"""
+
+
+class TokenReused(TokenError):
+    """A rotated refresh token was presented again"""
+
+
+def issue_tokens(user):
+    """Start a token family for `user` and return its first refresh token"""
+    refresh = RefreshToken.for_user(user)
+    family = uuid.uuid4()
+    refresh[FAMILY_CLAIM] = family.hex
+    RefreshTokenFamily.objects.create(
+        id=family,
+        user=user,
+        current_jti=refresh[api_settings.JTI_CLAIM],
+        expires_at=datetime_from_epoch(refresh["exp"]),
+    )
+    return refresh
+
+
+def refresh_tokens(refresh, user, rotate=False):
+    """
+    Return `(access, new_refresh)` for a verified refresh token, rotating
+    it when `rotate` is set; `new_refresh` is None when not rotated.
+    Raises `TokenRevoked` or `TokenReused` when the token can't be used.
+    """
+    family = refresh.get(FAMILY_CLAIM)
+    if family is None:
+        # Issued before families existed: move it into one when rotating
+        if rotate:
+            new_refresh = issue_tokens(user)
+            return new_refresh.access_token, new_refresh
+        return refresh.access_token, None
+
+    jti = refresh[api_settings.JTI_CLAIM]
+    live = RefreshTokenFamily.objects.filter(
+        pk=family, current_jti=jti, revoked_at__isnull=True
+    )
+    if not rotate:
+        if not live.exists():
+            _reject(family, jti)
+        return refresh.access_token, None
+
+    new_refresh = RefreshToken.for_user(user)
+    new_refresh[FAMILY_CLAIM] = family
+    if not live.update(
+        current_jti=new_refresh[api_settings.JTI_CLAIM],
+        previous_jti=jti,
+        rotated_at=timezone.now(),
+        expires_at=datetime_from_epoch(new_refresh["exp"]),
+    ):
+        _reject(family, jti)
+        # The client keeps the refresh token from the request that won
+        return refresh.access_token, None
+    return new_refresh.access_token, new_refresh
+
+
+def _reject(family, jti):
+    """
+    Raise for a refresh token that isn't its family's current one, unless
+    it was rotated in the last few seconds: that's a concurrent refresh,
+    e.g. from two tabs, and may still get an access token.
+    """
+    row = (
+        RefreshTokenFamily.objects.filter(pk=family)
+        .values("previous_jti", "rotated_at", "revoked_at")
+        .first()
+    )
+    if row is None or row["revoked_at"] is not None:
+        raise TokenRevoked("Token has been revoked")
+
+    grace = getattr(
+        settings, "REFRESH_TOKEN_REUSE_GRACE", DEFAULT_REFRESH_TOKEN_REUSE_GRACE
+    )
+    if jti == row["previous_jti"] and timezone.now() - row["rotated_at"] <= timedelta(
+        seconds=grace
+    ):
+        return
+
+    logger.warning(f"Refresh token reuse detected, revoking family {family}")
+    revoke_family(family)
+    raise TokenReused("Token has already been used")
+
+
+def revoke_family(family):
+    """Revoke every refresh and access token of a family"""
+    RefreshTokenFamily.objects.filter(pk=family, revoked_at__isnull=True).update(
+        revoked_at=timezone.now()
+    )
+    revoked_families.add(family)
+
+
+def revoke_token(raw_token):
+    """Revoke the family of an encoded refresh token, if it is valid"""
+    try:
+        family = RefreshToken(raw_token).get(FAMILY_CLAIM)
+    except TokenError:
+        return
+    if family is not None:
+        revoke_family(family)
+
+
+class RevokedFamilies:
+    """
+    Per-process Bloom filter of revoked family ids, rebuilt from the table
+    periodically so revocations in other processes are picked up. A hit is
+    confirmed against the table, so false positives only cost a query.
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self):
+        max_age = getattr(
+            settings,
+            "REFRESH_TOKEN_REVOCATION_FILTER_REFRESH",
+            DEFAULT_REFRESH_TOKEN_REVOCATION_FILTER_REFRESH,
+        )
+        if self._filter is None or time.monotonic() - self._built_at >= max_age:
+            with self._lock:
+                if self._filter is None or (
+                    time.monotonic() - self._built_at >= max_age
+                ):
+                    self._filter = self._build()
+                    self._built_at = time.monotonic()
+        return self._filter
+
+    def _build(self):
+        capacity = getattr(
+            settings,
+            "REFRESH_TOKEN_REVOCATION_FILTER_CAPACITY",
+            DEFAULT_REFRESH_TOKEN_REVOCATION_FILTER_CAPACITY,
+        )
+        revoked = RefreshTokenFamily.objects.filter(
+            revoked_at__isnull=False, expires_at__gt=timezone.now()
+        ).values_list("id", flat=True)
+        bloom = BloomFilter(capacity=capacity)
+        for family in revoked.iterator():
+            bloom.add(family.hex)
+        return bloom
+
+    def add(self, family):
+        if self._filter is not None:
+            self._filter.add(uuid.UUID(str(family)).hex)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+    def __contains__(self, family):
+        try:
+            family = uuid.UUID(str(family)).hex
+        except ValueError:
+            return True
+        if family not in self._current():
+            return False
+        return RefreshTokenFamily.objects.filter(
+            pk=family, revoked_at__isnull=False
+        ).exists()
+
+
+revoked_families = RevokedFamilies()
+
+
+def is_revoked(token):
+    """Whether a validated token belongs to a revoked family"""
+    if not getattr(
+        settings,
+        "REFRESH_TOKEN_REVOCATION_FILTER",
+        DEFAULT_REFRESH_TOKEN_REVOCATION_FILTER,
+    ):
+        return False
+    family = token.get(FAMILY_CLAIM)
+    return family is not None and family in revoked_families
+
+
+def compact_families(now=None):
+    """Delete expired families, whose tokens can no longer be used anyway"""
+    deleted, _ = RefreshTokenFamily.objects.filter(
+        expires_at__lte=now or timezone.now()
+    ).delete()
+    return deleted
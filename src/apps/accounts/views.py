@@ -7,6 +7,8 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from core.utils.profiling import ProfiledViewMixin
+
 from .serializers import (
     LoginSerializer,
     RegisterSerializer,
@@ -18,11 +20,12 @@ from .utils.cookies import (
     get_refresh_token_from_request,
     set_refresh_token_cookie,
 )
+from .utils.tokens import FAMILY_CLAIM, refresh_tokens, revoke_family, revoke_token
 
 User = get_user_model()
 
 
-class RegisterView(generics.CreateAPIView):
+class RegisterView(ProfiledViewMixin, generics.CreateAPIView):
     """User registration endpoint."""
 
     queryset = User.objects.all()
@@ -51,7 +54,7 @@ class RegisterView(generics.CreateAPIView):
         return response
 
 
-class LoginView(APIView):
+class LoginView(ProfiledViewMixin, APIView):
     """User login endpoint."""
 
     permission_classes = [AllowAny]
@@ -77,12 +80,20 @@ class LoginView(APIView):
         return response
 
 
-class LogoutView(APIView):
-    """Simple logout endpoint."""
+class LogoutView(ProfiledViewMixin, APIView):
+    """Logout endpoint: revokes the session's tokens and clears the cookie."""
 
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        family = request.auth.get(FAMILY_CLAIM) if request.auth else None
+        if family is not None:
+            revoke_family(family)
+        else:
+            refresh_token = get_refresh_token_from_request(request)
+            if refresh_token:
+                revoke_token(refresh_token)
+
         response = Response(
             {"message": "Logout successful"},
             status=status.HTTP_200_OK,
@@ -92,7 +103,7 @@ class LogoutView(APIView):
         return response
 
 
-class CustomTokenRefreshView(APIView):
+class CustomTokenRefreshView(ProfiledViewMixin, APIView):
     """Custom token refresh view that gets refresh token from httpOnly cookie."""
 
     permission_classes = [AllowAny]
@@ -108,25 +119,26 @@ class CustomTokenRefreshView(APIView):
             )
 
         try:
-            # Validate and refresh the token
+            # Validate the token, then check and rotate it in its family.
+            # The user is read fresh, not from the authentication cache, so
+            # a deactivation is honoured at once
             token = RefreshToken(refresh_token)
-            new_access_token = str(token.access_token)
+            user = User.objects.get(id=token.payload.get("user_id"))
+            if not user.is_active:
+                raise InvalidToken("User is inactive")
 
-            # Get user info
-            user_id = token.payload.get("user_id")
-            user = User.objects.get(id=user_id)
+            access_token, new_refresh_token = refresh_tokens(
+                token, user, rotate=getattr(settings, "ROTATE_REFRESH_TOKENS", False)
+            )
 
             response = Response(
                 {
-                    "access": new_access_token,
+                    "access": str(access_token),
                     "user": UserSerializer(user).data,
                 }
             )
-
-            # Optionally rotate the refresh token for better security
-            if getattr(settings, "ROTATE_REFRESH_TOKENS", False):
-                new_refresh_token = str(RefreshToken.for_user(user))
-                set_refresh_token_cookie(response, new_refresh_token)
+            if new_refresh_token is not None:
+                set_refresh_token_cookie(response, str(new_refresh_token))
 
             return response
 
@@ -0,0 +1,201 @@
+"""
+Async read path for recipes.
+
+DRF views are synchronous, so under ASGI every request holds a worker
+thread from start to finish, however slow the client. These views serve
+GET and HEAD on the recipe list (including search) and detail routes as
+coroutines: rows come from the async ORM and cached responses from the
+async cache API. A thread is only borrowed for the short steps Django has
+no async API for (token authentication, the planner row estimate). Fuzzy
+searches run their queries in one transaction, and profiled requests need
+a thread of their own, so both are handed to the viewset in a thread.
+Presigned download URLs are signed locally and cached per window. The
+URLs of a page are loaded through the async cache API before it is
+serialized, so serializing never waits on the network or the cache.
+
+Everything else, including responses, validators, caching, permissions and
+pagination, comes from `RecipesViewSet` itself, and other methods are
+handed to it unchanged. Enable with `RECIPES_ASYNC_READS`.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from core.utils.bucket import aprefetch_presigned_urls
+from core.utils.profiling import should_profile
+
+from .cache import (
+    aget_cached_response,
+    aresponse_cache_key,
+    astore_response,
+)
+from .conditional import (
+    acollection_validators,
+    conditional_response,
+    recipe_validators,
+    set_validators,
+)
+from .search import is_fuzzy_search
+from .serializers import IMAGE_URL_EXPIRATION, recipe_list_fast_serializer
+from .views import RecipesViewSet
+
+LIST_ACTIONS = {"get": "list", "post": "create"}
+DETAIL_ACTIONS = {
+    "get": "retrieve",
+    "put": "update",
+    "patch": "partial_update",
+    "delete": "destroy",
+}
+READ_METHODS = ("GET", "HEAD")
+
+
+async def _list(view, request):
+    cache_key = await aresponse_cache_key(request, view.action)
+    if cache_key is not None:
+        cached = await aget_cached_response(request, cache_key)
+        if cached is not None:
+            return cached, None
+
+    queryset = view.filter_queryset(view.get_queryset())
+    etag, last_modified = await acollection_validators(queryset, request)
+
+    response = conditional_response(request, etag, last_modified)
+    if response is None:
+        response = await _list_response(view, request, queryset)
+    store = (cache_key, etag, last_modified) if cache_key is not None else None
+    return set_validators(response, etag, last_modified), store
+
+
+async def _prefetch_image_urls(keys):
+    # Serializers look download URLs up with blocking cache calls; with the
+    # URLs already in this process they don't leave it
+    await aprefetch_presigned_urls(keys, expiration=IMAGE_URL_EXPIRATION)
+
+
+async def _list_response(view, request, queryset):
+    paginator = view.paginator
+    fast = getattr(settings, "RECIPES_FAST_LIST_SERIALIZER", False)
+    if fast:
+        queryset = queryset.values(*recipe_list_fast_serializer.values_fields)
+
+    page = None
+    if paginator is not None:
+        page = await paginator.apaginate_queryset(queryset, request, view=view)
+    rows = page if page is not None else [row async for row in queryset.aiterator()]
+    await _prefetch_image_urls(
+        row["image_bucket_key"] if fast else row.image_bucket_key for row in rows
+    )
+
+    if fast:
+        data = recipe_list_fast_serializer.serialize(rows)
+    else:
+        data = view.get_serializer(rows, many=True).data
+
+    if page is not None:
+        return view.get_paginated_response(data)
+    return Response(data)
+
+
+async def _retrieve(view, request):
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    pk = view.kwargs[lookup_url_kwarg]
+    cache_key = await aresponse_cache_key(request, view.action, pk)
+    if cache_key is not None:
+        cached = await aget_cached_response(request, cache_key)
+        if cached is not None:
+            return cached, None
+
+    queryset = view.filter_queryset(view.get_queryset())
+    try:
+        instance = await queryset.aget(**{view.lookup_field: pk})
+    except (queryset.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+        raise Http404
+    view.check_object_permissions(request, instance)
+
+    etag, last_modified = recipe_validators(instance, request)
+    response = conditional_response(request, etag, last_modified)
+    if response is None:
+        await _prefetch_image_urls([instance.image_bucket_key])
+        response = Response(view.get_serializer(instance).data)
+    store = (cache_key, etag, last_modified) if cache_key is not None else None
+    return set_validators(response, etag, last_modified), store
+
+
+async def _render(response):
+    """Render a DRF response and return it as a plain HttpResponse"""
+    if getattr(response, "is_rendered", True):
+        return response
+
+    if isinstance(response.accepted_renderer, BrowsableAPIRenderer):
+        # The browsable API builds forms from the view, which may query
+        await sync_to_async(response.render)()
+    else:
+        response.render()
+
+    # A plain response keeps Django from rendering it again in a thread
+    rendered = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        rendered[header] = value
+    return rendered
+
+
+async def _serve(request, handler, actions, initkwargs, args, kwargs):
+    view = RecipesViewSet(**initkwargs)
+    view.action_map = actions
+    view.args = args
+    view.kwargs = kwargs
+    view.request = request
+    request = view.initialize_request(request, *args, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+
+    store = None
+    try:
+        if "HTTP_AUTHORIZATION" in request.META:
+            # Token authentication looks the user up in the database
+            await sync_to_async(view.initial)(request, *args, **kwargs)
+        else:
+            view.initial(request, *args, **kwargs)
+        response, store = await handler(view, request)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+
+    response = view.finalize_response(request, response, *args, **kwargs)
+    response = await _render(response)
+    if store is not None:
+        await astore_response(response, *store)
+    return response
+
+
+def _as_view(handler, actions, detail):
+    actions = {**actions, "head": actions["get"]}
+    sync_view = RecipesViewSet.as_view(actions, basename="recipe", detail=detail)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        if is_fuzzy_search(request.GET) or should_profile(request):
+            # Fuzzy queries need one transaction, which the async ORM can't
+            # hold across awaits. The profiler follows one thread, where the
+            # event loop would interleave other requests with this one
+            response = await sync_to_async(sync_view)(request, *args, **kwargs)
+            return await _render(response)
+        return await _serve(
+            request, handler, actions, sync_view.initkwargs, args, kwargs
+        )
+
+    # Let schema generation treat this exactly like the viewset route
+    view.cls = sync_view.cls
+    view.initkwargs = sync_view.initkwargs
+    view.actions = sync_view.actions
+    return view
+
+
+recipe_list = _as_view(_list, LIST_ACTIONS, detail=False)
+recipe_detail = _as_view(_retrieve, DETAIL_ACTIONS, detail=True)
@@ -0,0 +1,203 @@
+"""
+Bulk create, update and delete for recipes.
+
+Each operation validates every item up front, loads or checks the affected
+rows with a single query, writes all valid items in one transaction and
+reports a result per item, so one bad item doesn't fail the whole batch.
+Bulk create and update skip `Recipe.save()` and model signals, so the
+search vector and the response cache are refreshed here for the whole
+batch at once. Bulk delete goes through `QuerySet.delete()`, which still
+sends `post_delete` for every row, so the signal handlers invalidate the
+cache as for single deletes.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from core.utils.deletion_queue import enqueue_object_deletion
+
+from .cache import invalidate_recipes
+from .models import SEARCH_FIELDS, Recipe
+from .serializers import RecipeDetailSerializer
+
+NOT_FOUND = {"detail": "Not found."}
+FORBIDDEN = {"detail": "You do not have permission to perform this action."}
+
+
+def _result(index, code, **extra):
+    return {"index": index, "status": code, **extra}
+
+
+def _parse_id(value):
+    # int() would truncate 1.5 and accept True
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bulk_create_recipes(items, owner, context=None):
+    """
+    Validate and insert recipes with one `bulk_create`.
+
+    Returns (results, created): a result per item, in order, and for each
+    created recipe a tuple of (item index, recipe, request_presigned_url).
+    """
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        serializer = RecipeDetailSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results[index] = _result(
+                index, status.HTTP_400_BAD_REQUEST, errors=serializer.errors
+            )
+            continue
+        data = dict(serializer.validated_data)
+        wants_url = data.pop("request_presigned_url", False)
+        pending.append((index, Recipe(owner=owner, **data), wants_url))
+
+    if pending:
+        with transaction.atomic():
+            Recipe.objects.bulk_create([recipe for _, recipe, _ in pending])
+            Recipe.objects.filter(
+                pk__in=[recipe.pk for _, recipe, _ in pending]
+            ).update_search_vector()
+        invalidate_recipes()
+
+    for index, recipe, _ in pending:
+        results[index] = _result(index, status.HTTP_201_CREATED, id=recipe.pk)
+    return results, pending
+
+
+def bulk_update_recipes(items, user, context=None):
+    """
+    Apply partial updates given as `{"id": ..., <fields>}` items.
+
+    Recipes are loaded and owner-checked with one query and written with one
+    `bulk_update`. Replaced images are queued for deletion together.
+    Returns (results, updated): a result per item and (item index, recipe)
+    for each updated recipe.
+    """
+    results = [None] * len(items)
+    ids = {}
+    seen = set()
+    for index, item in enumerate(items):
+        pk = _parse_id(item.get("id")) if isinstance(item, dict) else None
+        if pk is None:
+            errors = {"id": ["A valid integer is required."]}
+        elif pk in seen:
+            errors = {"id": ["Duplicate id in this request."]}
+        else:
+            ids[index] = pk
+            seen.add(pk)
+            continue
+        results[index] = _result(index, status.HTTP_400_BAD_REQUEST, errors=errors)
+
+    recipes = Recipe.objects.select_related("owner").in_bulk(ids.values())
+
+    now = timezone.now()
+    changed = []
+    fields = set()
+    orphaned_keys = []
+    for index, pk in ids.items():
+        recipe = recipes.get(pk)
+        if recipe is None:
+            results[index] = _result(
+                index, status.HTTP_404_NOT_FOUND, id=pk, **NOT_FOUND
+            )
+            continue
+        if recipe.owner_id != user.id:
+            results[index] = _result(
+                index, status.HTTP_403_FORBIDDEN, id=pk, **FORBIDDEN
+            )
+            continue
+
+        data = {key: value for key, value in items[index].items() if key != "id"}
+        serializer = RecipeDetailSerializer(
+            recipe, data=data, partial=True, context=context
+        )
+        if not serializer.is_valid():
+            results[index] = _result(
+                index, status.HTTP_400_BAD_REQUEST, id=pk, errors=serializer.errors
+            )
+            continue
+
+        validated = dict(serializer.validated_data)
+        validated.pop("request_presigned_url", None)
+        old_key = recipe.image_bucket_key
+        if "image_bucket_key" in validated and old_key != validated["image_bucket_key"]:
+            orphaned_keys.append(old_key)
+        for field, value in validated.items():
+            setattr(recipe, field, value)
+        recipe.updated_at = now
+        fields.update(validated)
+        changed.append((index, recipe))
+        results[index] = _result(index, status.HTTP_200_OK, id=pk)
+
+    if changed:
+        pks = [recipe.pk for _, recipe in changed]
+        with transaction.atomic():
+            Recipe.objects.bulk_update(
+                [recipe for _, recipe in changed], [*fields, "updated_at"]
+            )
+            if SEARCH_FIELDS.intersection(fields):
+                Recipe.objects.filter(pk__in=pks).update_search_vector()
+            enqueue_object_deletion(*orphaned_keys)
+        invalidate_recipes(pks)
+
+    return results, changed
+
+
+def bulk_delete_recipes(ids, user):
+    """
+    Delete the given recipe ids that belong to `user`.
+
+    Ownership is checked with one query; the recipes are deleted and their
+    images queued for deletion in one transaction. The delete is filtered
+    by owner too, so it can never remove another user's recipe. Returns a
+    result per id.
+    """
+    results = [None] * len(ids)
+    parsed = {}
+    for index, value in enumerate(ids):
+        pk = _parse_id(value)
+        if pk is None:
+            results[index] = _result(
+                index,
+                status.HTTP_400_BAD_REQUEST,
+                errors={"id": ["A valid integer is required."]},
+            )
+        else:
+            parsed[index] = pk
+
+    rows = {
+        pk: (owner_id, image_key)
+        for pk, owner_id, image_key in Recipe.objects.filter(
+            pk__in=parsed.values()
+        ).values_list("pk", "owner_id", "image_bucket_key")
+    }
+
+    deletable = set()
+    for index, pk in parsed.items():
+        row = rows.get(pk)
+        if row is None:
+            results[index] = _result(
+                index, status.HTTP_404_NOT_FOUND, id=pk, **NOT_FOUND
+            )
+        elif row[0] != user.id:
+            results[index] = _result(
+                index, status.HTTP_403_FORBIDDEN, id=pk, **FORBIDDEN
+            )
+        else:
+            deletable.add(pk)
+            results[index] = _result(index, status.HTTP_204_NO_CONTENT, id=pk)
+
+    if deletable:
+        with transaction.atomic():
+            Recipe.objects.filter(pk__in=deletable, owner=user).delete()
+            enqueue_object_deletion(*(rows[pk][1] for pk in deletable))
+
+    return results
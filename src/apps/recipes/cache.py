@@ -0,0 +1,191 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core.utils.bucket import bucket_breaker, get_presigned_url_window
+from core.utils.circuit_breaker import CLOSED
+from core.utils.metrics import record_cache
+
+from .conditional import conditional_response, set_validators
+
+DEFAULT_RESPONSE_CACHE_TIMEOUT = 60
+
+LIST_VERSION_KEY = "recipes:version:list"
+
+
+def _detail_version_key(pk):
+    return f"recipes:version:detail:{pk}"
+
+
+def _new_version():
+    # Versions start from the clock, so one recreated after an eviction
+    # doesn't repeat a value that cached responses may still be keyed by
+    return time.time_ns()
+
+
+def _get_version(version_key):
+    version = cache.get(version_key)
+    if version is None:
+        initial = _new_version()
+        cache.add(version_key, initial, timeout=None)
+        version = cache.get(version_key, initial)
+    return version
+
+
+async def _aget_version(version_key):
+    version = await cache.aget(version_key)
+    if version is None:
+        initial = _new_version()
+        await cache.aadd(version_key, initial, timeout=None)
+        version = await cache.aget(version_key, initial)
+    return version
+
+
+def _bump_version(version_key):
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # Missing (never read or evicted): any new value invalidates
+        cache.set(version_key, _new_version(), timeout=None)
+
+
+def invalidate_recipe(pk):
+    """Drop cached list pages and the cached detail response of a recipe"""
+    _bump_version(LIST_VERSION_KEY)
+    _bump_version(_detail_version_key(pk))
+
+
+def invalidate_recipes(pks=()):
+    """
+    `invalidate_recipe` for bulk creates and updates, which don't send
+    model signals.
+    The list version is bumped once; pass no keys for newly created rows.
+    """
+    _bump_version(LIST_VERSION_KEY)
+    for pk in pks:
+        _bump_version(_detail_version_key(pk))
+
+
+def _is_cacheable(request):
+    return request.method == "GET" and not request.user.is_authenticated
+
+
+def _version_key(pk):
+    return LIST_VERSION_KEY if pk is None else _detail_version_key(pk)
+
+
+def response_cache_key(request, action, pk=None):
+    """
+    Cache key for an anonymous GET, or None if the request isn't cacheable.
+
+    The key covers the normalized query string, host (pagination links are
+    absolute), negotiated format and the current version of the list or
+    detail, which `invalidate_recipe` bumps on every write.
+    """
+    if not _is_cacheable(request):
+        return None
+    return _response_cache_key(request, action, pk, _get_version(_version_key(pk)))
+
+
+async def aresponse_cache_key(request, action, pk=None):
+    """`response_cache_key` for async views"""
+    if not _is_cacheable(request):
+        return None
+    version = await _aget_version(_version_key(pk))
+    return _response_cache_key(request, action, pk, version)
+
+
+def _response_cache_key(request, action, pk, version):
+    query = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    parts = (
+        action,
+        pk,
+        version,
+        request.scheme,
+        request.get_host(),
+        query,
+        request.accepted_media_type,
+    )
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f"recipes:response:{digest}"
+
+
+def get_cached_response(request, cache_key):
+    """Replay a cached response (or a 304 for it), or return None on a miss"""
+    return _replay(request, cache.get(cache_key))
+
+
+async def aget_cached_response(request, cache_key):
+    """`get_cached_response` for async views"""
+    return _replay(request, await cache.aget(cache_key))
+
+
+def _replay(request, entry):
+    record_cache("recipe_response", entry is not None)
+    if entry is None:
+        return None
+
+    response = conditional_response(request, entry["etag"], entry["last_modified"])
+    if response is None:
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    return set_validators(response, entry["etag"], entry["last_modified"])
+
+
+def _cache_timeout():
+    _, window_end = get_presigned_url_window()
+    return min(
+        getattr(
+            settings, "RECIPES_RESPONSE_CACHE_TIMEOUT", DEFAULT_RESPONSE_CACHE_TIMEOUT
+        ),
+        int(window_end - time.time()),
+    )
+
+
+def _cache_entry(rendered, etag, last_modified):
+    return {
+        "content": rendered.content,
+        "content_type": rendered["Content-Type"],
+        "etag": etag,
+        "last_modified": last_modified,
+    }
+
+
+def cache_response(response, cache_key, etag, last_modified):
+    """
+    Store the response once rendered. Entries never outlive the current
+    presigned URL window, so embedded download URLs are always valid, and
+    responses rendered while the bucket breaker isn't closed (download URLs
+    possibly left out) aren't stored.
+    """
+    if response.status_code != 200:
+        return
+
+    timeout = _cache_timeout()
+    if timeout <= 0:
+        return
+
+    def store(rendered):
+        if bucket_breaker.state != CLOSED:
+            return
+        cache.set(cache_key, _cache_entry(rendered, etag, last_modified), timeout)
+
+    response.add_post_render_callback(store)
+
+
+async def astore_response(response, cache_key, etag, last_modified):
+    """`cache_response` for async views, called with the rendered response"""
+    if response.status_code != 200 or bucket_breaker.state != CLOSED:
+        return
+
+    timeout = _cache_timeout()
+    if timeout > 0:
+        await cache.aset(
+            cache_key, _cache_entry(response, etag, last_modified), timeout
+        )
@@ -0,0 +1,129 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+
+from core.utils.bucket import bucket_breaker, get_presigned_url_window
+
+
+def _digest(*parts):
+    return hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()[:16]
+
+
+def _make_etag(state, request):
+    """
+    Build an ETag of the form "<state>-<variant>".
+
+    `state` identifies the stored data and is what If-Match compares.
+    `variant` covers everything else that changes the bytes served: the
+    negotiated format, the presigned URL window and whether download URLs
+    are being left out because the bucket is down, so a client never gets a
+    304 for a body whose download URLs have been re-signed or restored.
+    """
+    window_start, _ = get_presigned_url_window()
+    renderer = getattr(request, "accepted_renderer", None)
+    variant = _digest(
+        window_start, getattr(renderer, "format", ""), bucket_breaker.is_open()
+    )
+    return f'"{state}-{variant}"'
+
+
+def _last_modified(updated_at, window_start=None):
+    if updated_at is None:
+        return window_start
+    timestamp = int(updated_at.timestamp())
+    if window_start is None:
+        return timestamp
+    return max(timestamp, window_start)
+
+
+def recipe_state(recipe):
+    """Validator for the stored state of a single recipe"""
+    return _digest(recipe.pk, recipe.updated_at.isoformat())
+
+
+def recipe_validators(recipe, request):
+    """ETag and Last-Modified timestamp for a recipe detail response"""
+    window_start = None
+    if recipe.image_bucket_key:
+        window_start, _ = get_presigned_url_window()
+    return (
+        _make_etag(recipe_state(recipe), request),
+        _last_modified(recipe.updated_at, window_start),
+    )
+
+
+def _collection_stats():
+    # The row count and highest id change on every create and delete, even
+    # one that leaves the latest `updated_at` alone; updates move the latter
+    return {
+        "count": Count("id"),
+        "latest": Max("updated_at"),
+        "last_id": Max("id"),
+    }
+
+
+def _collection_etag(stats, request):
+    latest = stats["latest"]
+    state = _digest(
+        stats["count"], stats["last_id"], latest.isoformat() if latest else ""
+    )
+    return _make_etag(state, request)
+
+
+def collection_validators(queryset, request):
+    """
+    ETag for a recipe list response, derived from the row count, highest id
+    and latest `updated_at` of the filtered queryset, so every process of
+    the API agrees on it. Lists have no Last-Modified: deleting a row leaves
+    no timestamp behind, so a date could answer 304 for a list that has
+    lost a row.
+    """
+    stats = queryset.order_by().aggregate(**_collection_stats())
+    return _collection_etag(stats, request), None
+
+
+async def acollection_validators(queryset, request):
+    """`collection_validators` for async views, using the async ORM"""
+    stats = await queryset.order_by().aaggregate(**_collection_stats())
+    return _collection_etag(stats, request), None
+
+
+def conditional_response(request, etag, last_modified):
+    """
+    Return a 304 Not Modified (safe methods) or 412 Precondition Failed
+    response if the request's conditional headers say so, otherwise None.
+    """
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def if_match_failed(request, recipe):
+    """
+    Whether an `If-Match` header is present and doesn't match the recipe's
+    current state. Only the state part of the ETag is compared, so a tag
+    from an earlier URL-signing window or another format still matches.
+    """
+    header = request.META.get("HTTP_IF_MATCH")
+    if not header:
+        return False
+
+    etags = parse_etags(header)
+    if "*" in etags:
+        return False
+
+    state = recipe_state(recipe)
+    return not any(etag.strip('"').split("-")[0] == state for etag in etags)
+
+
+def precondition_failed():
+    return HttpResponse(status=status.HTTP_412_PRECONDITION_FAILED)
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:02
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_recipe_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"],
+                name="recipe_title_trgm_gin",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
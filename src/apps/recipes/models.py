@@ -2,9 +2,35 @@ from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, transaction
 
-from core.utils.bucket import delete_object
+from core.utils.deletion_queue import enqueue_object_deletion
+
+SEARCH_CONFIG = "english"
+SEARCH_FIELDS = {"title", "description", "steps"}
+
+
+def recipe_search_vector():
+    """Weighted search document: title (A), description (B), steps (C)"""
+    steps_text = models.Func(
+        models.F("steps"),
+        models.Value(" "),
+        function="array_to_string",
+        output_field=models.TextField(),
+    )
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(steps_text, weight="C", config=SEARCH_CONFIG)
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    def update_search_vector(self):
+        """Recompute the stored search vector for every recipe in the queryset"""
+        return self.update(search_vector=recipe_search_vector())
 
 
 class Recipe(models.Model):
@@ -28,31 +54,48 @@ class Recipe(models.Model):
     # S3 storage fields
     image_bucket_key = models.CharField(max_length=500, blank=True, null=True)
 
+    # Full-text search document, maintained by save()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="recipe_created_id_idx"),
+            GinIndex(fields=["search_vector"], name="recipe_search_vector_gin"),
+            GinIndex(
+                fields=["title"],
+                name="recipe_title_trgm_gin",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.owner.username}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or SEARCH_FIELDS.intersection(update_fields):
+            Recipe.objects.filter(pk=self.pk).update_search_vector()
+
     def update_image(self, new_bucket_key):
-        """Update the S3 image key, deleting the old one if different"""
-        if self.image_bucket_key and self.image_bucket_key != new_bucket_key:
-            try:
-                delete_object(self.image_bucket_key)
-            except Exception:
-                pass
-        self.image_bucket_key = new_bucket_key
-        self.save(update_fields=["image_bucket_key", "updated_at"])
+        """Update the S3 image key, queueing the old one for deletion if different"""
+        # The old key is only queued if the new one is saved
+        with transaction.atomic():
+            if self.image_bucket_key and self.image_bucket_key != new_bucket_key:
+                enqueue_object_deletion(self.image_bucket_key)
+            self.image_bucket_key = new_bucket_key
+            self.save(update_fields=["image_bucket_key", "updated_at"])
 
     def clear_image(self):
-        """Clear the S3 image key, deleting the old one"""
-        if self.image_bucket_key:
-            try:
-                delete_object(self.image_bucket_key)
-            except Exception:
-                pass
-        self.image_bucket_key = None
-        self.save(update_fields=["image_bucket_key", "updated_at"])
+        """Clear the S3 image key, queueing the old one for deletion"""
+        with transaction.atomic():
+            if self.image_bucket_key:
+                enqueue_object_deletion(self.image_bucket_key)
+            self.image_bucket_key = None
+            self.save(update_fields=["image_bucket_key", "updated_at"])
 
     @property
     def has_image(self):
@@ -14,5 +14,5 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the recipe.
-        # Since owner is required, we can safely compare with request.user
-        return obj.owner == request.user
+        # Compare ids so the owner row doesn't have to be loaded
+        return obj.owner_id == request.user.id
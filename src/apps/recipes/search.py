@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Q
+
+from .models import SEARCH_CONFIG
+
+SEARCH_MODE_CONTAINS = "contains"
+SEARCH_MODE_FULLTEXT = "fulltext"
+SEARCH_MODE_FUZZY = "fuzzy"
+
+SEARCH_MODES = (SEARCH_MODE_CONTAINS, SEARCH_MODE_FULLTEXT, SEARCH_MODE_FUZZY)
+# Modes whose results are ordered by relevance rather than recency
+RANKED_SEARCH_MODES = (SEARCH_MODE_FULLTEXT, SEARCH_MODE_FUZZY)
+
+DEFAULT_TRIGRAM_THRESHOLD = 0.5
+
+
+def search_contains(queryset, search_term, search_in_description=False):
+    """Substring match on title (and optionally description)"""
+    queries = Q(title__icontains=search_term)
+    if search_in_description:
+        queries |= Q(description__icontains=search_term)
+    return queryset.filter(queries)
+
+
+def search_fulltext(queryset, search_term):
+    """
+    Match against the stored search vector (title, description and steps)
+    using the GIN index, ordered by relevance.
+    """
+    query = SearchQuery(search_term, search_type="websearch", config=SEARCH_CONFIG)
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "-created_at")
+    )
+
+
+def search_fuzzy(queryset, search_term):
+    """
+    Typo-tolerant title match using pg_trgm word similarity, ordered by
+    similarity. The `%>` operator is served by the trigram GIN index on
+    title; its cut-off is `pg_trgm.word_similarity_threshold`, so evaluate
+    the queryset inside `trigram_threshold()`.
+    """
+    return (
+        queryset.filter(title__trigram_word_similar=search_term)
+        .annotate(similarity=TrigramWordSimilarity(search_term, "title"))
+        .order_by("-similarity", "-created_at")
+    )
+
+
+@contextmanager
+def trigram_threshold(threshold=None, using=DEFAULT_DB_ALIAS):
+    """
+    Run the block in a transaction whose `pg_trgm.word_similarity_threshold`
+    is `threshold` (default `RECIPE_SEARCH_TRIGRAM_THRESHOLD`). The setting
+    is local to the transaction, so it never leaks to later queries on a
+    reused connection.
+    """
+    if threshold is None:
+        threshold = getattr(
+            settings, "RECIPE_SEARCH_TRIGRAM_THRESHOLD", DEFAULT_TRIGRAM_THRESHOLD
+        )
+
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(threshold)],
+            )
+        yield
+
+
+def is_fuzzy_search(query_params):
+    """Whether the query string asks for a fuzzy search"""
+    return (
+        "search_term" in query_params
+        and query_params.get("search_mode", "").lower() == SEARCH_MODE_FUZZY
+    )
+
+
+def search_recipes(queryset, search_term, mode, search_in_description=False):
+    """Apply the search backend matching `mode` to the queryset"""
+    if mode == SEARCH_MODE_FULLTEXT:
+        return search_fulltext(queryset, search_term)
+    if mode == SEARCH_MODE_FUZZY:
+        return search_fuzzy(queryset, search_term)
+    return search_contains(queryset, search_term, search_in_description)
@@ -1,11 +1,33 @@
+from functools import cached_property
+
 from rest_framework import serializers
 
-from core.utils.bucket import get_presigned_url
+from core.utils.bucket import get_cached_presigned_url
+from core.utils.timing import (
+    SERIALIZE,
+    TimedListSerializer,
+    TimedSerializerMixin,
+    track,
+)
 
 from .models import Recipe
 
+IMAGE_URL_EXPIRATION = 3600
+
+
+def get_image_download_url(image_bucket_key):
+    """Presigned download URL for an image key, or None"""
+    if image_bucket_key:
+        try:
+            return get_cached_presigned_url(
+                image_bucket_key, expiration=IMAGE_URL_EXPIRATION
+            )
+        except Exception:
+            return None
+    return None
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     owner = serializers.StringRelatedField(read_only=True)
     image_download_url = serializers.SerializerMethodField(read_only=True)
     request_presigned_url = serializers.BooleanField(
@@ -28,6 +50,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             "request_presigned_url",
         ]
         read_only_fields = ["owner", "created_at", "updated_at"]
+        list_serializer_class = TimedListSerializer
 
     def validate_image_bucket_key(self, value):
         if value and not isinstance(value, str):
@@ -36,12 +59,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def get_image_download_url(self, obj):
         """Generate presigned download URL if image exists"""
-        if obj.has_image:
-            try:
-                return get_presigned_url(obj.image_bucket_key, "GET", expiration=3600)
-            except Exception:
-                return None
-        return None
+        return get_image_download_url(obj.image_bucket_key)
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -49,16 +67,60 @@ class RecipeDetailSerializer(RecipeSerializer):
         model = Recipe
         fields = RecipeSerializer.Meta.fields + ["steps"]
         read_only_fields = RecipeSerializer.Meta.read_only_fields
-
-    def get_image_download_url(self, obj):
-        """Generate presigned download URL if image exists"""
-        if obj.has_image:
-            try:
-                return get_presigned_url(obj.image_bucket_key, "GET", expiration=3600)
-            except Exception:
-                return None
-        return None
+        list_serializer_class = TimedListSerializer
 
     def get_steps(self, obj):
         """Get steps for recipe"""
         return obj.steps.values_list("description", flat=True)
+
+
+class RecipeListFastSerializer:
+    """
+    Read-only fast path for recipe lists.
+
+    Builds the same payload as `RecipeSerializer` from `.values()` rows,
+    skipping model instantiation and per-field serializer dispatch. The
+    field mapping is compiled once from `RecipeSerializer`, reusing its
+    field `to_representation` methods so values are formatted identically.
+    """
+
+    # .values() lookups for fields whose source isn't a plain column
+    value_sources = {
+        "owner": "owner__username",
+        "image_download_url": "image_bucket_key",
+    }
+    value_converters = {
+        "owner": str,
+        "image_download_url": get_image_download_url,
+    }
+
+    @cached_property
+    def mapping(self):
+        """(field name, values() key, converter) for each readable field"""
+        mapping = []
+        for name, field in RecipeSerializer().fields.items():
+            if field.write_only:
+                continue
+            source = self.value_sources.get(name, field.source)
+            converter = self.value_converters.get(name, field.to_representation)
+            mapping.append((name, source, converter))
+        return tuple(mapping)
+
+    @cached_property
+    def values_fields(self):
+        """Field lookups to pass to `.values()`"""
+        return tuple(dict.fromkeys(source for _, source, _ in self.mapping))
+
+    def to_representation(self, row):
+        data = {}
+        for name, source, converter in self.mapping:
+            value = row[source]
+            data[name] = None if value is None else converter(value)
+        return data
+
+    def serialize(self, rows):
+        with track(SERIALIZE):
+            return [self.to_representation(row) for row in rows]
+
+
+recipe_list_fast_serializer = RecipeListFastSerializer()
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_recipe
+from .models import Recipe
+
+
+@receiver(post_save, sender=Recipe, dispatch_uid="recipes_invalidate_on_save")
+@receiver(post_delete, sender=Recipe, dispatch_uid="recipes_invalidate_on_delete")
+def invalidate_recipe_responses(sender, instance, **kwargs):
+    """Drop cached responses that include the saved or deleted recipe"""
+    invalidate_recipe(instance.pk)
@@ -1,3 +1,1210 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import PendingObjectDeletion
+from core.utils import bucket
+from core.utils.bucket import bucket_breaker
+from core.utils.deletion_queue import drain_deletion_queue
+
+from .async_views import recipe_detail, recipe_list
+from .models import Recipe
+from .search import search_fuzzy, trigram_threshold
+from .serializers import RecipeDetailSerializer
+
+User = get_user_model()
+
+
+class RecipeAPITestCase(APITestCase):
+    """Base test case that starts every test with an empty response cache"""
+
+    def setUp(self):
+        cache.clear()
+
+
+class RecipeSearchTestCase(RecipeAPITestCase):
+    """Test the search modes of the recipe list endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        cls.carbonara = Recipe.objects.create(
+            title="Classic Spaghetti Carbonara",
+            description="Traditional Italian pasta with eggs and pancetta.",
+            duration=timedelta(minutes=30),
+            steps=["Boil the pasta", "Fry the pancetta until crispy"],
+            owner=cls.user,
+        )
+        cls.tikka = Recipe.objects.create(
+            title="Chicken Tikka Masala",
+            description="Creamy curry with tender chicken in a tomato sauce.",
+            duration=timedelta(minutes=45),
+            steps=["Marinate the chicken", "Simmer in the sauce"],
+            owner=cls.user,
+        )
+        cls.url = reverse("core:recipes:recipe-list")
+
+    def _titles(self, response):
+        return [recipe["title"] for recipe in response.data["results"]]
+
+    def test_contains_is_default_mode(self):
+        """Test that search_term without a mode keeps substring matching"""
+        response = self.client.get(self.url, {"search_term": "carbo"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._titles(response), [self.carbonara.title])
+
+    def test_fulltext_matches_stemmed_words(self):
+        """Test that fulltext mode matches word stems across fields"""
+        response = self.client.get(
+            self.url, {"search_term": "marinated", "search_mode": "fulltext"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._titles(response), [self.tikka.title])
+
+    def test_fulltext_ranks_title_above_steps(self):
+        """Test that title matches outrank matches found only in steps"""
+        Recipe.objects.create(
+            title="Pancetta Crisps",
+            description="A salty snack.",
+            owner=self.user,
+        )
+        response = self.client.get(
+            self.url, {"search_term": "pancetta", "search_mode": "fulltext"}
+        )
+
+        self.assertEqual(
+            self._titles(response), ["Pancetta Crisps", self.carbonara.title]
+        )
+
+    def test_search_vector_follows_updates(self):
+        """Test that the stored search vector is refreshed on save"""
+        self.tikka.steps = ["Grill the paneer"]
+        self.tikka.save()
+
+        response = self.client.get(
+            self.url, {"search_term": "paneer", "search_mode": "fulltext"}
+        )
+
+        self.assertEqual(self._titles(response), [self.tikka.title])
+
+    def test_fuzzy_tolerates_typos(self):
+        """Test that fuzzy mode matches misspelled titles"""
+        for term, expected in (
+            ("carbonarra", self.carbonara.title),
+            ("tika masala", self.tikka.title),
+        ):
+            response = self.client.get(
+                self.url, {"search_term": term, "search_mode": "fuzzy"}
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(self._titles(response), [expected])
+
+    def test_fuzzy_threshold_is_configurable(self):
+        """Test that raising the similarity threshold drops weak matches"""
+        with self.settings(RECIPE_SEARCH_TRIGRAM_THRESHOLD=0.9):
+            response = self.client.get(
+                self.url, {"search_term": "carbonarra", "search_mode": "fuzzy"}
+            )
+
+        self.assertEqual(self._titles(response), [])
+
+    def test_fuzzy_threshold_is_transaction_local(self):
+        """Test that fuzzy search leaves the connection's threshold alone"""
+
+        def current():
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW pg_trgm.word_similarity_threshold")
+                return cursor.fetchone()[0]
+
+        before = current()
+        with self.settings(RECIPE_SEARCH_TRIGRAM_THRESHOLD=0.9):
+            # Building the queryset doesn't touch the connection
+            search_fuzzy(Recipe.objects.all(), "carbonarra")
+            self.assertEqual(current(), before)
+            with transaction.atomic():
+                with trigram_threshold():
+                    self.assertEqual(current(), "0.9")
+                # Rolling back the savepoint stands in for the transaction end
+                transaction.set_rollback(True)
+
+        self.assertEqual(current(), before)
+
+    def test_invalid_search_mode(self):
+        """Test that an unknown search mode is rejected"""
+        response = self.client.get(
+            self.url, {"search_term": "pasta", "search_mode": "regex"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("search_mode", response.data)
+
+
+class RecipeCursorPaginationTestCase(RecipeAPITestCase):
+    """Test keyset pagination of the recipe list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        cls.recipes = [
+            Recipe.objects.create(
+                title=f"Recipe {i}", description="Tasty.", owner=cls.user
+            )
+            for i in range(5)
+        ]
+        # Share a timestamp between rows so the id tie-breaker is exercised
+        Recipe.objects.filter(pk__in=[r.pk for r in cls.recipes[1:4]]).update(
+            created_at=cls.recipes[1].created_at
+        )
+        cls.url = reverse("core:recipes:recipe-list")
+        cls.expected = list(
+            Recipe.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+    def _ids(self, response):
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_walks_forward_and_back(self):
+        """Test that next/previous cursors visit every row exactly once"""
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("total", response.data)
+        self.assertIsNone(response.data["links"]["previous"])
+
+        seen = self._ids(response)
+        pages = [seen]
+        while response.data["links"]["next"]:
+            response = self.client.get(response.data["links"]["next"])
+            pages.append(self._ids(response))
+            seen += pages[-1]
+
+        self.assertEqual(seen, self.expected)
+
+        response = self.client.get(response.data["links"]["previous"])
+        self.assertEqual(self._ids(response), pages[-2])
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is rejected"""
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rejected_for_ranked_searches(self):
+        """Test that cursors can't replace the relevance order of a search"""
+        for mode in ("fulltext", "fuzzy"):
+            response = self.client.get(
+                self.url,
+                {"search_term": "recipe", "search_mode": mode, "pagination": "cursor"},
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("pagination", response.data)
+
+        response = self.client.get(
+            self.url, {"search_term": "Recipe", "pagination": "cursor"}
+        )
+        self.assertEqual(self._ids(response), self.expected[:10])
+
+    def test_page_number_is_default(self):
+        """Test that page-number pagination stays the default"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data["total"], 5)
+        self.assertEqual(self._ids(response), self.expected)
+
+
+class RecipeEstimatedCountTestCase(RecipeAPITestCase):
+    """Test planner-estimated totals on the page-number paginator"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        Recipe.objects.bulk_create(
+            Recipe(title=f"Soup {i}", description="Warm.", owner=cls.user)
+            for i in range(12)
+        )
+        cls.url = reverse("core:recipes:recipe-list")
+
+    def test_exact_below_threshold(self):
+        """Test that small result sets keep an exact total"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data["total"], 12)
+        self.assertTrue(response.data["total_is_exact"])
+
+    def test_unfiltered_uses_table_statistics(self):
+        """Test that the unfiltered list reads reltuples instead of counting"""
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE recipes_recipe")
+
+        with self.settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=1):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+
+        self.assertFalse(response.data["total_is_exact"])
+        self.assertEqual(response.data["total"], 12)
+        self.assertFalse(
+            any('AS "__count"' in q["sql"] for q in queries.captured_queries)
+        )
+
+    def test_filtered_estimate_pages_past_total(self):
+        """Test that estimated pages stop on an empty page, not the estimate"""
+        with self.settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=1):
+            response = self.client.get(
+                self.url, {"search_term": "soup", "page_size": 5, "page": 3}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.data["total_is_exact"])
+            self.assertEqual(len(response.data["results"]), 2)
+            self.assertIsNone(response.data["links"]["next"])
+
+            response = self.client.get(
+                self.url, {"search_term": "soup", "page_size": 5, "page": 4}
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipeQueryCountTestCase(RecipeAPITestCase):
+    """Test that recipe endpoints run a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owners = [
+            User.objects.create_user(username=f"chef{i}", password="secret-pass")
+            for i in range(3)
+        ]
+        for i in range(12):
+            Recipe.objects.create(
+                title=f"Recipe {i}",
+                description="Tasty.",
+                steps=["Cook it"],
+                image_bucket_key=f"recipes/{i}.jpg",
+                owner=cls.owners[i % 3],
+            )
+        cls.recipe = Recipe.objects.first()
+        cls.list_url = reverse("core:recipes:recipe-list")
+        cls.detail_url = reverse("core:recipes:recipe-detail", args=[cls.recipe.pk])
+
+    def test_list_queries_independent_of_page_size(self):
+        """Test that the list query count doesn't grow with the page size"""
+        usernames = {owner.username for owner in self.owners}
+        for page_size in (2, 12):
+            # List validators, count estimate, exact count and one select
+            with self.assertNumQueries(4):
+                response = self.client.get(self.list_url, {"page_size": page_size})
+
+            self.assertEqual(len(response.data["results"]), page_size)
+            for recipe in response.data["results"]:
+                self.assertIn(recipe["owner"], usernames)
+
+    def test_list_defers_unused_columns(self):
+        """Test that the list query doesn't fetch steps"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.list_url)
+
+        self.assertNotIn('"steps"', queries.captured_queries[-1]["sql"])
+
+    def test_detail_single_query(self):
+        """Test that the detail view loads the recipe and owner in one query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+
+        self.assertEqual(response.data["owner"], self.recipe.owner.username)
+        self.assertEqual(response.data["steps"], ["Cook it"])
+
+    def test_owner_check_does_not_load_user(self):
+        """Test that updates compare owner ids instead of loading the owner"""
+        self.client.force_authenticate(self.owners[0])
+        other = Recipe.objects.filter(owner=self.owners[1]).first()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                reverse("core:recipes:recipe-detail", args=[other.pk]),
+                {"title": "Mine"},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(queries.captured_queries)
+        for query in queries.captured_queries:
+            self.assertNotIn(User._meta.db_table, query["sql"])
+
+
+class RecipeFastListSerializerTestCase(RecipeAPITestCase):
+    """Test the .values()-based fast path of the recipe list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        Recipe.objects.create(
+            title="Slow Roast",
+            description="Low and slow.",
+            duration=timedelta(days=1, hours=2, minutes=3, seconds=4, microseconds=5),
+            difficulty="hard",
+            image_bucket_key="recipes/roast.jpg",
+            owner=cls.user,
+        )
+        Recipe.objects.create(
+            title="Toast", description="Quick.", image_bucket_key="", owner=cls.user
+        )
+        Recipe.objects.create(title="Tea", description="Quicker.", owner=cls.user)
+        cls.url = reverse("core:recipes:recipe-list")
+
+    def _get_both(self, params):
+        responses = []
+        for fast in (False, True):
+            with self.settings(RECIPES_FAST_LIST_SERIALIZER=fast):
+                responses.append(self.client.get(self.url, params))
+        return responses
+
+    def test_identical_payload(self):
+        """Test that the fast path renders byte-identical JSON"""
+        for params in (
+            {},
+            {"page_size": 2, "page": 2},
+            {"search_term": "roast", "search_mode": "fulltext"},
+            {"pagination": "cursor", "page_size": 2},
+        ):
+            slow, fast = self._get_both(params)
+
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content)
+
+    def test_single_select(self):
+        """Test that the fast path doesn't load related rows separately"""
+        with self.settings(RECIPES_FAST_LIST_SERIALIZER=True):
+            # List validators and one select
+            with self.assertNumQueries(2):
+                self.client.get(self.url, {"pagination": "cursor"})
+
+
+class RecipeConditionalRequestTestCase(RecipeAPITestCase):
+    """Test ETag / Last-Modified validators on recipe endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        cls.recipe = Recipe.objects.create(
+            title="Risotto", description="Creamy.", owner=cls.user
+        )
+        cls.list_url = reverse("core:recipes:recipe-list")
+        cls.detail_url = reverse("core:recipes:recipe-detail", args=[cls.recipe.pk])
+
+    def test_detail_not_modified(self):
+        """Test that a matching If-None-Match skips serialization"""
+        response = self.client.get(self.detail_url)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+        with mock.patch.object(RecipeDetailSerializer, "to_representation") as rep:
+            response = self.client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        rep.assert_not_called()
+
+    def test_detail_modified_after_update(self):
+        """Test that saving the recipe changes its ETag"""
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.recipe.title = "Mushroom Risotto"
+        self.recipe.save()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_varies_with_format(self):
+        """Test that JSON and MessagePack representations get distinct ETags"""
+        json_etag = self.client.get(self.detail_url)["ETag"]
+        msgpack_etag = self.client.get(
+            self.detail_url, HTTP_ACCEPT="application/msgpack"
+        )["ETag"]
+
+        self.assertNotEqual(json_etag, msgpack_etag)
+
+    def test_list_not_modified_until_collection_changes(self):
+        """Test collection validators for the list endpoint"""
+        etag = self.client.get(self.list_url)["ETag"]
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Recipe.objects.create(title="Paella", description="Rice.", owner=self.user)
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_modified_after_delete(self):
+        """Test that deleting a row changes the list ETag"""
+        paella = Recipe.objects.create(
+            title="Paella", description="Rice.", owner=self.user
+        )
+        response = self.client.get(self.list_url)
+        self.assertNotIn("Last-Modified", response)
+
+        paella.delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_modified_after_delete_and_create(self):
+        """Test that replacing a row keeps no stale list ETag valid"""
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.list_url)["ETag"]
+
+        self.recipe.delete()
+        Recipe.objects.create(title="Paella", description="Rice.", owner=self.user)
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_comes_from_database(self):
+        """Test that writes no process cache heard of still change the ETag"""
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.list_url)["ETag"]
+
+        # update() sends no signals, like a write made by another worker
+        # whose cache this process can't see
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            title="Risotto nero", updated_at=timezone.now()
+        )
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_match_on_update(self):
+        """Test that updates with a stale If-Match are rejected"""
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        response = self.client.patch(
+            self.detail_url, {"title": "Risotto alla Milanese"}, HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        response = self.client.patch(
+            self.detail_url, {"title": "Stale edit"}, HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, "Risotto alla Milanese")
+
+    def test_if_match_on_update_image(self):
+        """Test that image changes with a stale If-Match are rejected"""
+        self.client.force_authenticate(self.user)
+        url = reverse("core:recipes:recipe-update-image", args=[self.recipe.pk])
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.recipe.save()
+
+        response = self.client.patch(
+            url, {"image_bucket_key": "recipes/risotto.jpg"}, HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertIsNone(self.recipe.image_bucket_key)
+
+
+class RecipeResponseCacheTestCase(RecipeAPITestCase):
+    """Test the anonymous response cache for recipe reads"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        cls.recipe = Recipe.objects.create(
+            title="Gazpacho",
+            description="Cold.",
+            image_bucket_key="recipes/gazpacho.jpg",
+            owner=cls.user,
+        )
+        cls.list_url = reverse("core:recipes:recipe-list")
+        cls.detail_url = reverse("core:recipes:recipe-detail", args=[cls.recipe.pk])
+
+    def test_anonymous_reads_are_cached(self):
+        """Test that repeated anonymous reads skip the database"""
+        for url in (self.list_url, self.detail_url):
+            first = self.client.get(url, {"b": "2", "a": "1"})
+
+            with self.assertNumQueries(0):
+                second = self.client.get(url, {"a": "1", "b": "2"})
+
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_cached_response_honours_validators(self):
+        """Test that a cache hit still answers 304 to a matching ETag"""
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_authenticated_reads_bypass_cache(self):
+        """Test that authenticated requests are never served from the cache"""
+        self.client.get(self.list_url)
+        self.client.force_authenticate(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.list_url)
+
+        self.assertGreater(len(queries), 0)
+
+    def test_image_changes_invalidate(self):
+        """Test that update_image and clear_image drop cached responses"""
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+
+        self.recipe.clear_image()
+
+        for url in (self.list_url, self.detail_url):
+            response = self.client.get(url)
+            data = (
+                response.data if url == self.detail_url else response.data["results"][0]
+            )
+            self.assertIsNone(data["image_download_url"])
+
+    def test_delete_invalidates_list(self):
+        """Test that deleting a recipe drops it from the cached list"""
+        self.client.get(self.list_url)
+        self.recipe.delete()
+
+        self.assertEqual(self.client.get(self.list_url).data["results"], [])
+
+    def test_timeout_capped_at_url_window(self):
+        """Test that entries expire with the presigned URL window"""
+        with mock.patch("apps.recipes.cache.cache.set") as cache_set:
+            with mock.patch(
+                "apps.recipes.cache.get_presigned_url_window",
+                return_value=(0, time.time() + 5),
+            ):
+                self.client.get(self.detail_url)
+
+        timeout = cache_set.call_args.args[2]
+        self.assertLessEqual(timeout, 5)
+
+
+class RecipeImageDeletionTestCase(RecipeAPITestCase):
+    """Test that replaced and orphaned images are queued, not deleted inline"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = Recipe.objects.create(
+            title="Paella",
+            description="Rice.",
+            image_bucket_key="recipes/paella.jpg",
+            owner=self.user,
+        )
+        self.client.force_authenticate(self.user)
+
+    def _queued_keys(self):
+        return list(PendingObjectDeletion.objects.values_list("key", flat=True))
+
+    @mock.patch("core.utils.bucket.get_bucket")
+    def test_destroy_queues_image(self, get_bucket):
+        """Test that deleting a recipe queues its image without calling S3"""
+        url = reverse("core:recipes:recipe-detail", args=[self.recipe.pk])
+        response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._queued_keys(), ["recipes/paella.jpg"])
+        get_bucket.assert_not_called()
+
+    def test_image_changes_queue_old_key(self):
+        """Test that update_image and clear_image queue the replaced key"""
+        self.recipe.update_image("recipes/paella-2.jpg")
+        self.recipe.update_image("recipes/paella-2.jpg")
+        self.assertEqual(self._queued_keys(), ["recipes/paella.jpg"])
+
+        self.recipe.clear_image()
+        self.assertEqual(
+            sorted(self._queued_keys()),
+            ["recipes/paella-2.jpg", "recipes/paella.jpg"],
+        )
+
+    def test_drain_keeps_restored_image(self):
+        """Test that a queued key a recipe points at again isn't deleted"""
+        self.recipe.update_image("recipes/paella-2.jpg")
+        self.recipe.update_image("recipes/paella.jpg")
+        self.assertEqual(
+            sorted(self._queued_keys()),
+            ["recipes/paella-2.jpg", "recipes/paella.jpg"],
+        )
+
+        with mock.patch(
+            "core.utils.deletion_queue.delete_objects", return_value={}
+        ) as delete_objects:
+            self.assertEqual(drain_deletion_queue(), (1, 0))
+
+        self.assertEqual(
+            list(delete_objects.call_args.args[0]), ["recipes/paella-2.jpg"]
+        )
+        self.assertEqual(self._queued_keys(), [])
+
+    def test_failed_save_does_not_queue_old_key(self):
+        """Test that the old key stays out of the queue if the save fails"""
+        with mock.patch.object(Recipe, "save", side_effect=DatabaseError("down")):
+            with self.assertRaises(DatabaseError):
+                self.recipe.update_image("recipes/paella-2.jpg")
+            with self.assertRaises(DatabaseError):
+                self.recipe.clear_image()
+
+        self.assertEqual(self._queued_keys(), [])
+
+
+class RecipeBucketOutageTestCase(RecipeAPITestCase):
+    """Test that recipe endpoints degrade instead of waiting on the bucket"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        cls.recipe = Recipe.objects.create(
+            title="Ramen",
+            description="Noodles.",
+            image_bucket_key="recipes/ramen.jpg",
+            owner=cls.user,
+        )
+        cls.list_url = reverse("core:recipes:recipe-list")
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(bucket_breaker.reset)
+        for _ in range(bucket_breaker.failure_threshold):
+            bucket_breaker.before_call()
+            bucket_breaker.record_failure()
+
+    def test_download_urls_are_null_and_not_cached(self):
+        """Test that an open breaker serves null image URLs, uncached"""
+        response = self.client.get(self.list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["results"][0]["image_download_url"])
+
+        bucket_breaker.reset()
+        response = self.client.get(self.list_url)
+        self.assertIsNotNone(response.data["results"][0]["image_download_url"])
+
+    def test_presigned_url_fails_fast(self):
+        """Test that presigned URL requests get a 503 with Retry-After"""
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            reverse("core:recipes:recipe-presigned-url"),
+            {"method": "PUT", "filename": "ramen.jpg"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    def test_presigned_url_batch_fails_fast(self):
+        """Test that batch presigned URL requests get a 503 as a whole"""
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            reverse("core:recipes:recipe-presigned-url"),
+            [{"method": "PUT", "filename": "ramen.jpg"}],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    def test_health_check_reports_degraded(self):
+        """Test that the health check publishes the open breaker"""
+        response = self.client.get(reverse("core:health_check"))
+
+        self.assertEqual(response.data["status"], "degraded")
+        self.assertEqual(response.data["bucket"]["breaker"]["state"], "open")
+
+
+class RecipeAsyncReadTestCase(RecipeAPITestCase):
+    """Test that the async read views answer exactly like the viewset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        for i in range(3):
+            Recipe.objects.create(
+                title=f"Miso Soup {i}",
+                description="Dashi and miso.",
+                image_bucket_key=f"recipes/miso-{i}.jpg",
+                owner=cls.user,
+            )
+        cls.recipe = Recipe.objects.first()
+        cls.list_url = reverse("core:recipes:recipe-list")
+        cls.detail_url = reverse("core:recipes:recipe-detail", args=[cls.recipe.pk])
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+
+    async def _get_list(self, params=None, headers=None):
+        request = self.factory.get(self.list_url, params or {}, headers=headers)
+        return await recipe_list(request)
+
+    async def _get_detail(self, pk, headers=None):
+        url = reverse("core:recipes:recipe-detail", args=[pk])
+        request = self.factory.get(url, headers=headers)
+        return await recipe_detail(request, pk=str(pk))
+
+    def _sync_json(self, url, params=None):
+        cache.clear()
+        response = self.client.get(url, params or {})
+        cache.clear()
+        return response.json()
+
+    async def test_list_matches_viewset(self):
+        """Test that list, search and cursor pages match the sync responses"""
+        for params in (
+            {},
+            {"page_size": 2, "page": 2},
+            {"pagination": "cursor", "page_size": 2},
+            {"search_term": "miso", "search_mode": "fulltext"},
+            {"search_term": "mso sup", "search_mode": "fuzzy"},
+        ):
+            with self.subTest(params=params):
+                expected = await sync_to_async(self._sync_json)(self.list_url, params)
+                response = await self._get_list(params)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(json.loads(response.content), expected)
+
+    @override_settings(RECIPES_FAST_LIST_SERIALIZER=True)
+    async def test_fast_list_matches_viewset(self):
+        """Test that the async fast path matches the sync fast path"""
+        expected = await sync_to_async(self._sync_json)(self.list_url)
+        response = await self._get_list()
+
+        self.assertEqual(json.loads(response.content), expected)
+
+    async def test_detail_matches_viewset(self):
+        """Test that detail matches the sync response and 404s like it"""
+        expected = await sync_to_async(self._sync_json)(self.detail_url)
+        response = await self._get_detail(self.recipe.pk)
+        self.assertEqual(json.loads(response.content), expected)
+
+        for pk in (0, "abc"):
+            response = await self._get_detail(pk)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_validators_and_cache(self):
+        """Test that ETags answer 304 and anonymous responses are cached"""
+        first = await self._get_list()
+        self.assertIn("ETag", first)
+
+        response = await self._get_list(headers={"if-none-match": first["ETag"]})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with mock.patch(
+            "apps.recipes.async_views.acollection_validators"
+        ) as validators:
+            cached = await self._get_list()
+        validators.assert_not_called()
+        self.assertEqual(cached.content, first.content)
+
+    async def test_token_authentication(self):
+        """Test that bearer tokens are checked and bad ones rejected"""
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self._get_detail(
+            self.recipe.pk, headers={"authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = await self._get_detail(
+            self.recipe.pk, headers={"authorization": "Bearer garbage"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_no_blocking_cache_calls_on_event_loop(self):
+        """Test that serializing image URLs only uses the async cache API"""
+        on_loop = []
+
+        def record(name):
+            method = getattr(cache, name)
+
+            def wrapper(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(name)
+                except RuntimeError:
+                    pass
+                return method(*args, **kwargs)
+
+            return mock.patch.object(cache, name, wrapper)
+
+        bucket.presigned_url_cache.clear()
+        with record("get"), record("add"), record("set"), record("get_many"):
+            response = await self._get_list()
+            detail = await self._get_detail(self.recipe.pk)
+
+        self.assertEqual(on_loop, [])
+        for recipe in [
+            *json.loads(response.content)["results"],
+            json.loads(detail.content),
+        ]:
+            self.assertTrue(recipe["image_download_url"])
+
+    async def test_profiled_reads_are_handed_to_viewset(self):
+        """Test that profiled reads run through the profiled viewset"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with override_settings(PROFILE_DIR=directory, PROFILE_SAMPLE_RATE=1.0):
+            response = await self._get_list()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("GET-RecipesViewSet", response["X-Profile-Id"])
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_writes_are_handed_to_viewset(self):
+        """Test that non-read methods keep the viewset's behaviour"""
+        request = self.factory.post(
+            self.list_url, {"title": "Udon"}, content_type="application/json"
+        )
+        response = async_to_sync(recipe_list)(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RecipeBulkTestCase(RecipeAPITestCase):
+    """Test the bulk create, update and delete endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        cls.other = User.objects.create_user(username="rival", password="secret-pass")
+        cls.url = reverse("core:recipes:recipe-bulk")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.mine = Recipe.objects.create(
+            title="Tortilla",
+            description="Eggs.",
+            image_bucket_key="recipes/tortilla.jpg",
+            owner=self.user,
+        )
+        self.theirs = Recipe.objects.create(
+            title="Gyoza", description="Dumplings.", owner=self.other
+        )
+
+    def test_create_in_one_insert(self):
+        """Test that valid items are inserted together and errors reported"""
+        items = [
+            {"title": f"Import {i}", "description": "Imported.", "steps": ["Cook"]}
+            for i in range(50)
+        ]
+        items.append({"description": "No title"})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results], [201] * 50 + [400])
+        self.assertIn("title", results[-1]["errors"])
+        self.assertEqual(results[0]["data"]["owner"], "chef")
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            Recipe.objects.filter(search_vector__isnull=False)
+            .filter(title__startswith="Import")
+            .count(),
+            50,
+        )
+
+    @mock.patch(
+        "apps.recipes.views.get_presigned_urls",
+        side_effect=lambda requests: [("https://put", None)] * len(requests),
+    )
+    def test_create_with_upload_urls(self, get_presigned_urls):
+        """Test that items can ask for presigned upload URLs"""
+        response = self.client.post(
+            self.url,
+            [
+                {
+                    "title": "Bao",
+                    "description": "Buns.",
+                    "request_presigned_url": True,
+                    "filename": "bao.png",
+                },
+                {"title": "Pho", "description": "Soup."},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        first, second = response.data["results"]
+        self.assertEqual(first["presigned_upload_url"], "https://put")
+        self.assertTrue(first["image_upload_key"].endswith(".png"))
+        self.assertNotIn("presigned_upload_url", second)
+        get_presigned_urls.assert_called_once()
+
+    def test_update_checks_owners_and_queues_images(self):
+        """Test that updates apply to owned recipes only, in one write"""
+        response = self.client.patch(
+            self.url,
+            [
+                {
+                    "id": self.mine.pk,
+                    "title": "Spanish Tortilla",
+                    "image_bucket_key": "recipes/new.jpg",
+                },
+                {"id": self.theirs.pk, "title": "Mine now"},
+                {"id": 0, "title": "Ghost"},
+                {"title": "No id"},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r["status"] for r in response.data["results"]], [200, 403, 404, 400]
+        )
+        self.assertEqual(
+            response.data["results"][0]["data"]["title"], "Spanish Tortilla"
+        )
+        self.mine.refresh_from_db()
+        self.theirs.refresh_from_db()
+        self.assertEqual(self.mine.title, "Spanish Tortilla")
+        self.assertEqual(self.theirs.title, "Gyoza")
+        self.assertEqual(
+            list(PendingObjectDeletion.objects.values_list("key", flat=True)),
+            ["recipes/tortilla.jpg"],
+        )
+        self.assertTrue(
+            Recipe.objects.filter(search_vector="spanish", pk=self.mine.pk).exists()
+        )
+
+    def test_delete(self):
+        """Test that owned recipes are deleted and their images queued"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                self.url, {"ids": [self.mine.pk, self.theirs.pk]}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        # delete() collects the rows for post_delete, filtered by owner
+        owner_filter = f'"recipes_recipe"."owner_id" = {self.user.pk}'
+        self.assertTrue(any(owner_filter in q["sql"] for q in queries))
+        self.assertEqual([r["status"] for r in response.data["results"]], [204, 403])
+        self.assertFalse(Recipe.objects.filter(pk=self.mine.pk).exists())
+        self.assertTrue(Recipe.objects.filter(pk=self.theirs.pk).exists())
+        self.assertEqual(
+            list(PendingObjectDeletion.objects.values_list("key", flat=True)),
+            ["recipes/tortilla.jpg"],
+        )
+
+    def test_ids_must_be_integers(self):
+        """Test that fractional and boolean ids are rejected, not truncated"""
+        updated = self.client.patch(
+            self.url,
+            [{"id": pk, "title": "Renamed"} for pk in (1.5, True)],
+            format="json",
+        )
+        deleted = self.client.delete(self.url, {"ids": [1.5, True]}, format="json")
+
+        for response in (updated, deleted):
+            self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+            for result in response.data["results"]:
+                self.assertEqual(result["status"], 400)
+                self.assertEqual(
+                    result["errors"], {"id": ["A valid integer is required."]}
+                )
+
+    def test_bulk_writes_invalidate_cache(self):
+        """Test that bulk writes drop cached list responses"""
+        self.client.force_authenticate(None)
+        list_url = reverse("core:recipes:recipe-list")
+        self.client.get(list_url)
+
+        self.client.force_authenticate(self.user)
+        self.client.post(
+            self.url, [{"title": "Dal", "description": "Lentils."}], format="json"
+        )
+
+        self.client.force_authenticate(None)
+        titles = [r["title"] for r in self.client.get(list_url).data["results"]]
+        self.assertIn("Dal", titles)
+
+    def test_bulk_delete_invalidates_cached_detail(self):
+        """Test that bulk deletes drop cached responses through post_delete"""
+        self.client.force_authenticate(None)
+        detail_url = reverse("core:recipes:recipe-detail", args=[self.mine.pk])
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(self.user)
+        self.client.delete(self.url, {"ids": [self.mine.pk]}, format="json")
+
+        self.client.force_authenticate(None)
+        response = self.client.get(detail_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rejects_bad_bodies(self):
+        """Test that non-list bodies and oversized batches are rejected"""
+        response = self.client.post(self.url, {"title": "x"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(RECIPES_BULK_MAX_ITEMS=1):
+            response = self.client.delete(self.url, {"ids": [1, 2]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(None)
+        response = self.client.delete(self.url, {"ids": [1]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RecipePresignedUrlBatchTestCase(RecipeAPITestCase):
+    """Test signing several presigned URLs in one request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chef", password="secret-pass")
+        cls.url = reverse("core:recipes:recipe-presigned-url")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_batch_signs_with_one_client_lookup(self):
+        """Test that a batch is signed in order with one client lookup"""
+        items = [{"method": "PUT", "filename": f"photo-{i}.jpg"} for i in range(20)] + [
+            {"method": "GET", "key": "tortilla.jpg", "expiration": 60}
+        ]
+
+        with mock.patch.object(
+            bucket, "get_bucket", wraps=bucket.get_bucket
+        ) as get_bucket:
+            response = self.client.post(self.url, items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        get_bucket.assert_called_once()
+        results = response.data["results"]
+        self.assertEqual([r["index"] for r in results], list(range(21)))
+        self.assertTrue(all(r["status"] == 200 for r in results))
+        self.assertEqual(len({r["key"] for r in results[:20]}), 20)
+        self.assertTrue(results[0]["key"].startswith("recipes/"))
+        self.assertEqual(results[-1]["key"], "recipes/tortilla.jpg")
+        self.assertEqual(results[-1]["method"], "GET")
+        self.assertEqual(results[-1]["expires_in"], 60)
+        self.assertIn("tortilla.jpg", results[-1]["presigned_url"])
+
+    def test_batch_reports_item_errors(self):
+        """Test that invalid items get their own errors and a 207"""
+        response = self.client.post(
+            self.url,
+            [
+                {"method": "PUT", "filename": "ok.jpg"},
+                {"filename": "no-method.jpg"},
+                {"method": "DELETE", "key": "recipes/a.jpg"},
+                {"method": "GET"},
+                {"method": "GET", "key": "a.jpg", "expiration": "soon"},
+                "not an object",
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results], [200] + [400] * 5)
+        self.assertEqual(results[1]["error"], "Method is required")
+        self.assertEqual(results[2]["error"], "Method must be GET or PUT")
+        self.assertEqual(results[3]["error"], "Key is required for GET")
+        self.assertIn("Expiration", results[4]["error"])
+
+    def test_put_cannot_target_existing_key(self):
+        """Test that uploads can't choose their key, e.g. another user's image"""
+        response = self.client.post(
+            self.url,
+            [
+                {"method": "PUT", "key": "recipes/someone-elses.jpg"},
+                {
+                    "method": "PUT",
+                    "key": "recipes/someone-elses.jpg",
+                    "filename": "mine.jpg",
+                },
+                {"method": "PUT"},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results], [400, 400, 400])
+        self.assertEqual(
+            results[0]["error"], "Key can't be set for PUT, send a filename"
+        )
+        self.assertEqual(results[2]["error"], "Filename is required for PUT")
+
+    def test_signing_failure_is_per_item(self):
+        """Test that an item that fails to sign doesn't fail the batch"""
+        with mock.patch(
+            "apps.recipes.views.get_presigned_urls",
+            return_value=[("https://get", None), (None, ValueError("boom"))],
+        ):
+            response = self.client.post(
+                self.url,
+                [{"method": "GET", "key": "a.jpg"}, {"method": "GET", "key": "b.jpg"}],
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        first, second = response.data["results"]
+        self.assertEqual(first["presigned_url"], "https://get")
+        self.assertEqual(second["status"], 500)
+        self.assertEqual(second["key"], "recipes/b.jpg")
+
+    @override_settings(PRESIGNED_URL_BATCH_MAX_ITEMS=2)
+    def test_batch_size_is_limited(self):
+        """Test that oversized and empty batches are rejected"""
+        item = {"method": "PUT", "filename": "a.jpg"}
+        response = self.client.post(self.url, [item] * 3, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(REQUEST_TIMING_HEADER=True)
+class RecipeServerTimingTestCase(RecipeAPITestCase):
+    """Test the time breakdown reported for recipe requests"""
+
+    def test_list_breakdown(self):
+        """Test that a list request reports queries, signing and serialization"""
+        owner = User.objects.create_user(username="chef", password="secret-pass")
+        Recipe.objects.create(
+            title="Paella",
+            description="Rice.",
+            image_bucket_key=f"recipes/{uuid.uuid4()}.jpg",
+            owner=owner,
+        )
+
+        with self.assertLogs("core.middleware", "DEBUG") as logs:
+            response = self.client.get(reverse("core:recipes:recipe-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* ')
+        line = logs.output[0]
+        self.assertIn("bucket_count=1", line)
+        self.assertIn("serialize_count=1", line)
+        self.assertIn("render_count=1", line)
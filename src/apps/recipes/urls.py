@@ -1,4 +1,5 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from . import views
@@ -6,8 +7,31 @@ from . import views
 router = DefaultRouter()
 router.register("", views.RecipesViewSet)
 
+
+def async_read_urls(patterns):
+    """Route the list and detail patterns to the async read views"""
+    from . import async_views
+
+    async_routes = {
+        "recipe-list": async_views.recipe_list,
+        "recipe-detail": async_views.recipe_detail,
+    }
+    return [
+        (
+            re_path(str(pattern.pattern), async_routes[pattern.name], name=pattern.name)
+            if pattern.name in async_routes
+            else pattern
+        )
+        for pattern in patterns
+    ]
+
+
+router_urls = router.urls
+if getattr(settings, "RECIPES_ASYNC_READS", False):
+    router_urls = async_read_urls(router_urls)
+
 urlpatterns = [
-    path("", include(router.urls)),
+    path("", include(router_urls)),
 ]
 
 app_name = "recipes"
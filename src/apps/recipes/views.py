@@ -1,17 +1,65 @@
-from django.db.models import Q
+import math
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 from rest_framework.response import Response
 
-from core.utils.bucket import generate_key, get_presigned_url
-
+from config.pagination import TastiCursorPagination, wants_cursor_pagination
+from core.utils.bucket import (
+    BucketUnavailable,
+    bucket_breaker,
+    generate_key,
+    get_presigned_url,
+    get_presigned_urls,
+)
+from core.utils.deletion_queue import enqueue_object_deletion
+from core.utils.profiling import ProfiledViewMixin
+
+from .bulk import bulk_create_recipes, bulk_delete_recipes, bulk_update_recipes
+from .cache import (
+    cache_response,
+    get_cached_response,
+    response_cache_key,
+)
+from .conditional import (
+    collection_validators,
+    conditional_response,
+    if_match_failed,
+    precondition_failed,
+    recipe_validators,
+    set_validators,
+)
 from .models import Recipe
 from .permissions import IsOwnerOrReadOnly
-from .serializers import RecipeDetailSerializer, RecipeSerializer
-
-
-class RecipesViewSet(viewsets.ModelViewSet):
+from .search import (
+    RANKED_SEARCH_MODES,
+    SEARCH_MODE_CONTAINS,
+    SEARCH_MODES,
+    is_fuzzy_search,
+    search_recipes,
+    trigram_threshold,
+)
+from .serializers import (
+    RecipeDetailSerializer,
+    RecipeSerializer,
+    recipe_list_fast_serializer,
+)
+
+DEFAULT_BULK_MAX_ITEMS = 1000
+DEFAULT_PRESIGNED_URL_BATCH_MAX_ITEMS = 100
+# S3 rejects presigned URLs that expire more than 7 days out
+MAX_PRESIGNED_URL_EXPIRATION = 7 * 24 * 3600
+
+
+class RecipesViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing recipes.
 
@@ -29,48 +77,172 @@ class RecipesViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly)
+    cursor_pagination_class = TastiCursorPagination
+
+    def dispatch(self, request, *args, **kwargs):
+        """Evaluate fuzzy searches under their similarity threshold."""
+        if request.method in ("GET", "HEAD") and is_fuzzy_search(request.GET):
+            with trigram_threshold():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    @property
+    def paginator(self):
+        """
+        Page-number pagination by default; keyset pagination when the client
+        sends `pagination=cursor` or a `cursor` token.
+        """
+        if not hasattr(self, "_paginator"):
+            if wants_cursor_pagination(self.request):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
 
     def get_queryset(self):
         """
         Optionally restricts the returned recipes to a given search term,
         by filtering against a `search_term` query parameter in the URL.
+
+        `search_mode` selects the backend: `contains` (default, substring
+        match), `fulltext` (ranked match over title, description and steps)
+        or `fuzzy` (typo-tolerant title match).
+
+        Reads join the owner so that serializing a page costs a fixed number
+        of queries, and columns the response doesn't use are deferred.
+        Writes don't: the ownership check only needs `owner_id`, so a
+        rejected write never touches the user table.
         """
         queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            queryset = queryset.select_related("owner")
+        if self.action == "list":
+            queryset = queryset.defer("steps", "search_vector")
+        else:
+            queryset = queryset.defer("search_vector")
+
         search_term = self.request.query_params.get("search_term", None)
         if search_term is not None:
+            search_mode = self.request.query_params.get(
+                "search_mode", SEARCH_MODE_CONTAINS
+            ).lower()
+            if search_mode not in SEARCH_MODES:
+                raise ValidationError(
+                    {"search_mode": f"Must be one of: {', '.join(SEARCH_MODES)}."}
+                )
+            # Cursors seek on (created_at, id), which would drop the ranking
+            if search_mode in RANKED_SEARCH_MODES and wants_cursor_pagination(
+                self.request
+            ):
+                raise ValidationError(
+                    {
+                        "pagination": "Cursor pagination isn't available for "
+                        f"{search_mode} searches, which are ordered by relevance."
+                    }
+                )
+
             search_in_description = self.request.query_params.get(
                 "search_in_description", "false"
             ).lower() in ("true", "1")
 
-            queries = Q(title__icontains=search_term)
-            if search_in_description:
-                queries |= Q(description__icontains=search_term)
-
-            queryset = queryset.filter(queries)
+            queryset = search_recipes(
+                queryset, search_term, search_mode, search_in_description
+            )
 
         return queryset
 
+    def get_object(self):
+        """Look the recipe up once per request."""
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
+
+    def list(self, request, *args, **kwargs):
+        """
+        List (and search) recipes. With `RECIPES_FAST_LIST_SERIALIZER` on,
+        rows are fetched with `.values()` and serialized by the read-only
+        fast path instead of `RecipeSerializer`; the payload is identical.
+
+        Responses carry an ETag and short-circuit to 304 Not Modified
+        before any row is fetched. Anonymous responses are served from the
+        response cache when possible.
+        """
+        cache_key = response_cache_key(request, self.action)
+        if cache_key is not None:
+            cached = get_cached_response(request, cache_key)
+            if cached is not None:
+                return cached
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Read before the page, so a concurrent write can only make the ETag
+        # older than the body, never newer
+        etag, last_modified = collection_validators(queryset, request)
+
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = self._list_response(queryset)
+            if cache_key is not None:
+                cache_response(response, cache_key, etag, last_modified)
+        return set_validators(response, etag, last_modified)
+
+    def _list_response(self, queryset):
+        if getattr(settings, "RECIPES_FAST_LIST_SERIALIZER", False):
+            rows = queryset.values(*recipe_list_fast_serializer.values_fields)
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(
+                    recipe_list_fast_serializer.serialize(page)
+                )
+            return Response(recipe_list_fast_serializer.serialize(rows))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering 304 Not Modified when unchanged."""
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        cache_key = response_cache_key(request, self.action, pk)
+        if cache_key is not None:
+            cached = get_cached_response(request, cache_key)
+            if cached is not None:
+                return cached
+
+        instance = self.get_object()
+
+        etag, last_modified = recipe_validators(instance, request)
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+            if cache_key is not None:
+                cache_response(response, cache_key, etag, last_modified)
+        return set_validators(response, etag, last_modified)
+
+    def update(self, request, *args, **kwargs):
+        """
+        Update a recipe. An `If-Match` header that doesn't match the
+        recipe's current ETag is rejected with 412 Precondition Failed.
+        """
+        instance = self.get_object()
+        if if_match_failed(request, instance):
+            return precondition_failed()
+
+        response = super().update(request, *args, **kwargs)
+        return set_validators(response, *recipe_validators(instance, request))
+
     def perform_create(self, serializer):
         """Set the owner to the current user when creating a recipe."""
         serializer.save(owner=self.request.user)
 
     def perform_destroy(self, instance):
-        """Delete the recipe and its image from S3."""
-        # Store the key before deletion
-        image_key = instance.image_bucket_key
-
-        # Delete the recipe first
-        super().perform_destroy(instance)
-
-        # If recipe deletion succeeded and there was an image, delete it
-        if image_key:
-            try:
-                from core.utils.bucket import delete_object
-
-                delete_object(image_key)
-            except Exception:
-                # Log error but don't fail since recipe is already deleted
-                pass
+        """Delete the recipe and queue its image for deletion from S3."""
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            enqueue_object_deletion(instance.image_bucket_key)
 
     def _generate_upload_url(self, filename="image"):
         """Generate presigned upload URL data."""
@@ -104,10 +276,95 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
         return Response(response_data, status=201, headers=headers)
 
+    @action(
+        detail=False,
+        methods=["post", "patch", "delete"],
+        url_path="bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk(self, request):
+        """
+        Create, update or delete many recipes in one request.
+
+        - POST a list of recipes (each may set `request_presigned_url` and
+          `filename` to get an upload URL)
+        - PATCH a list of `{"id": ..., <fields>}` partial updates
+        - DELETE `{"ids": [...]}`
+
+        Every item gets its own result with an HTTP-style `status`; the
+        response is 207 Multi-Status when some items failed.
+        """
+        max_items = getattr(settings, "RECIPES_BULK_MAX_ITEMS", DEFAULT_BULK_MAX_ITEMS)
+        if request.method == "DELETE":
+            items = request.data.get("ids") if isinstance(request.data, dict) else None
+            field = "ids"
+        else:
+            items = request.data
+            field = "non_field_errors"
+        if not isinstance(items, list) or not items:
+            raise ValidationError({field: ["Expected a non-empty list."]})
+        if len(items) > max_items:
+            raise ValidationError({field: [f"At most {max_items} items per request."]})
+
+        context = self.get_serializer_context()
+        if request.method == "POST":
+            results, created = bulk_create_recipes(items, request.user, context)
+            self._add_bulk_created_data(results, created, items)
+            success = status.HTTP_201_CREATED
+        elif request.method == "PATCH":
+            results, updated = bulk_update_recipes(items, request.user, context)
+            for (index, recipe), data in zip(
+                updated,
+                self.get_serializer([recipe for _, recipe in updated], many=True).data,
+            ):
+                results[index]["data"] = data
+            success = status.HTTP_200_OK
+        else:
+            results = bulk_delete_recipes(items, request.user)
+            success = status.HTTP_200_OK
+
+        failed = any(result["status"] >= 400 for result in results)
+        return Response(
+            {"results": results},
+            status=status.HTTP_207_MULTI_STATUS if failed else success,
+        )
+
+    def _add_bulk_created_data(self, results, created, items):
+        recipes = [recipe for _, recipe, _ in created]
+        serialized = self.get_serializer(recipes, many=True).data
+        uploads = []
+        for (index, _, wants_url), data in zip(created, serialized):
+            results[index]["data"] = data
+            if wants_url:
+                filename = items[index].get("filename", "image")
+                uploads.append((index, generate_key("recipes", filename)))
+        if not uploads:
+            return
+
+        try:
+            signed = get_presigned_urls([(key, "PUT", 3600) for _, key in uploads])
+        except Exception as e:
+            signed = [(None, e)] * len(uploads)
+        for (index, key), (url, error) in zip(uploads, signed):
+            if error is None:
+                results[index].update(
+                    {"presigned_upload_url": url, "image_upload_key": key}
+                )
+            else:
+                results[index]["presigned_url_error"] = (
+                    "Failed to generate upload URL, but recipe was created successfully"
+                )
+
     @action(detail=True, methods=["patch"], permission_classes=[IsOwnerOrReadOnly])
     def update_image(self, request, pk=None):
-        """Update or clear the recipe's image based on the provided key."""
+        """
+        Update or clear the recipe's image based on the provided key. A
+        stale `If-Match` header is rejected with 412 Precondition Failed.
+        """
         recipe = self.get_object()
+        if if_match_failed(request, recipe):
+            return precondition_failed()
+
         key = request.data.get("image_bucket_key")
 
         # Clear image if key is None, empty, or whitespace-only
@@ -146,12 +403,13 @@ class RecipesViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["post"], permission_classes=[IsAuthenticated])
     def presigned_url(self, request):
         """Generate presigned URLs for S3 operations (GET, PUT)"""
+        if isinstance(request.data, list):
+            return self._presigned_url_batch(request.data)
+
         method = request.data.get("method")
         filename = request.data.get("filename")
         expiration = request.data.get("expiration", 3600)
 
-        print("Presigned URL request data:", request.data)
-
         # Validate request and get normalized key
         validation_error, normalized_key = self._validate_presigned_request(method, "")
         if validation_error:
@@ -171,8 +429,126 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 }
             )
 
+        except BucketUnavailable:
+            retry_in = bucket_breaker.stats()["retry_in"] or 0
+            return Response(
+                {"error": "Image storage is temporarily unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(math.ceil(retry_in) or 1)},
+            )
         except Exception as e:
             return Response(
                 {"error": f"Error generating presigned URL: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+    def _presigned_url_batch(self, items):
+        """
+        Sign a list of `{method, key|filename, expiration}` items at once.
+
+        Each item gets its own result with an HTTP-style `status`; the
+        response is 207 Multi-Status when some items failed.
+        """
+        max_items = getattr(
+            settings,
+            "PRESIGNED_URL_BATCH_MAX_ITEMS",
+            DEFAULT_PRESIGNED_URL_BATCH_MAX_ITEMS,
+        )
+        if not items:
+            raise ValidationError({"non_field_errors": ["Expected a non-empty list."]})
+        if len(items) > max_items:
+            raise ValidationError(
+                {"non_field_errors": [f"At most {max_items} items per request."]}
+            )
+
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            error, request = self._parse_presigned_item(item)
+            if error:
+                results[index] = {
+                    "index": index,
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "error": error,
+                }
+            else:
+                pending.append((index, request))
+
+        if pending:
+            try:
+                signed = get_presigned_urls([request for _, request in pending])
+            except BucketUnavailable:
+                retry_in = bucket_breaker.stats()["retry_in"] or 0
+                return Response(
+                    {"error": "Image storage is temporarily unavailable"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": str(math.ceil(retry_in) or 1)},
+                )
+
+            for (index, (key, method, expiration)), (url, error) in zip(
+                pending, signed
+            ):
+                if error is not None:
+                    results[index] = {
+                        "index": index,
+                        "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        "key": key,
+                        "error": f"Error generating presigned URL: {error}",
+                    }
+                    continue
+                results[index] = {
+                    "index": index,
+                    "status": status.HTTP_200_OK,
+                    "presigned_url": url,
+                    "key": key,
+                    "method": method,
+                    "expires_in": expiration,
+                }
+
+        failed = any(result["status"] >= 400 for result in results)
+        return Response(
+            {"results": results},
+            status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK,
+        )
+
+    def _parse_presigned_item(self, item):
+        """Return (error, (key, method, expiration)) for one batch item."""
+        if not isinstance(item, dict):
+            return "Each item must be an object", None
+        for field in ("method", "key", "filename"):
+            if item.get(field) is not None and not isinstance(item[field], str):
+                return f"{field.capitalize()} must be a string", None
+
+        method = item.get("method")
+        key = item.get("key") or ""
+        filename = item.get("filename")
+        validation_error, normalized_key = self._validate_presigned_request(method, key)
+        if validation_error:
+            return validation_error.data["error"], None
+        if method.upper() == "PUT":
+            # Uploads always get a fresh key, so they can't overwrite
+            # existing objects
+            if key:
+                return "Key can't be set for PUT, send a filename", None
+            if not filename:
+                return "Filename is required for PUT", None
+        elif not key:
+            return "Key is required for GET", None
+
+        expiration = item.get("expiration", 3600)
+        if (
+            isinstance(expiration, bool)
+            or not isinstance(expiration, int)
+            or not 1 <= expiration <= MAX_PRESIGNED_URL_EXPIRATION
+        ):
+            return (
+                "Expiration must be an integer between 1 and "
+                f"{MAX_PRESIGNED_URL_EXPIRATION} seconds"
+            ), None
+
+        method = method.upper()
+        return None, (
+            self._build_presigned_key(normalized_key, method, filename),
+            method,
+            expiration,
+        )
@@ -0,0 +1,19 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from apps.accounts.hashing import UNAVAILABLE_MESSAGE, HashingUnavailable
+
+
+def exception_handler(exc, context):
+    """
+    DRF's exception handler, plus a 503 with Retry-After while too many
+    password hashes are pending, whichever view started the hash.
+    """
+    if isinstance(exc, HashingUnavailable):
+        return Response(
+            {"error": UNAVAILABLE_MESSAGE},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return drf_exception_handler(exc, context)
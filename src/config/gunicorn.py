@@ -0,0 +1,43 @@
+"""
+Gunicorn settings: `gunicorn -c config/gunicorn.py config.wsgi`.
+
+Sets up Prometheus multiprocess mode so `/metrics` reports the sum over
+all workers whichever worker answers the scrape. Refuses to start several
+workers on a process-local cache (no `REDIS_URL`): each worker would keep
+serving cached responses the others have invalidated.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Must be set before any worker imports prometheus_client
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "tasti-prometheus"),
+)
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+
+
+def on_starting(server):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    from core.utils.caches import is_shared_cache
+
+    if server.cfg.workers > 1 and not is_shared_cache():
+        raise RuntimeError(
+            f"{server.cfg.workers} workers need a shared cache: set REDIS_URL, "
+            "or GUNICORN_WORKERS=1"
+        )
+
+    # Samples left by a previous master would be added to this one's
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
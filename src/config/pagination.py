@@ -1,14 +1,206 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import (
+    EmptyPage,
+    InvalidPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 DEFAULT_PAGE = 1
 DEFAULT_PAGE_SIZE = 10
+DEFAULT_COUNT_ESTIMATE_THRESHOLD = 10000
+
+
+async def _afetch(object_list):
+    """Evaluate a (sliced) queryset through the async ORM"""
+    if isinstance(object_list, QuerySet):
+        return [obj async for obj in object_list]
+    return list(object_list)
+
+
+class EstimatedPage(Page):
+    """Page whose next-page check doesn't rely on an exact total"""
+
+    has_more = False
+
+    def has_next(self):
+        if self.paginator.count_is_exact:
+            return super().has_next()
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids `SELECT COUNT(*)` on large result sets.
+
+    The total comes from the Postgres planner: `pg_class.reltuples` for an
+    unfiltered table, `EXPLAIN` row estimates for a filtered queryset. Only
+    when the estimate is below `estimate_threshold` is the exact count run,
+    so small tables and narrow searches still report exact totals.
+    `count_is_exact` tells which one was used.
+    """
+
+    def __init__(self, *args, estimate_threshold=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if estimate_threshold is None:
+            estimate_threshold = getattr(
+                settings,
+                "PAGINATION_COUNT_ESTIMATE_THRESHOLD",
+                DEFAULT_COUNT_ESTIMATE_THRESHOLD,
+            )
+        self.estimate_threshold = estimate_threshold
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < self.estimate_threshold:
+            self.count_is_exact = True
+            return Paginator.count.func(self)
+        self.count_is_exact = False
+        return estimate
+
+    def estimate_count(self):
+        """Planner row estimate for the object list, or None if unavailable"""
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                # reltuples is -1 until the table is first analyzed
+                if row is None or row[0] < 0:
+                    return None
+                return row[0]
+
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+
+    def validate_number(self, number):
+        self.count  # decides whether the total is exact
+        if self.count_is_exact:
+            return super().validate_number(number)
+
+        # The estimate may be low, so never reject a page for being past it
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            return super().page(number)
+
+        # Fetch one extra row to find out whether there is a further page
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom : bottom + self.per_page + 1])
+        return self._estimated_page(object_list, number)
+
+    def _estimated_page(self, object_list, number):
+        if not object_list and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+
+        page = self._get_page(object_list[: self.per_page], number, self)
+        page.has_more = len(object_list) > self.per_page
+        return page
+
+    async def acount(self):
+        """`count` for async callers; later reads of `count` don't query"""
+        if "count" not in self.__dict__:
+            estimate = await sync_to_async(self.estimate_count)()
+            if estimate is None or estimate < self.estimate_threshold:
+                self.count_is_exact = True
+                if isinstance(self.object_list, QuerySet):
+                    count = await self.object_list.acount()
+                else:
+                    count = len(self.object_list)
+            else:
+                self.count_is_exact = False
+                count = estimate
+            self.__dict__["count"] = count
+        return self.count
+
+    async def apage(self, number):
+        """`page()` for async callers, with the page's rows already fetched"""
+        await self.acount()
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if not self.count_is_exact:
+            object_list = await _afetch(
+                self.object_list[bottom : bottom + self.per_page + 1]
+            )
+            return self._estimated_page(object_list, number)
+
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        object_list = await _afetch(self.object_list[bottom:top])
+        return self._get_page(object_list, number, self)
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedPage(*args, **kwargs)
 
 
 class TastiPagination(PageNumberPagination):
     page = DEFAULT_PAGE
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = "page_size"
+    django_paginator_class = EstimatedCountPaginator
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` for async views, using the async ORM"""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        await paginator.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = await paginator.apage(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
 
     def get_paginated_response(self, data):
         return Response(
@@ -18,9 +210,148 @@ class TastiPagination(PageNumberPagination):
                     "previous": self.get_previous_link(),
                 },
                 "total": self.page.paginator.count,
+                "total_is_exact": self.page.paginator.count_is_exact,
                 "total_pages": self.page.paginator.num_pages,
                 "current_page": self.page.number,
                 "page_size": self.get_page_size(self.request),
                 "results": data,
             }
         )
+
+
+class TastiCursorPagination(CursorPagination):
+    """
+    Keyset pagination seeking on (created_at, id), newest first.
+
+    Each page is fetched with an indexed range condition on the last row the
+    client saw, so page 5000 costs the same as page 1. Cursors are opaque
+    tokens carried in the same `links` envelope as `TastiPagination`.
+    """
+
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = "page_size"
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, reverse = self._page_queryset(queryset, request)
+        return self._set_page(list(queryset), reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` for async views, using the async ORM"""
+        queryset, reverse = self._page_queryset(queryset, request)
+        return self._set_page(await _afetch(queryset), reverse)
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = remove_query_param(request.build_absolute_uri(), "page")
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            reverse = False
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            created_at, pk, reverse = self.cursor
+            if reverse:
+                queryset = (
+                    queryset.filter(created_at__gte=created_at)
+                    .filter(Q(created_at__gt=created_at) | Q(id__gt=pk))
+                    .order_by("created_at", "id")
+                )
+            else:
+                queryset = (
+                    queryset.filter(created_at__lte=created_at)
+                    .filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+                    .order_by(*self.ordering)
+                )
+
+        # Fetch one extra row to find out whether there is a further page
+        return queryset[: self.page_size + 1], reverse
+
+    def _set_page(self, results, reverse):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            reverse, created_at, pk = (
+                urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            )
+            created_at = parse_datetime(created_at)
+            if created_at is None or reverse not in ("0", "1"):
+                raise ValueError
+            return created_at, int(pk), reverse == "1"
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse=False):
+        created_at, pk = self._get_position(item)
+        token = f"{int(reverse)}|{created_at.isoformat()}|{pk}"
+        encoded = urlsafe_b64encode(token.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position(self, item):
+        if isinstance(item, dict):
+            return item["created_at"], item["id"]
+        return item.created_at, item.pk
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "links": {
+                    "next": self.get_next_link(),
+                    "previous": self.get_previous_link(),
+                },
+                "page_size": self.page_size,
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "links": {
+                    "type": "object",
+                    "properties": {
+                        "next": {"type": "string", "nullable": True},
+                        "previous": {"type": "string", "nullable": True},
+                    },
+                },
+                "page_size": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+
+def wants_cursor_pagination(request):
+    """Whether the client asked for cursor pagination on this request"""
+    params = request.query_params
+    return (
+        TastiCursorPagination.cursor_query_param in params
+        or params.get("pagination") == "cursor"
+    )
@@ -0,0 +1,69 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.utils.timing import RENDER, track
+
+_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """
+    Fallback for types the fast encoders don't handle natively.
+
+    Delegates to DRF's JSONEncoder so datetimes, timedeltas, Decimals, UUIDs
+    and lazy strings are represented exactly as with the stock renderer.
+    """
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Output matches `JSONRenderer` for compact responses; indented output
+    (e.g. the browsable API) still goes through the stdlib encoder.
+    """
+
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            with track(RENDER):
+                return super().render(data, accepted_media_type, renderer_context)
+
+        with track(RENDER):
+            ret = orjson.dumps(data, default=encode_default, option=self.options)
+
+        # Keep the output a strict javascript subset, like JSONRenderer
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer which serializes to MessagePack, selected with
+    `Accept: application/msgpack` or `?format=msgpack`.
+
+    Values are represented as in the JSON responses (ISO 8601 datetimes,
+    durations and Decimals as the JSON renderer writes them).
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        with track(RENDER):
+            return msgpack.packb(
+                data, default=encode_default, use_bin_type=True, datetime=False
+            )
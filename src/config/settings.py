@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 from socket import gethostbyname, gethostname
@@ -82,6 +83,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
     # Rest
     "rest_framework",
     "corsheaders",
@@ -100,6 +102,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ServerTimingMiddleware",
+    "core.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -109,6 +113,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "apps.accounts.middleware.HashingUnavailableMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -145,6 +150,27 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; set REDIS_URL to share the cache between workers
+# (config/gunicorn.py refuses more than one worker without it)
+REDIS_URL = env("REDIS_URL", default=None)
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # FILE STORAGE(S3)
 AWS_ACCESS_KEY_ID = env("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = env("AWS_SECRET_ACCESS_KEY")
@@ -154,6 +180,85 @@ AWS_S3_ENDPOINT_URL = env("AWS_S3_ENDPOINT_URL", default=None)
 AWS_DEFAULT_ACL = env("AWS_DEFAULT_ACL", default=None)
 AWS_S3_VERIFY = env.bool("AWS_S3_VERIFY", default=True)
 
+# Shared S3 client: connection pool size, timeouts (seconds) and retries
+AWS_S3_MAX_POOL_CONNECTIONS = env.int("AWS_S3_MAX_POOL_CONNECTIONS", default=50)
+AWS_S3_CONNECT_TIMEOUT = env.float("AWS_S3_CONNECT_TIMEOUT", default=2)
+AWS_S3_READ_TIMEOUT = env.float("AWS_S3_READ_TIMEOUT", default=10)
+AWS_S3_RETRY_MODE = env("AWS_S3_RETRY_MODE", default="standard")
+AWS_S3_MAX_ATTEMPTS = env.int("AWS_S3_MAX_ATTEMPTS", default=3)
+AWS_S3_TCP_KEEPALIVE = env.bool("AWS_S3_TCP_KEEPALIVE", default=True)
+
+# Bucket calls give up after BUCKET_CALL_DEADLINE seconds. After
+# BUCKET_BREAKER_FAILURE_THRESHOLD consecutive failures they fail fast for
+# BUCKET_BREAKER_RESET_TIMEOUT seconds and image URLs are served as null
+BUCKET_CALL_DEADLINE = env.float("BUCKET_CALL_DEADLINE", default=5)
+BUCKET_BREAKER_FAILURE_THRESHOLD = env.int(
+    "BUCKET_BREAKER_FAILURE_THRESHOLD", default=5
+)
+BUCKET_BREAKER_RESET_TIMEOUT = env.float("BUCKET_BREAKER_RESET_TIMEOUT", default=30)
+
+# Per-request time breakdown (db, bucket, serialize, render) logged at DEBUG
+# for every request and, with REQUEST_TIMING_HEADER (on when DEBUG), sent to
+# clients as a Server-Timing header
+REQUEST_TIMING = env.bool("REQUEST_TIMING", default=True)
+REQUEST_TIMING_HEADER = env.bool("REQUEST_TIMING_HEADER", default=DEBUG)
+
+# Verified access tokens are cached until they expire and user rows for
+# JWT_AUTH_USER_CACHE_TTL seconds, per process; user changes are shared
+# through CACHES. With JWT_AUTH_CLAIMS_ONLY_READS, reads authenticate from
+# the token claims alone, without a user query; ignored without REDIS_URL,
+# since other workers would not see a user's changes
+JWT_AUTH_CACHE_SIZE = env.int("JWT_AUTH_CACHE_SIZE", default=10000)
+JWT_AUTH_USER_CACHE_TTL = env.int("JWT_AUTH_USER_CACHE_TTL", default=60)
+JWT_AUTH_CLAIMS_ONLY_READS = env.bool("JWT_AUTH_CLAIMS_ONLY_READS", default=False)
+
+# Each login starts a refresh token family; presenting a rotated refresh
+# token after REFRESH_TOKEN_REUSE_GRACE seconds revokes the family. With
+# REFRESH_TOKEN_REVOCATION_FILTER, access tokens of revoked families (e.g.
+# after logout) are rejected too, using a Bloom filter rebuilt every
+# REFRESH_TOKEN_REVOCATION_FILTER_REFRESH seconds
+REFRESH_TOKEN_REUSE_GRACE = env.int("REFRESH_TOKEN_REUSE_GRACE", default=10)
+REFRESH_TOKEN_REVOCATION_FILTER = env.bool(
+    "REFRESH_TOKEN_REVOCATION_FILTER", default=False
+)
+REFRESH_TOKEN_REVOCATION_FILTER_CAPACITY = env.int(
+    "REFRESH_TOKEN_REVOCATION_FILTER_CAPACITY", default=100000
+)
+REFRESH_TOKEN_REVOCATION_FILTER_REFRESH = env.int(
+    "REFRESH_TOKEN_REVOCATION_FILTER_REFRESH", default=60
+)
+
+# Password hashes run in a pool of PASSWORD_HASHING_WORKERS processes per
+# server process (0, the default, hashes in the request thread). Past
+# PASSWORD_HASHING_MAX_PENDING queued hashes per server process, sign-ins
+# answer 503 with Retry-After: PASSWORD_HASHING_RETRY_AFTER
+PASSWORD_HASHING_WORKERS = env.int("PASSWORD_HASHING_WORKERS", default=0)
+PASSWORD_HASHING_MAX_PENDING = env.int("PASSWORD_HASHING_MAX_PENDING", default=8)
+PASSWORD_HASHING_RETRY_AFTER = env.int("PASSWORD_HASHING_RETRY_AFTER", default=1)
+
+# Prometheus metrics at /metrics, off unless enabled; set METRICS_TOKEN to
+# require `Authorization: Bearer <token>` on scrapes
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=False)
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Profile recipe and auth requests picked at PROFILE_SAMPLE_RATE or sent with
+# an `X-Profile` token from `manage.py profile_token`. The newest
+# PROFILE_MAX_DUMPS profiles are kept in PROFILE_DIR
+PROFILE_SAMPLE_RATE = env.float("PROFILE_SAMPLE_RATE", default=0.0)
+PROFILE_TOKEN_MAX_AGE = env.int("PROFILE_TOKEN_MAX_AGE", default=3600)
+PROFILE_SAMPLE_INTERVAL = env.float("PROFILE_SAMPLE_INTERVAL", default=0.005)
+PROFILE_MAX_DUMPS = env.int("PROFILE_MAX_DUMPS", default=50)
+PROFILE_DIR = env(
+    "PROFILE_DIR", default=os.path.join(tempfile.gettempdir(), "tasti-profiles")
+)
+
+# Presigned download URLs are signed once per window and shared through the cache
+PRESIGNED_URL_WINDOW = env.int("PRESIGNED_URL_WINDOW", default=3600)
+PRESIGNED_URL_CACHE_SIZE = env.int("PRESIGNED_URL_CACHE_SIZE", default=10000)
+
+# Maximum items in one batch request to the presigned URL endpoint
+PRESIGNED_URL_BATCH_MAX_ITEMS = env.int("PRESIGNED_URL_BATCH_MAX_ITEMS", default=100)
+
 # Storage configuration
 STORAGES = {
     "default": {
@@ -224,16 +329,58 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.accounts.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.renderers.ORJSONRenderer",
+        "config.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.parsers.ORJSONParser",
+        "config.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "config.pagination.TastiPagination",
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "EXCEPTION_HANDLER": "config.exceptions.exception_handler",
     "PAGE_SIZE": env("PAGE_SIZE"),
 }
 
+# Result sets estimated above this many rows report the planner's estimate
+# as `total` instead of running COUNT(*)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = env.int(
+    "PAGINATION_COUNT_ESTIMATE_THRESHOLD", default=10000
+)
+
+
+# Recipe search
+# Minimum pg_trgm word similarity for `search_mode=fuzzy` (0..1)
+RECIPE_SEARCH_TRIGRAM_THRESHOLD = env.float(
+    "RECIPE_SEARCH_TRIGRAM_THRESHOLD", default=0.5
+)
+
+
+# Serialize recipe list/search pages from .values() rows instead of
+# RecipeSerializer (same payload, less CPU per request)
+RECIPES_FAST_LIST_SERIALIZER = env.bool("RECIPES_FAST_LIST_SERIALIZER", default=False)
+
+# Serve recipe list, search and detail reads from async views (use with an
+# ASGI server, e.g. `uvicorn config.asgi:application`)
+RECIPES_ASYNC_READS = env.bool("RECIPES_ASYNC_READS", default=False)
+
+# Maximum items in one request to the recipes bulk endpoint
+RECIPES_BULK_MAX_ITEMS = env.int("RECIPES_BULK_MAX_ITEMS", default=1000)
+
+
+# Seconds anonymous recipe list/detail responses stay cached (capped at the
+# end of the current presigned URL window)
+RECIPES_RESPONSE_CACHE_TIMEOUT = env.int("RECIPES_RESPONSE_CACHE_TIMEOUT", default=60)
+
 
 # djangorestframework-simplejwt
 # https://django-rest-framework-simplejwt.readthedocs.io/
@@ -266,8 +413,13 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "if-match",
+    "if-none-match",
+    "if-modified-since",
 ]
 
+CORS_EXPOSE_HEADERS = ["etag", "last-modified"]
+
 # Cookie Settings
 COOKIE_SECURE = not DEBUG
 COOKIE_SAMESITE = "Lax" if DEBUG else "None"
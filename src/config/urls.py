@@ -17,11 +17,18 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import (
+    SpectacularAPIView,
+    SpectacularRedocView,
+    SpectacularSwaggerView,
+)
+
+from core.views import metrics
 
 urlpatterns = [
     path("admin/", admin.site.urls),  # admin endpoints
     path("api/v1/", include("core.urls")),  # API endpoints
+    path("metrics", metrics, name="metrics"),  # Prometheus scrape endpoint
     # API documentation endpoints
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     # Optional UI:
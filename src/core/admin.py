@@ -1 +1,10 @@
-# Register your models here.
+from django.contrib import admin
+
+from .models import PendingObjectDeletion
+
+
+@admin.register(PendingObjectDeletion)
+class PendingObjectDeletionAdmin(admin.ModelAdmin):
+    list_display = ["id", "key", "created_at", "attempts", "last_error"]
+    search_fields = ["key"]
+    ordering = ["created_at"]
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def install_query_timer(sender, connection, **kwargs):
+    from core.utils.timing import record_query
+
+    # The same wrapper object reconnects, so only install once. Insert it
+    # first: execute_wrapper() blocks open while connecting pop the last one
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        connection_created.connect(install_query_timer)
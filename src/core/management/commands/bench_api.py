@@ -0,0 +1,502 @@
+import http.client
+import itertools
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+
+from apps.accounts.models import RefreshTokenFamily
+from apps.accounts.utils.tokens import issue_tokens
+
+User = get_user_model()
+
+API_PREFIX = "/api/v1"
+RECIPES_PATH = f"{API_PREFIX}/recipes/"
+BENCH_USERNAME = "bench-user"
+SEARCH_TERMS = ["chicken", "soup", "pasta", "chocolate", "salad"]
+SCENARIOS = [
+    "list",
+    "deep_page",
+    "deep_cursor",
+    "search",
+    "detail",
+    "create",
+    "token_refresh",
+    "presigned_url",
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _path(url):
+    """Strip scheme and host from a pagination link"""
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+class InProcessTransport:
+    """Send requests through Django's test client, counting queries"""
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, body=None, headers=None):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        extra = {
+            f"HTTP_{name.upper().replace('-', '_')}": value
+            for name, value in (headers or {}).items()
+        }
+        data = json.dumps(body) if body is not None else None
+        with connection.execute_wrapper(count):
+            response = self.client.generic(
+                method,
+                path,
+                data or "",
+                content_type="application/json",
+                **extra,
+            )
+        return response.status_code, response.content, queries
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    """Send requests to a running server over one keep-alive connection"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=30)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = {"Accept": "application/json", **(headers or {})}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.connection.request(method, path, body=data, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.read(), None
+        except (http.client.HTTPException, OSError):
+            # Reconnect on the next request
+            self.connection.close()
+            raise
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API in-process or against a running server and report "
+        "latency percentiles, requests per second and queries per request as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server sharing this database "
+            "(default: in-process through the test client)",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            choices=SCENARIOS,
+            help="Scenario to run (repeatable, default: all)",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Measured requests per scenario",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Unmeasured requests per scenario before measuring",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Concurrent clients",
+        )
+        parser.add_argument(
+            "--page-sizes",
+            default="10,20,100",
+            help="Comma-separated page sizes for the list scenario",
+        )
+        parser.add_argument(
+            "--depth",
+            type=int,
+            default=50,
+            help="Pages to skip for the deep pagination scenarios",
+        )
+        parser.add_argument(
+            "--label",
+            help="Free-form label stored with the results, e.g. a commit",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON report to this file instead of stdout",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be at least 1")
+        try:
+            page_sizes = [int(size) for size in options["page_sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--page-sizes must be comma-separated integers")
+
+        base_url = options["url"]
+        if base_url:
+            base_url = base_url.rstrip("/")
+            transport_factory = lambda: HttpTransport(base_url)  # noqa: E731
+        else:
+            transport_factory = InProcessTransport
+
+        # Tokens are minted locally, so a server must share this database.
+        # Scenarios read `auth` when they send, so it is re-pointed at a
+        # fresh access token before each run
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        refresh = issue_tokens(user)
+        auth = {}
+        created = []
+        results = []
+        try:
+            self._authorize(auth, refresh)
+            setup = transport_factory()
+            try:
+                scenarios = self._build_scenarios(
+                    options["scenarios"] or SCENARIOS,
+                    setup,
+                    page_sizes,
+                    options["depth"],
+                    auth,
+                    user,
+                    options["warmup"] + options["requests"],
+                )
+            finally:
+                setup.close()
+
+            started_at = datetime.now(timezone.utc).isoformat()
+            for name, make_request in scenarios:
+                self.stderr.write(f"Running {name}...")
+                # Warm caches and connections with the same kind of requests
+                # first; the measured run continues with the next indexes
+                self._authorize(auth, refresh)
+                self._run(
+                    transport_factory,
+                    make_request,
+                    options["warmup"],
+                    options["concurrency"],
+                    created if name == "create" else None,
+                )
+                self._authorize(auth, refresh)
+                result = self._run(
+                    transport_factory,
+                    make_request,
+                    options["requests"],
+                    options["concurrency"],
+                    created if name == "create" else None,
+                    start=options["warmup"],
+                )
+                result = {"name": name, **result}
+                results.append(result)
+                self._summarize(result)
+        finally:
+            if created:
+                self._authorize(auth, refresh)
+                self._cleanup(transport_factory, created, auth)
+            # The auth family and those issued for token_refresh
+            RefreshTokenFamily.objects.filter(user=user).delete()
+
+        report = {
+            "label": options["label"],
+            "started_at": started_at,
+            "mode": "http" if base_url else "in-process",
+            "url": base_url,
+            "concurrency": options["concurrency"],
+            "requests": options["requests"],
+            "warmup": options["warmup"],
+            "scenarios": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def _build_scenarios(self, names, transport, page_sizes, depth, auth, user, total):
+        """
+        Return (name, make_request) pairs; make_request(i) gives request `i`
+        of `total` (warmup included)
+        """
+        scenarios = []
+        for name in SCENARIOS:
+            if name not in names:
+                continue
+            if name == "list":
+                for size in page_sizes:
+                    path = f"{RECIPES_PATH}?page_size={size}"
+                    scenarios.append(
+                        (f"list?page_size={size}", self._fixed("GET", path))
+                    )
+            elif name == "deep_page":
+                scenarios.append(
+                    (
+                        f"deep_page?page={depth + 1}",
+                        self._fixed("GET", self._deep_page_path(transport, depth)),
+                    )
+                )
+            elif name == "deep_cursor":
+                scenarios.append(
+                    (
+                        f"deep_cursor?depth={depth}",
+                        self._fixed("GET", self._deep_cursor_path(transport, depth)),
+                    )
+                )
+            elif name == "search":
+                scenarios.append(
+                    (
+                        "search",
+                        lambda i: (
+                            "GET",
+                            f"{RECIPES_PATH}?search_term="
+                            f"{SEARCH_TERMS[i % len(SEARCH_TERMS)]}",
+                            None,
+                            None,
+                        ),
+                    )
+                )
+            elif name == "detail":
+                ids = self._recipe_ids(transport)
+                if not ids:
+                    self.stderr.write("Skipping detail: no recipes to fetch")
+                    continue
+                scenarios.append(
+                    (
+                        "detail",
+                        lambda i, ids=ids: (
+                            "GET",
+                            f"{RECIPES_PATH}{ids[i % len(ids)]}/",
+                            None,
+                            None,
+                        ),
+                    )
+                )
+            elif name == "create":
+                scenarios.append(
+                    (
+                        "create",
+                        lambda i: (
+                            "POST",
+                            RECIPES_PATH,
+                            {
+                                "title": f"Bench recipe {i}",
+                                "description": "Created by bench_api.",
+                                "steps": ["Prepare", "Cook", "Serve"],
+                            },
+                            auth,
+                        ),
+                    )
+                )
+            elif name == "token_refresh":
+                # A new token family per request, issued here so the inserts
+                # aren't timed: refreshing a rotated token again is reuse
+                cookies = [
+                    {"Cookie": f"refresh_token={issue_tokens(user)}"}
+                    for _ in range(total)
+                ]
+                scenarios.append(
+                    (
+                        "token_refresh",
+                        lambda i, cookies=cookies: (
+                            "POST",
+                            f"{API_PREFIX}/auth/token/refresh/",
+                            None,
+                            cookies[i],
+                        ),
+                    )
+                )
+            elif name == "presigned_url":
+                scenarios.append(
+                    (
+                        "presigned_url",
+                        self._fixed(
+                            "POST",
+                            f"{RECIPES_PATH}presigned_url/",
+                            {"method": "PUT", "filename": "bench.jpg"},
+                            auth,
+                        ),
+                    )
+                )
+        return scenarios
+
+    def _authorize(self, auth, refresh):
+        """Point `auth` at a new access token, so it can't expire mid-run"""
+        auth["Authorization"] = f"Bearer {refresh.access_token}"
+
+    def _fixed(self, method, path, body=None, headers=None):
+        return lambda i: (method, path, body, headers)
+
+    def _get_json(self, transport, path):
+        status, content, _ = transport.request("GET", path)
+        if status != 200:
+            raise CommandError(f"GET {path} returned {status}")
+        return json.loads(content)
+
+    def _deep_page_path(self, transport, depth):
+        data = self._get_json(transport, f"{RECIPES_PATH}?page_size=20")
+        page = min(depth + 1, max(data["total_pages"], 1))
+        return f"{RECIPES_PATH}?page_size=20&page={page}"
+
+    def _deep_cursor_path(self, transport, depth):
+        path = f"{RECIPES_PATH}?pagination=cursor&page_size=20"
+        for _ in range(depth):
+            next_link = self._get_json(transport, path)["links"]["next"]
+            if not next_link:
+                break
+            path = _path(next_link)
+        return path
+
+    def _recipe_ids(self, transport):
+        data = self._get_json(transport, f"{RECIPES_PATH}?page_size=100")
+        return [recipe["id"] for recipe in data["results"]]
+
+    def _run(
+        self, transport_factory, make_request, count, concurrency, created, start=0
+    ):
+        """
+        Send requests `start` to `start + count` from `concurrency` clients
+        and collect stats
+        """
+        indexes = itertools.count(start)
+        end = start + count
+        samples = []
+        lock = threading.Lock()
+
+        def worker():
+            transport = transport_factory()
+            local = []
+            try:
+                while (i := next(indexes)) < end:
+                    method, path, body, headers = make_request(i)
+                    started = time.perf_counter()
+                    try:
+                        status, content, queries = transport.request(
+                            method, path, body, headers
+                        )
+                    except Exception:
+                        status, content, queries = "error", b"", None
+                    elapsed = time.perf_counter() - started
+                    local.append((elapsed, status, queries))
+                    if created is not None and status == 201:
+                        recipe_id = json.loads(content).get("id")
+                        with lock:
+                            created.append(recipe_id)
+            finally:
+                transport.close()
+                with lock:
+                    samples.extend(local)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(worker) for _ in range(min(concurrency, count))]
+            for future in futures:
+                future.result()
+        wall = time.perf_counter() - started
+        return self._stats(samples, wall)
+
+    def _stats(self, samples, wall):
+        latencies = sorted(sample[0] * 1000 for sample in samples)
+        statuses = {}
+        for _, status, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+        return {
+            "requests": len(samples),
+            "errors": sum(
+                1 for _, status, _ in samples if status == "error" or status >= 400
+            ),
+            "status_codes": statuses,
+            "seconds": round(wall, 3),
+            "rps": round(len(samples) / wall, 1) if wall else None,
+            "latency_ms": {
+                "p50": _round(percentile(latencies, 50)),
+                "p95": _round(percentile(latencies, 95)),
+                "p99": _round(percentile(latencies, 99)),
+                "mean": _round(sum(latencies) / len(latencies)) if latencies else None,
+                "max": _round(latencies[-1]) if latencies else None,
+            },
+            "queries_per_request": (
+                {
+                    "mean": round(sum(queries) / len(queries), 2),
+                    "max": max(queries),
+                }
+                if queries
+                else None
+            ),
+        }
+
+    def _summarize(self, result):
+        latency = result["latency_ms"]
+        queries = result["queries_per_request"]
+        self.stderr.write(
+            f"  {result['rps']} req/s, p50 {latency['p50']} ms, "
+            f"p95 {latency['p95']} ms, p99 {latency['p99']} ms, "
+            f"{queries['mean'] if queries else '-'} queries/request, "
+            f"{result['errors']} errors"
+        )
+
+    def _cleanup(self, transport_factory, created, auth):
+        """Delete recipes made by the create scenario through the bulk endpoint"""
+        transport = transport_factory()
+        batch = getattr(settings, "RECIPES_BULK_MAX_ITEMS", 1000)
+        try:
+            for start in range(0, len(created), batch):
+                transport.request(
+                    "DELETE",
+                    f"{RECIPES_PATH}bulk/",
+                    {"ids": created[start : start + batch]},
+                    auth,
+                )
+        finally:
+            transport.close()
+        self.stderr.write(f"Deleted {len(created)} benchmark recipes")
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import RefreshTokenFamily
+from apps.accounts.utils.tokens import compact_families
+
+
+class Command(BaseCommand):
+    help = "Delete expired refresh token families (run periodically, e.g. hourly)"
+
+    def handle(self, *args, **options):
+        deleted = compact_families()
+        remaining = RefreshTokenFamily.objects.count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} expired token families, {remaining} remaining."
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.models import PendingObjectDeletion
+from core.utils.bucket import DELETE_OBJECTS_BATCH_SIZE
+from core.utils.deletion_queue import drain_deletion_queue
+
+
+class Command(BaseCommand):
+    help = "Delete bucket objects queued for deletion, in DeleteObjects batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DELETE_OBJECTS_BATCH_SIZE,
+            help="Keys per DeleteObjects call (max 1000)",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches (default: drain the queue)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = min(options["batch_size"], DELETE_OBJECTS_BATCH_SIZE)
+        deleted, failed = drain_deletion_queue(
+            batch_size=batch_size, max_batches=options["max_batches"]
+        )
+        remaining = PendingObjectDeletion.objects.count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} objects, {failed} failed, {remaining} still queued."
+            )
+        )
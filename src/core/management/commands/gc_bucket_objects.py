@@ -0,0 +1,77 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.recipes.models import Recipe
+from core.utils.bucket import DELETE_OBJECTS_BATCH_SIZE, iter_objects
+from core.utils.deletion_queue import drain_deletion_queue, enqueue_object_deletion
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Find bucket objects no recipe references and queue them for deletion"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix",
+            default="recipes/",
+            help="Only consider keys under this prefix",
+        )
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Skip objects newer than this, e.g. uploads not yet attached",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DELETE_OBJECTS_BATCH_SIZE,
+            help="Keys checked against the database per query",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report orphaned keys without queueing or deleting them",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        dry_run = options["dry_run"]
+        scanned = orphaned = 0
+
+        objects = (
+            obj["Key"]
+            for obj in iter_objects(options["prefix"])
+            if obj["LastModified"] < cutoff
+        )
+        for keys in _batched(objects, options["batch_size"]):
+            scanned += len(keys)
+            referenced = set(
+                Recipe.objects.filter(image_bucket_key__in=keys).values_list(
+                    "image_bucket_key", flat=True
+                )
+            )
+            orphans = [key for key in keys if key not in referenced]
+            orphaned += len(orphans)
+            if dry_run:
+                for key in orphans:
+                    self.stdout.write(f"  {key}")
+            else:
+                enqueue_object_deletion(*orphans)
+
+        self.stdout.write(f"Scanned {scanned} objects, {orphaned} unreferenced.")
+        if dry_run or not orphaned:
+            return
+
+        deleted, failed = drain_deletion_queue()
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} objects, {failed} failed.")
+        )
@@ -0,0 +1,212 @@
+import csv
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.utils.bucket import get_bucket, iter_objects, list_common_prefixes
+
+CSV_FIELDS = ("key", "size", "last_modified", "etag", "prefix")
+
+# Objects handed from a lister thread to the writer at a time
+CHUNK_SIZE = 1000
+
+
+def _parse_since(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f"Invalid --since value: {value}")
+        parsed = datetime.combine(date, time.min)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream objects in the S3 bucket as NDJSON or CSV, listing prefixes "
+        "in parallel, and report object count and bytes per prefix"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            dest="prefixes",
+            help="Key prefix to list (repeatable, default: whole bucket)",
+        )
+        parser.add_argument(
+            "--split",
+            action="store_true",
+            help="Fan out over the next '/' level below each prefix",
+        )
+        parser.add_argument(
+            "--since",
+            help="Only objects modified at or after this date or datetime",
+        )
+        parser.add_argument(
+            "--min-size",
+            type=int,
+            default=0,
+            help="Only objects of at least this many bytes",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("ndjson", "csv"),
+            default="ndjson",
+            help="Output format for object lines",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write object lines to this file instead of stdout",
+        )
+        parser.add_argument(
+            "--summary-only",
+            action="store_true",
+            help="Only report per-prefix totals",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Prefixes listed concurrently",
+        )
+
+    def _expand_prefixes(self, prefixes, split):
+        """
+        Return the prefixes to list and, per prefix, the delimiter limiting it
+        to direct children (so split parents don't list their sub-prefixes).
+        """
+        tasks = []
+        for prefix in prefixes:
+            if not split:
+                tasks.append((prefix, None))
+                continue
+            children = list_common_prefixes(prefix)
+            tasks.append((prefix, "/" if children else None))
+            tasks.extend((child, None) for child in children)
+        return tasks
+
+    def _list_prefix(self, prefix, delimiter, matches, chunks, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        chunk = []
+        try:
+            for obj in iter_objects(prefix, delimiter=delimiter):
+                if stop.is_set():
+                    return
+                if matches(obj):
+                    chunk.append(obj)
+                    if len(chunk) >= CHUNK_SIZE:
+                        put((prefix, chunk))
+                        chunk = []
+            put((prefix, chunk))
+            put((prefix, None))
+        except Exception as e:
+            put((prefix, e))
+
+    def _make_writer(self, stream, fmt):
+        if fmt == "csv":
+            writer = csv.writer(stream)
+            writer.writerow(CSV_FIELDS)
+            return writer.writerow
+        return lambda row: stream.write(json.dumps(dict(zip(CSV_FIELDS, row))) + "\n")
+
+    def handle(self, *args, **options):
+        bucket_name = getattr(settings, "AWS_STORAGE_BUCKET_NAME", "default")
+        since = _parse_since(options["since"]) if options["since"] else None
+        min_size = options["min_size"]
+
+        def matches(obj):
+            if obj["Size"] < min_size:
+                return False
+            return since is None or obj["LastModified"] >= since
+
+        # Create the shared client before any worker thread needs it
+        get_bucket()
+        try:
+            tasks = self._expand_prefixes(options["prefixes"] or [""], options["split"])
+        except Exception as e:
+            raise CommandError(f"Error listing prefixes: {e}")
+
+        self.stderr.write(f"Listing {len(tasks)} prefixes in bucket: {bucket_name}")
+
+        output = None
+        write = None
+        if not options["summary_only"]:
+            if options["output"]:
+                output = open(options["output"], "w", newline="")
+                stream = output
+            else:
+                stream = self.stdout
+            write = self._make_writer(stream, options["format"])
+
+        totals = {prefix: [0, 0] for prefix, _ in tasks}
+        errors = {}
+        chunks = queue.Queue(maxsize=max(options["workers"], 1) * 4)
+        stop = threading.Event()
+        pending = len(tasks)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(options["workers"], 1)) as pool:
+                for prefix, delimiter in tasks:
+                    pool.submit(
+                        self._list_prefix, prefix, delimiter, matches, chunks, stop
+                    )
+                try:
+                    while pending:
+                        prefix, chunk = chunks.get()
+                        if chunk is None:
+                            pending -= 1
+                        elif isinstance(chunk, Exception):
+                            errors[prefix] = chunk
+                            pending -= 1
+                        else:
+                            total = totals[prefix]
+                            for obj in chunk:
+                                total[0] += 1
+                                total[1] += obj["Size"]
+                                if write is not None:
+                                    write(
+                                        (
+                                            obj["Key"],
+                                            obj["Size"],
+                                            obj["LastModified"].isoformat(),
+                                            obj.get("ETag", "").strip('"'),
+                                            prefix,
+                                        )
+                                    )
+                finally:
+                    stop.set()
+        finally:
+            if output is not None:
+                output.close()
+
+        self._report(totals, errors, to_stdout=write is None or output is not None)
+        if errors:
+            raise CommandError(f"Listing failed for {len(errors)} prefixes")
+
+    def _report(self, totals, errors, to_stdout):
+        # Keep stdout machine-readable when object lines are written there
+        out = self.stdout if to_stdout else self.stderr
+        out.write(f"{'prefix':<40} {'objects':>12} {'bytes':>16}")
+        for prefix, (count, size) in sorted(totals.items()):
+            out.write(f"{prefix or '(root)':<40} {count:>12} {size:>16}")
+        count = sum(total[0] for total in totals.values())
+        size = sum(total[1] for total in totals.values())
+        out.write(f"{'total':<40} {count:>12} {size:>16}")
+        for prefix, error in errors.items():
+            self.stderr.write(self.style.ERROR(f"Error listing {prefix!r}: {error}"))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.utils.profiling import (
+    DEFAULT_PROFILE_TOKEN_MAX_AGE,
+    PROFILE_HEADER,
+    make_profile_token,
+)
+
+
+class Command(BaseCommand):
+    help = "Print a signed header value that turns on profiling for a request"
+
+    def handle(self, *args, **options):
+        max_age = getattr(
+            settings, "PROFILE_TOKEN_MAX_AGE", DEFAULT_PROFILE_TOKEN_MAX_AGE
+        )
+        self.stderr.write(f"Valid for {max_age} seconds. Send it as:")
+        self.stdout.write(f"{PROFILE_HEADER}: {make_profile_token()}")
@@ -1,12 +1,24 @@
+import itertools
 import os
+import random
+import string
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import partial
 
 from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils.crypto import get_random_string
 
+from apps.recipes.cache import invalidate_recipes
 from apps.recipes.models import Recipe
 from core.utils.bucket import generate_key, put_object
+from core.utils.deletion_queue import enqueue_object_deletion
 
 User = get_user_model()
 
@@ -372,6 +384,72 @@ RECIPES_DATA = [
     },
 ]
 
+# Synthetic mode: owners are named SYNTHETIC_USER_PREFIX + a zero-padded index
+SYNTHETIC_USER_PREFIX = "seed-user-"
+TITLE_STYLES = [
+    "Classic",
+    "Quick",
+    "Weeknight",
+    "Spicy",
+    "Vegan",
+    "Grandma's",
+    "Smoky",
+    "One-Pot",
+    "Crispy",
+    "Lemony",
+    "Herbed",
+    "Rustic",
+]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+class ImageUploader:
+    """
+    Upload images on a bounded thread pool.
+
+    At most `workers * 4` uploads are queued at once, so generating recipes
+    can't run ahead of the bucket and hold every image in memory. Counters
+    are updated as uploads finish and read with `progress()`.
+    """
+
+    def __init__(self, workers):
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="seed-upload"
+        )
+        self._slots = threading.BoundedSemaphore(workers * 4)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.uploaded = 0
+        self.uploaded_bytes = 0
+        self.failed = []
+
+    def submit(self, key, data, content_type):
+        self._slots.acquire()
+        future = self._pool.submit(put_object, key, data, content_type)
+        future.add_done_callback(partial(self._finished, key, len(data)))
+
+    def _finished(self, key, size, future):
+        with self._lock:
+            if future.exception() is None:
+                self.uploaded += 1
+                self.uploaded_bytes += size
+            else:
+                self.failed.append(key)
+        self._slots.release()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def progress(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-6)
+            return (
+                f"uploaded {self.uploaded} images "
+                f"({self.uploaded / elapsed:.1f}/s, "
+                f"{self.uploaded_bytes / elapsed / 1e6:.2f} MB/s), "
+                f"{len(self.failed)} failed"
+            )
+
 
 class Command(BaseCommand):
     help = "Seed the database with initial data: user and recipes with images"
@@ -382,11 +460,62 @@ class Command(BaseCommand):
             action="store_true",
             help="Reset existing data before seeding",
         )
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=0,
+            help="Generate this many synthetic recipes instead of the sample set",
+        )
+        parser.add_argument(
+            "--owners",
+            type=int,
+            help="Synthetic owners to spread recipes over (default: count / 500)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed; the same seed and options give the same dataset",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk insert",
+        )
+        parser.add_argument(
+            "--image-ratio",
+            type=float,
+            default=0.0,
+            help="Fraction of synthetic recipes that get an uploaded image",
+        )
+        parser.add_argument(
+            "--upload-workers",
+            type=int,
+            default=8,
+            help="Concurrent image uploads",
+        )
 
-    def _reset_data(self):
+    def _reset_data(self, batch_size):
+        """
+        Delete every recipe and the seed users. Images are queued for
+        deletion; a reseed that reuses a key (same `--seed`) references it
+        again before the drain, which then keeps it.
+        """
         self.stdout.write("Resetting existing data...")
-        Recipe.objects.all().delete()
-        User.objects.filter(username="tasti").delete()
+        with transaction.atomic():
+            keys = (
+                Recipe.objects.exclude(image_bucket_key=None)
+                .values_list("image_bucket_key", flat=True)
+                .iterator(chunk_size=batch_size)
+            )
+            while batch := list(itertools.islice(keys, batch_size)):
+                enqueue_object_deletion(*batch)
+            # One DELETE: no rows are loaded and no per-row signals are sent
+            Recipe.objects.all()._raw_delete(Recipe.objects.db)
+            User.objects.filter(username="tasti").delete()
+            User.objects.filter(username__startswith=SYNTHETIC_USER_PREFIX).delete()
+        invalidate_recipes()
 
     def _create_user(self):
         user, created = User.objects.get_or_create(
@@ -486,9 +615,166 @@ class Command(BaseCommand):
                 self.stdout.write(f"Updated recipe: {recipe.title}")
         return recipes_created
 
+    def _create_synthetic_owners(self, count, rng, batch_size):
+        usernames = [f"{SYNTHETIC_USER_PREFIX}{i:06d}" for i in range(count)]
+        existing = set(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", flat=True
+            )
+        )
+        password = "".join(rng.choices(string.ascii_letters + string.digits, k=12))
+        missing = [username for username in usernames if username not in existing]
+        if missing:
+            # Hashing is deliberately slow, so every owner shares one hash
+            hashed = make_password(password)
+            User.objects.bulk_create(
+                [User(username=username, password=hashed) for username in missing],
+                batch_size=batch_size,
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Created {len(missing)} owners "
+                    f'"{SYNTHETIC_USER_PREFIX}*" with password: {password}'
+                )
+            )
+        if existing:
+            self.stdout.write(f"{len(existing)} owners already exist")
+        return list(
+            User.objects.filter(username__in=usernames)
+            .order_by("username")
+            .values_list("id", flat=True)
+        )
+
+    def _synthetic_recipe(self, rng, owner_ids, images, image_ratio):
+        """Build one recipe from a random template; return (recipe, image)"""
+        template = rng.choice(RECIPES_DATA)
+        steps = template["steps"]
+        kept = sorted(rng.sample(range(len(steps)), rng.randint(1, len(steps))))
+        minutes = template["duration"].total_seconds() / 60
+        difficulty = template["difficulty"]
+        if rng.random() < 0.2:
+            difficulty = rng.choice(DIFFICULTIES)
+        recipe = Recipe(
+            title=f"{rng.choice(TITLE_STYLES)} {template['title']}",
+            description=template["description"],
+            duration=timedelta(minutes=max(5, round(minutes * rng.uniform(0.75, 1.5)))),
+            difficulty=difficulty,
+            steps=[steps[i] for i in kept],
+            owner_id=rng.choice(owner_ids),
+        )
+
+        image = None
+        if images and rng.random() < image_ratio:
+            image_name = template["image_name"]
+            if image_name not in images:
+                image_name = rng.choice(sorted(images))
+            _, ext = os.path.splitext(image_name)
+            # Keys come from the seeded generator so reruns match
+            recipe.image_bucket_key = (
+                f"recipes/{uuid.UUID(int=rng.getrandbits(128), version=4)}{ext}"
+            )
+            image = image_name
+        return recipe, image
+
+    def _seed_synthetic(self, options):
+        count = options["count"]
+        batch_size = options["batch_size"]
+        image_ratio = options["image_ratio"]
+        rng = random.Random(options["seed"])
+        owners = options["owners"] or max(1, count // 500)
+        owner_ids = self._create_synthetic_owners(owners, rng, batch_size)
+
+        images = {}
+        uploader = None
+        if image_ratio:
+            image_files, sample_images_dir = self._get_image_files()
+            images = {
+                name: (
+                    self._read_image_data(os.path.join(sample_images_dir, name)),
+                    self._get_content_type(name),
+                )
+                for name in image_files
+            }
+            if images:
+                uploader = ImageUploader(options["upload_workers"])
+
+        self.stdout.write(
+            f"Generating {count} recipes for {owners} owners (seed {options['seed']})"
+        )
+        started = time.monotonic()
+        inserted = 0
+        try:
+            while inserted < count:
+                batch = [
+                    self._synthetic_recipe(rng, owner_ids, images, image_ratio)
+                    for _ in range(min(batch_size, count - inserted))
+                ]
+                recipes = [recipe for recipe, _ in batch]
+                with transaction.atomic():
+                    Recipe.objects.bulk_create(recipes)
+                    Recipe.objects.filter(
+                        pk__in=[recipe.pk for recipe in recipes]
+                    ).update_search_vector()
+                # Bulk inserts send no signals, so drop cached lists here
+                invalidate_recipes()
+                inserted += len(recipes)
+
+                if uploader is not None:
+                    for recipe, image in batch:
+                        if image is not None:
+                            uploader.submit(recipe.image_bucket_key, *images[image])
+
+                elapsed = max(time.monotonic() - started, 1e-6)
+                line = (
+                    f"Inserted {inserted}/{count} recipes "
+                    f"({inserted / elapsed:.0f} rows/s)"
+                )
+                if uploader is not None:
+                    line += f"; {uploader.progress()}"
+                self.stdout.write(line)
+        finally:
+            if uploader is not None:
+                uploader.close()
+
+        if uploader is not None:
+            if uploader.failed:
+                failed = Recipe.objects.filter(image_bucket_key__in=uploader.failed)
+                invalidate_recipes(list(failed.values_list("pk", flat=True)))
+                failed.update(image_bucket_key=None)
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{len(uploader.failed)} image uploads failed; "
+                        "those recipes were left without images"
+                    )
+                )
+            self.stdout.write(f"Images: {uploader.progress()}")
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeding complete. Created {inserted} recipes in {elapsed:.1f}s "
+                f"({inserted / elapsed:.0f} rows/s)."
+            )
+        )
+
+    def _validate_options(self, options):
+        """Reject bad options before anything is deleted or written"""
+        if options["count"] < 0:
+            raise CommandError("--count must not be negative")
+        if options["owners"] is not None and options["owners"] < 1:
+            raise CommandError("--owners must be at least 1")
+        if options["batch_size"] < 1 or options["upload_workers"] < 1:
+            raise CommandError("--batch-size and --upload-workers must be at least 1")
+        if not 0 <= options["image_ratio"] <= 1:
+            raise CommandError("--image-ratio must be between 0 and 1")
+
     def handle(self, *args, **options):
+        self._validate_options(options)
         if options["reset"]:
-            self._reset_data()
+            self._reset_data(options["batch_size"])
+        if options["count"]:
+            self._seed_synthetic(options)
+            return
         user = self._create_user()
         image_files, sample_images_dir = self._get_image_files()
         recipes_created = self._create_recipes(user, image_files, sample_images_dir)
@@ -0,0 +1,156 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.utils import metrics
+from core.utils.timing import (
+    CATEGORIES,
+    DB,
+    current_timings,
+    end_request,
+    start_request,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_TIMING = True
+DEFAULT_REQUEST_TIMING_HEADER = False
+DEFAULT_METRICS_ENABLED = False
+
+
+class RequestHookMiddleware:
+    """
+    Base for middleware that runs code around every request, sync or async.
+
+    `_start` runs before the view and returns state for `_finish`, which
+    sees the response, and `_end`, which always runs last.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self._start(request)
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response, state)
+        finally:
+            self._end(state)
+
+    async def __acall__(self, request):
+        state = self._start(request)
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response, state)
+        finally:
+            self._end(state)
+
+    def _start(self, request):
+        return None
+
+    def _finish(self, request, response, state):
+        return response
+
+    def _end(self, state):
+        pass
+
+
+class ServerTimingMiddleware(RequestHookMiddleware):
+    """
+    Break each request's wall time down into database, bucket,
+    serialization and rendering time.
+
+    The breakdown is logged at DEBUG as one key=value line per request and,
+    with `REQUEST_TIMING_HEADER`, sent as a `Server-Timing` header (shown in
+    the browser dev tools network panel).
+    `app` is the remainder: views, middleware, authentication and so on.
+    Place it first so `total` covers the whole middleware stack.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING", DEFAULT_REQUEST_TIMING):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.send_header = getattr(
+            settings, "REQUEST_TIMING_HEADER", DEFAULT_REQUEST_TIMING_HEADER
+        )
+
+    def _start(self, request):
+        return start_request()
+
+    def _end(self, state):
+        end_request(state[1])
+
+    def _finish(self, request, response, state):
+        timings = state[0]
+        total = timings.total() * 1000
+        durations = {
+            category: timings.durations[category] * 1000 for category in CATEGORIES
+        }
+        app = max(total - sum(durations.values()), 0)
+
+        if self.send_header:
+            entries = [f"total;dur={total:.1f}"]
+            for category in CATEGORIES:
+                metric = f"{category};dur={durations[category]:.1f}"
+                if category == DB:
+                    metric += f';desc="{timings.counts[DB]} queries"'
+                entries.append(metric)
+            entries.append(f"app;dur={app:.1f}")
+            response["Server-Timing"] = ", ".join(entries)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            fields = " ".join(
+                f"{category}_ms={durations[category]:.1f} "
+                f"{category}_count={timings.counts[category]}"
+                for category in CATEGORIES
+            )
+            logger.debug(
+                f"request method={request.method} path={request.path} "
+                f"status={response.status_code} total_ms={total:.1f} {fields} "
+                f"app_ms={app:.1f}"
+            )
+        return response
+
+
+class MetricsMiddleware(RequestHookMiddleware):
+    """
+    Record request latency, status codes, in-flight requests and, when
+    `ServerTimingMiddleware` runs before it, database time per route for
+    the `/metrics` endpoint.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", DEFAULT_METRICS_ENABLED):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def _start(self, request):
+        metrics.IN_FLIGHT.inc()
+        return time.perf_counter()
+
+    def _finish(self, request, response, started):
+        method = metrics.method_name(request)
+        route = metrics.route_name(request)
+        metrics.REQUEST_SECONDS.labels(method, route).observe(
+            time.perf_counter() - started
+        )
+        metrics.REQUESTS.labels(method, route, str(response.status_code)).inc()
+        timings = current_timings()
+        if timings is not None:
+            metrics.DB_QUERIES.labels(route).inc(timings.counts[DB])
+            metrics.DB_SECONDS.labels(route).inc(timings.durations[DB])
+        return response
+
+    def _end(self, started):
+        metrics.IN_FLIGHT.dec()
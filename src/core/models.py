@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class PendingObjectDeletion(models.Model):
+    """Bucket object waiting to be deleted outside the request cycle"""
+
+    key = models.CharField(max_length=500, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    # Set while a drainer is deleting the object; a stale claim is retaken
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+
+    def __str__(self):
+        return self.key
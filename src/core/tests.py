@@ -1,8 +1,60 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import msgpack
+from asgiref.sync import async_to_sync, sync_to_async
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from prometheus_client import REGISTRY, multiprocess
+from prometheus_client.parser import text_string_to_metric_families
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 
+from apps.accounts.models import RefreshTokenFamily
+from apps.recipes.models import Recipe
+from config.parsers import MessagePackParser, ORJSONParser
+from config.renderers import MessagePackRenderer, ORJSONRenderer
+from core.management.commands import bench_api
+from core.middleware import MetricsMiddleware, ServerTimingMiddleware
+from core.models import PendingObjectDeletion
+from core.utils import bucket, metrics, profiling, timing
+from core.utils.bloom import BloomFilter
+from core.utils.caches import is_shared_cache
+from core.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.utils.deletion_queue import drain_deletion_queue, enqueue_object_deletion
+
+User = get_user_model()
+
 
 class HealthCheckTestCase(APITestCase):
     """Test the health check endpoint"""
@@ -16,6 +68,7 @@ class HealthCheckTestCase(APITestCase):
         self.assertEqual(response.data["status"], "healthy")
         self.assertEqual(response.data["message"], "Tasti API is running!")
         self.assertEqual(response.data["version"], "1.0.0")
+        self.assertIn("in_flight", response.data["bucket"]["pool"])
 
 
 class SettingsTestCase(TestCase):
@@ -40,3 +93,1011 @@ class SettingsTestCase(TestCase):
 
         self.assertTrue(settings.SECRET_KEY)
         self.assertIsInstance(settings.DEBUG, bool)
+
+
+class SharedCacheTestCase(SimpleTestCase):
+    """Test the check for a cache shared between server processes"""
+
+    def test_local_memory_is_not_shared(self):
+        """Test that the default local memory cache is private to a process"""
+        self.assertFalse(is_shared_cache())
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django_redis.cache.RedisCache",
+                "LOCATION": "redis://localhost:6379/0",
+            }
+        }
+    )
+    def test_redis_is_shared(self):
+        """Test that a Redis cache counts as shared"""
+        self.assertTrue(is_shared_cache())
+
+    def test_gunicorn_refuses_several_workers(self):
+        """Test that gunicorn won't start several workers on local memory"""
+        with mock.patch.dict(os.environ):
+            gunicorn_config = importlib.import_module("config.gunicorn")
+        server = mock.Mock(cfg=mock.Mock(workers=2))
+
+        with self.assertRaisesRegex(RuntimeError, "REDIS_URL"):
+            gunicorn_config.on_starting(server)
+
+
+class PresignedUrlCacheTestCase(SimpleTestCase):
+    """Test window-aligned caching of presigned download URLs"""
+
+    def setUp(self):
+        bucket.presigned_url_cache.clear()
+        cache.clear()
+
+    def _url_at(self, now, key="recipes/a.jpg"):
+        with mock.patch("core.utils.bucket.time.time", return_value=now):
+            return bucket.get_cached_presigned_url(key, expiration=600)
+
+    def test_same_url_within_window(self):
+        """Test that a key is signed once per window"""
+        with self.settings(PRESIGNED_URL_WINDOW=3600):
+            with mock.patch(
+                "core.utils.bucket.get_presigned_url", wraps=bucket.get_presigned_url
+            ) as sign:
+                first = self._url_at(7200)
+                second = self._url_at(7200 + 3599)
+
+        self.assertEqual(first, second)
+        self.assertEqual(sign.call_count, 1)
+
+    def test_url_outlives_window(self):
+        """Test that URLs stay valid for `expiration` past the window end"""
+        with self.settings(PRESIGNED_URL_WINDOW=3600):
+            url = self._url_at(7200 + 1000)
+
+        expires = parse_qs(urlparse(url).query)["X-Amz-Expires"]
+        self.assertEqual(expires, [str(3600 - 1000 + 600)])
+
+    def test_new_url_after_window_rolls_over(self):
+        """Test that the next window signs a fresh URL"""
+        with self.settings(PRESIGNED_URL_WINDOW=3600):
+            with mock.patch(
+                "core.utils.bucket.get_presigned_url", wraps=bucket.get_presigned_url
+            ) as sign:
+                self._url_at(7200)
+                self._url_at(7200 + 3600)
+
+        self.assertEqual(sign.call_count, 2)
+
+    def test_workers_share_one_url_per_window(self):
+        """Test that a process signing later in the window reuses the URL"""
+        with self.settings(PRESIGNED_URL_WINDOW=3600):
+            first = self._url_at(7200 + 10)
+            # Another worker: nothing in its own cache, signs 20 minutes on
+            bucket.presigned_url_cache.clear()
+            with mock.patch("core.utils.bucket.get_presigned_url") as sign:
+                second = self._url_at(7200 + 1200)
+
+        self.assertEqual(first, second)
+        sign.assert_not_called()
+
+    def test_async_prefetch_matches_sync_lookup(self):
+        """Test that prefetched URLs are the ones other workers signed"""
+        with self.settings(PRESIGNED_URL_WINDOW=3600):
+            shared = self._url_at(7200 + 10)
+            bucket.presigned_url_cache.clear()
+            with mock.patch("core.utils.bucket.time.time", return_value=7200 + 20):
+                async_to_sync(bucket.aprefetch_presigned_urls)(
+                    ["recipes/a.jpg", "recipes/b.jpg", None], expiration=600
+                )
+
+            with mock.patch.object(cache, "get") as cache_get:
+                self.assertEqual(self._url_at(7200 + 30), shared)
+                self.assertTrue(self._url_at(7200 + 30, key="recipes/b.jpg"))
+        cache_get.assert_not_called()
+
+    def test_lru_eviction(self):
+        """Test that the cache never grows past its bound"""
+        cache = bucket.PresignedUrlCache(maxsize=2)
+        cache.set("a", "url-a")
+        cache.set("b", "url-b")
+        cache.get("a")
+        cache.set("c", "url-c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "url-a")
+
+
+class RendererTestCase(SimpleTestCase):
+    """Test the orjson and MessagePack renderers and parsers"""
+
+    data = {
+        "duration": timedelta(hours=1, minutes=30),
+        "created_at": datetime(2025, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+        "price": Decimal("4.50"),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "title": "Crème brûlée\u2028",
+        "steps": ["Whisk", None],
+    }
+
+    def test_orjson_matches_json_renderer(self):
+        """Test that compact output is identical to DRF's JSONRenderer"""
+        self.assertEqual(
+            ORJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+        )
+
+    def test_orjson_indented_output(self):
+        """Test that indented output still honours the requested indent"""
+        rendered = ORJSONRenderer().render(self.data, "application/json; indent=4", {})
+
+        self.assertEqual(
+            rendered, JSONRenderer().render(self.data, None, {"indent": 4})
+        )
+
+    def test_orjson_parser(self):
+        """Test that JSON bodies parse and malformed ones are rejected"""
+        parser = ORJSONParser()
+
+        self.assertEqual(parser.parse(io.BytesIO(b'{"a": [1, 2]}')), {"a": [1, 2]})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b"{"))
+
+    def test_msgpack_round_trip(self):
+        """Test that MessagePack output decodes to the JSON representation"""
+        rendered = MessagePackRenderer().render(self.data)
+        parsed = MessagePackParser().parse(io.BytesIO(rendered))
+
+        self.assertEqual(
+            parsed, ORJSONParser().parse(io.BytesIO(ORJSONRenderer().render(self.data)))
+        )
+
+    def test_msgpack_parser_rejects_garbage(self):
+        """Test that malformed MessagePack bodies are rejected"""
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b"\xc1"))
+
+
+class ContentNegotiationTestCase(APITestCase):
+    """Test format selection through Accept and Content-Type"""
+
+    def test_msgpack_response(self):
+        """Test that Accept: application/msgpack returns MessagePack"""
+        url = reverse("core:health_check")
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(url).json())
+
+    def test_msgpack_request_body(self):
+        """Test that MessagePack request bodies are parsed"""
+        response = self.client.post(
+            reverse("core:accounts:login"),
+            msgpack.packb({"username": "nobody", "password": "wrong"}),
+            content_type="application/msgpack",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["non_field_errors"], ["Invalid credentials."])
+
+
+class DeletionQueueTestCase(TestCase):
+    """Test the batched, off-request object deletion queue"""
+
+    def setUp(self):
+        bucket.bucket_breaker.reset()
+
+    def test_enqueue_ignores_duplicates_and_empty_keys(self):
+        """Test that a key is queued once and empty keys are skipped"""
+        enqueue_object_deletion("recipes/a.jpg", "", None)
+        enqueue_object_deletion("recipes/a.jpg", "recipes/b.jpg")
+
+        self.assertEqual(
+            sorted(PendingObjectDeletion.objects.values_list("key", flat=True)),
+            ["recipes/a.jpg", "recipes/b.jpg"],
+        )
+
+    def test_drain_deletes_in_one_call_and_keeps_failures(self):
+        """Test that draining uses one DeleteObjects call and requeues errors"""
+        enqueue_object_deletion("recipes/a.jpg", "recipes/b.jpg", "recipes/c.jpg")
+        client = mock.Mock()
+        client.delete_objects.return_value = {
+            "Errors": [
+                {"Key": "recipes/b.jpg", "Code": "AccessDenied", "Message": "No"}
+            ]
+        }
+
+        with mock.patch("core.utils.bucket.get_bucket", return_value=client):
+            deleted, failed = drain_deletion_queue(batch_size=10)
+
+        self.assertEqual((deleted, failed), (2, 1))
+        client.delete_objects.assert_called_once()
+        pending = PendingObjectDeletion.objects.get()
+        self.assertEqual(pending.key, "recipes/b.jpg")
+        self.assertEqual(pending.attempts, 1)
+        self.assertEqual(pending.last_error, "AccessDenied: No")
+
+    def test_drain_stops_when_bucket_is_unreachable(self):
+        """Test that draining stops after a batch that fails entirely"""
+        enqueue_object_deletion(*(f"recipes/{i}.jpg" for i in range(5)))
+        client = mock.Mock()
+        client.delete_objects.side_effect = ConnectionError("down")
+
+        with mock.patch("core.utils.bucket.get_bucket", return_value=client):
+            deleted, failed = drain_deletion_queue(batch_size=2)
+
+        self.assertEqual((deleted, failed), (0, 2))
+        self.assertEqual(client.delete_objects.call_count, 1)
+        self.assertEqual(PendingObjectDeletion.objects.count(), 5)
+
+    def test_drain_calls_bucket_outside_transaction(self):
+        """Test that rows are claimed and committed before S3 is called"""
+        enqueue_object_deletion("recipes/a.jpg")
+        seen = {}
+
+        def delete_objects(keys):
+            seen["atomic_blocks"] = len(connection.atomic_blocks)
+            seen["claimed_until"] = PendingObjectDeletion.objects.get().claimed_until
+            return {}
+
+        with mock.patch(
+            "core.utils.deletion_queue.delete_objects", side_effect=delete_objects
+        ):
+            self.assertEqual(drain_deletion_queue(), (1, 0))
+
+        # No atomic block beyond the ones TestCase wraps each test in
+        self.assertEqual(seen["atomic_blocks"], len(connection.atomic_blocks))
+        self.assertIsNotNone(seen["claimed_until"])
+
+    def test_drain_skips_claimed_rows_until_claim_expires(self):
+        """Test that a batch claimed by another drainer is left alone"""
+        enqueue_object_deletion("recipes/a.jpg")
+        PendingObjectDeletion.objects.update(
+            claimed_until=datetime.now(timezone.utc) + timedelta(minutes=1)
+        )
+        client = mock.Mock()
+        client.delete_objects.return_value = {}
+
+        with mock.patch("core.utils.bucket.get_bucket", return_value=client):
+            self.assertEqual(drain_deletion_queue(), (0, 0))
+            PendingObjectDeletion.objects.update(
+                claimed_until=datetime.now(timezone.utc) - timedelta(minutes=1)
+            )
+            self.assertEqual(drain_deletion_queue(), (1, 0))
+
+
+class ListBucketObjectsTestCase(SimpleTestCase):
+    """Test the streaming bucket listing command"""
+
+    modified = datetime(2026, 1, 10, tzinfo=timezone.utc)
+    objects = {
+        "recipes/a/": [("recipes/a/1.jpg", 100), ("recipes/a/2.jpg", 5)],
+        "recipes/b/": [("recipes/b/1.jpg", 300)],
+        "recipes/": [("recipes/top.jpg", 50)],
+    }
+
+    def _paginate(self, Prefix, Delimiter=None, **kwargs):
+        if Delimiter:
+            children = [prefix for prefix in self.objects if prefix != Prefix]
+            yield {"CommonPrefixes": [{"Prefix": prefix} for prefix in children]}
+            contents = self.objects[Prefix]
+        else:
+            contents = [
+                obj
+                for prefix, objs in self.objects.items()
+                for obj in objs
+                if obj[0].startswith(Prefix)
+            ]
+        # One object per page exercises continuation
+        for key, size in contents:
+            yield {
+                "Contents": [{"Key": key, "Size": size, "LastModified": self.modified}]
+            }
+
+    def _call(self, *args):
+        client = mock.Mock()
+        client.get_paginator.return_value.paginate.side_effect = self._paginate
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch("core.utils.bucket.get_bucket", return_value=client):
+            call_command("list_bucket_objects", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_split_streams_every_page_as_ndjson(self):
+        """Test that split prefixes are all listed across pages"""
+        stdout, stderr = self._call("--prefix", "recipes/", "--split")
+
+        keys = sorted(json.loads(line)["key"] for line in stdout.splitlines())
+        self.assertEqual(
+            keys,
+            [
+                "recipes/a/1.jpg",
+                "recipes/a/2.jpg",
+                "recipes/b/1.jpg",
+                "recipes/top.jpg",
+            ],
+        )
+        self.assertIn("recipes/a/", stderr)
+        self.assertRegex(stderr, r"total\s+4\s+455")
+
+    def test_filters_and_csv(self):
+        """Test that min-size and since filters apply to CSV output"""
+        stdout, _ = self._call(
+            "--prefix", "recipes/a/", "--min-size", "10", "--format", "csv"
+        )
+        rows = list(csv.DictReader(io.StringIO(stdout)))
+        self.assertEqual([row["key"] for row in rows], ["recipes/a/1.jpg"])
+
+        stdout, _ = self._call("--since", "2026-02-01", "--format", "csv")
+        self.assertEqual(list(csv.DictReader(io.StringIO(stdout))), [])
+
+    def test_summary_only(self):
+        """Test that --summary-only writes only totals, to stdout"""
+        stdout, _ = self._call("--summary-only", "--prefix", "recipes/b/")
+
+        self.assertRegex(stdout, r"recipes/b/\s+1\s+300")
+        self.assertNotIn("recipes/b/1.jpg", stdout)
+
+
+class BucketClientManagerTestCase(SimpleTestCase):
+    """Test the shared, pooled S3 client"""
+
+    def setUp(self):
+        self.manager = bucket.BucketClientManager()
+
+    @override_settings(
+        AWS_S3_MAX_POOL_CONNECTIONS=2,
+        AWS_S3_CONNECT_TIMEOUT=1.5,
+        AWS_S3_READ_TIMEOUT=4,
+        AWS_S3_MAX_ATTEMPTS=5,
+    )
+    def test_client_is_configured_from_settings(self):
+        """Test that pool size, timeouts and retries come from settings"""
+        config = self.manager.get_client().meta.config
+
+        self.assertEqual(config.max_pool_connections, 2)
+        self.assertEqual(config.connect_timeout, 1.5)
+        self.assertEqual(config.read_timeout, 4)
+        self.assertEqual(config.retries["mode"], "standard")
+        self.assertEqual(config.retries["total_max_attempts"], 5)
+
+    def test_client_is_created_once_across_threads(self):
+        """Test that concurrent first calls share a single client"""
+        clients = []
+        barrier = threading.Barrier(8)
+
+        def get_client():
+            barrier.wait()
+            clients.append(self.manager.get_client())
+
+        with mock.patch.object(
+            self.manager, "_create_client", side_effect=lambda: object()
+        ) as create:
+            threads = [threading.Thread(target=get_client) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        create.assert_called_once()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    @override_settings(AWS_S3_MAX_POOL_CONNECTIONS=1)
+    def test_pool_usage_counters(self):
+        """Test that in-flight and saturated requests are counted"""
+        events = self.manager.get_client().meta.events
+        events.emit("before-send.s3.GetObject", request=None)
+        events.emit("before-send.s3.GetObject", request=None)
+        events.emit("response-received.s3.GetObject", exception=None)
+
+        self.assertEqual(
+            self.manager.stats(),
+            {
+                "max_pool_connections": 1,
+                "requests": 2,
+                "in_flight": 1,
+                "peak_in_flight": 2,
+                "saturated": 1,
+            },
+        )
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    """Test the circuit breaker state machine"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch(
+            "core.utils.circuit_breaker.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+
+    def _fail(self):
+        self.breaker.before_call()
+        self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker opens at the threshold and fails fast"""
+        self._fail()
+        self.assertEqual(self.breaker.state, "closed")
+        self._fail()
+
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.assertEqual(self.breaker.stats()["rejected_calls"], 1)
+        self.assertEqual(self.breaker.stats()["retry_in"], 10)
+
+    def test_half_open_allows_one_trial(self):
+        """Test that after the reset timeout one trial call decides the state"""
+        self._fail()
+        self._fail()
+        self.now += 10
+
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+
+        self.now += 10
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertEqual(self.breaker.stats()["times_opened"], 2)
+
+
+@override_settings(BUCKET_CALL_DEADLINE=0.05)
+class CallBucketTestCase(SimpleTestCase):
+    """Test deadlines and failure accounting for bucket calls"""
+
+    def setUp(self):
+        bucket.bucket_breaker.reset()
+        self.addCleanup(bucket.bucket_breaker.reset)
+
+    def test_slow_call_hits_deadline(self):
+        """Test that a slow call raises BucketUnavailable and counts as failure"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        with self.assertRaises(bucket.BucketUnavailable):
+            bucket.call_bucket("put_object", release.wait, 5)
+        self.assertEqual(bucket.bucket_breaker.stats()["consecutive_failures"], 1)
+
+    def test_client_errors_do_not_open_breaker(self):
+        """Test that 4xx errors count as a healthy store, 5xx as failures"""
+
+        def error(status, code):
+            return ClientError(
+                {
+                    "Error": {"Code": code},
+                    "ResponseMetadata": {"HTTPStatusCode": status},
+                },
+                "DeleteObject",
+            )
+
+        for _ in range(10):
+            with self.assertRaises(ClientError):
+                bucket.call_bucket(
+                    "delete_object", mock.Mock(side_effect=error(404, "NoSuchKey"))
+                )
+        self.assertEqual(bucket.bucket_breaker.state, "closed")
+
+        for _ in range(5):
+            with self.assertRaises(ClientError):
+                bucket.call_bucket(
+                    "delete_object", mock.Mock(side_effect=error(503, "SlowDown"))
+                )
+        self.assertEqual(bucket.bucket_breaker.state, "open")
+        with self.assertRaises(bucket.BucketUnavailable):
+            bucket.get_cached_presigned_url("recipes/a.jpg")
+
+    def test_listing_failures_open_breaker(self):
+        """Test that each listed page is fetched under the breaker"""
+
+        def paginate(**kwargs):
+            # Like boto3, the request is only sent when a page is read
+            raise ConnectionError("unreachable")
+            yield
+
+        client = mock.Mock()
+        client.get_paginator.return_value.paginate.side_effect = paginate
+
+        with mock.patch("core.utils.bucket.get_bucket", return_value=client):
+            for _ in range(5):
+                with self.assertRaises(ConnectionError):
+                    list(bucket.iter_objects("recipes/"))
+            self.assertEqual(bucket.bucket_breaker.state, "open")
+            with self.assertRaises(bucket.BucketUnavailable):
+                list(bucket.iter_objects("recipes/"))
+
+
+class SeedDbSyntheticTestCase(TestCase):
+    """Test the synthetic mode of the seed_db command"""
+
+    def _seed(self, *args):
+        stdout = io.StringIO()
+        call_command("seed_db", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def _dataset(self):
+        return list(
+            Recipe.objects.order_by("id").values_list(
+                "title", "difficulty", "steps", "owner__username", "image_bucket_key"
+            )
+        )
+
+    @mock.patch("core.management.commands.seed_db.put_object")
+    def test_same_seed_same_dataset(self, put_object):
+        """Test that a seed reproduces owners, recipes and image keys"""
+        args = ("--count", "25", "--owners", "3", "--batch-size", "10")
+        output = self._seed(*args, "--seed", "7", "--image-ratio", "0.5")
+
+        self.assertEqual(Recipe.objects.count(), 25)
+        self.assertEqual(
+            User.objects.filter(username__startswith="seed-user-").count(), 3
+        )
+        self.assertIn("Inserted 10/25", output)
+        self.assertIn("Inserted 25/25", output)
+        self.assertFalse(Recipe.objects.filter(search_vector=None).exists())
+        with_images = Recipe.objects.exclude(image_bucket_key=None)
+        self.assertEqual(put_object.call_count, with_images.count())
+        self.assertTrue(0 < with_images.count() < 25)
+
+        first = self._dataset()
+        with CaptureQueriesContext(connection) as queries:
+            self._seed("--reset", *args, "--seed", "7", "--image-ratio", "0.5")
+        self.assertEqual(self._dataset(), first)
+        # The reset deletes recipes in one statement without loading them
+        deletes = [q for q in queries if q["sql"].startswith('DELETE FROM "recipes')]
+        self.assertEqual(len(deletes), 1)
+
+        # The reseeded images use the queued keys again, so none is deleted
+        self.assertEqual(PendingObjectDeletion.objects.count(), with_images.count())
+        with mock.patch(
+            "core.utils.deletion_queue.delete_objects", return_value={}
+        ) as delete_objects:
+            self.assertEqual(drain_deletion_queue(), (0, 0))
+        delete_objects.assert_not_called()
+        self.assertFalse(PendingObjectDeletion.objects.exists())
+
+        self._seed("--reset", *args, "--seed", "8", "--image-ratio", "0.5")
+        self.assertNotEqual(self._dataset(), first)
+
+    @mock.patch(
+        "core.management.commands.seed_db.put_object",
+        side_effect=ConnectionError("bucket down"),
+    )
+    def test_failed_uploads_leave_no_key(self, put_object):
+        """Test that recipes whose upload failed are left without images"""
+        output = self._seed("--count", "10", "--image-ratio", "1")
+
+        self.assertEqual(put_object.call_count, 10)
+        self.assertFalse(Recipe.objects.exclude(image_bucket_key=None).exists())
+        self.assertIn("10 image uploads failed", output)
+
+    def test_bad_options_keep_existing_data(self):
+        """Test that options are validated before --reset deletes anything"""
+        self._seed("--count", "5")
+
+        for args in (("--count", "-1"), ("--count", "5", "--image-ratio", "2")):
+            with self.assertRaises(CommandError):
+                self._seed("--reset", *args)
+
+        self.assertEqual(Recipe.objects.count(), 5)
+
+    def test_seeding_drops_cached_lists(self):
+        """Test that bulk seeding invalidates the recipe response cache"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        url = reverse("core:recipes:recipe-list")
+        self.assertEqual(self.client.get(url).data["total"], 0)
+
+        self._seed("--count", "5")
+
+        self.assertEqual(self.client.get(url).data["total"], 5)
+
+
+class BenchApiTestCase(TransactionTestCase):
+    """Test the bench_api management command in-process"""
+
+    def setUp(self):
+        owner = User.objects.create_user(username="chef", password="secret-pass")
+        Recipe.objects.bulk_create(
+            Recipe(title=f"Chicken soup {i}", description="Broth.", owner=owner)
+            for i in range(30)
+        )
+
+    def test_reports_every_scenario(self):
+        """Test that each scenario reports latency, throughput and queries"""
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(
+            "bench_api",
+            "--requests",
+            "6",
+            "--warmup",
+            "2",
+            "--concurrency",
+            "2",
+            "--page-sizes",
+            "5,20",
+            "--depth",
+            "2",
+            "--label",
+            "test",
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report["label"], "test")
+        self.assertEqual(report["mode"], "in-process")
+        names = [scenario["name"] for scenario in report["scenarios"]]
+        self.assertEqual(
+            names,
+            [
+                "list?page_size=5",
+                "list?page_size=20",
+                "deep_page?page=3",
+                "deep_cursor?depth=2",
+                "search",
+                "detail",
+                "create",
+                "token_refresh",
+                "presigned_url",
+            ],
+        )
+        for scenario in report["scenarios"]:
+            self.assertEqual(scenario["requests"], 6, scenario["name"])
+            self.assertEqual(scenario["errors"], 0, scenario["name"])
+            latency = scenario["latency_ms"]
+            self.assertLessEqual(latency["p50"], latency["p95"])
+            self.assertLessEqual(latency["p95"], latency["p99"])
+            self.assertGreater(scenario["rps"], 0)
+        detail = report["scenarios"][names.index("detail")]
+        self.assertGreater(detail["queries_per_request"]["max"], 0)
+
+        # Recipes made by the create scenario are removed afterwards, and
+        # so are the bench user's token families
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertFalse(
+            RefreshTokenFamily.objects.filter(
+                user__username=bench_api.BENCH_USERNAME
+            ).exists()
+        )
+
+    @override_settings(ROTATE_REFRESH_TOKENS=True)
+    def test_token_refresh_issues_tokens_before_timing(self):
+        """Test that refresh tokens are issued up front and never reused"""
+        run = bench_api.Command._run
+        issued_at_run = []
+
+        def record_run(command, *args, **kwargs):
+            issued_at_run.append(issue_tokens.call_count)
+            return run(command, *args, **kwargs)
+
+        stdout = io.StringIO()
+        with (
+            mock.patch.object(
+                bench_api, "issue_tokens", wraps=bench_api.issue_tokens
+            ) as issue_tokens,
+            mock.patch.object(bench_api.Command, "_run", record_run),
+        ):
+            call_command(
+                "bench_api",
+                "--scenario",
+                "token_refresh",
+                "--requests",
+                "6",
+                "--warmup",
+                "2",
+                stdout=stdout,
+                stderr=io.StringIO(),
+            )
+
+        # The auth token plus one per warmup and measured request
+        self.assertEqual(issued_at_run, [9, 9])
+        self.assertEqual(issue_tokens.call_count, 9)
+        (scenario,) = json.loads(stdout.getvalue())["scenarios"]
+        self.assertEqual(scenario["status_codes"], {"200": 6})
+
+    def test_each_run_gets_a_fresh_access_token(self):
+        """Test that no access token has to last the whole benchmark"""
+        run = bench_api.Command._run
+        tokens = []
+
+        def record_run(command, transport_factory, make_request, *args, **kwargs):
+            tokens.append(make_request(0)[3]["Authorization"])
+            return run(command, transport_factory, make_request, *args, **kwargs)
+
+        with mock.patch.object(bench_api.Command, "_run", record_run):
+            call_command(
+                "bench_api",
+                "--scenario",
+                "presigned_url",
+                "--scenario",
+                "create",
+                "--requests",
+                "2",
+                "--warmup",
+                "1",
+                stdout=io.StringIO(),
+                stderr=io.StringIO(),
+            )
+
+        self.assertEqual(len(tokens), 4)
+        self.assertEqual(len(set(tokens)), 4)
+
+
+@override_settings(REQUEST_TIMING_HEADER=True)
+class ServerTimingTestCase(APITestCase):
+    """Test the per-request timing middleware"""
+
+    def test_header_and_log_line(self):
+        """Test that each request gets a Server-Timing header and a log line"""
+        with self.assertLogs("core.middleware", "DEBUG") as logs:
+            response = self.client.get(reverse("core:health_check"))
+
+        metrics = [
+            metric.split(";")[0] for metric in response["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(
+            metrics, ["total", "db", "bucket", "serialize", "render", "app"]
+        )
+        self.assertIn('db;dur=0.0;desc="0 queries"', response["Server-Timing"])
+        self.assertIn("method=GET path=/api/v1/health/ status=200", logs.output[0])
+        self.assertIn("render_count=1", logs.output[0])
+
+    def test_nested_time_is_exclusive(self):
+        """Test that time in a nested category isn't counted twice"""
+        clock = iter([0.0, 1.0, 2.0, 5.0, 6.0, 10.0])
+        with mock.patch("core.utils.timing.time.perf_counter", lambda: next(clock)):
+            timings, token = timing.start_request()
+            with timing.track(timing.SERIALIZE):
+                with timing.track(timing.DB):
+                    pass
+            timing.end_request(token)
+
+            self.assertEqual(timings.durations[timing.DB], 3.0)
+            self.assertEqual(timings.durations[timing.SERIALIZE], 2.0)
+            self.assertEqual(timings.total(), 10.0)
+
+    def test_queries_are_counted_in_async_requests(self):
+        """Test that queries run from a thread still count toward the request"""
+
+        async def view(request):
+            await sync_to_async(User.objects.count)()
+            return HttpResponse()
+
+        middleware = ServerTimingMiddleware(view)
+        response = async_to_sync(middleware)(RequestFactory().get("/"))
+
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    @override_settings(REQUEST_TIMING_HEADER=False)
+    def test_header_can_be_disabled(self):
+        """Test that the header can be turned off while still logging"""
+        with self.assertLogs("core.middleware", "DEBUG"):
+            response = self.client.get(reverse("core:health_check"))
+        self.assertNotIn("Server-Timing", response)
+
+
+class ProfilingTestCase(APITestCase):
+    """Test opt-in request profiling"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(
+            PROFILE_DIR=self.directory, PROFILE_SAMPLE_INTERVAL=0.001
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.url = reverse("core:recipes:recipe-list")
+
+    def _dumps(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_not_profiled_by_default(self):
+        """Test that requests without a token aren't profiled"""
+        response = self.client.get(self.url)
+
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(self._dumps(), [])
+
+    def test_signed_header_writes_dumps(self):
+        """Test that a valid token writes pstats and collapsed stacks"""
+        stdout = io.StringIO()
+        call_command("profile_token", stdout=stdout, stderr=io.StringIO())
+        token = stdout.getvalue().strip().split(": ", 1)[1]
+
+        response = self.client.get(self.url, headers={"X-Profile": token})
+
+        profile_id = response["X-Profile-Id"]
+        self.assertIn("GET-RecipesViewSet", profile_id)
+        self.assertEqual(
+            self._dumps(), [f"{profile_id}.collapsed", f"{profile_id}.prof"]
+        )
+        stats = pstats.Stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        self.assertTrue(
+            any(func[2] == "dispatch" for func in stats.stats),
+        )
+        with open(os.path.join(self.directory, f"{profile_id}.collapsed")) as f:
+            for line in f:
+                self.assertRegex(line, r"^\S.*;.* \d+$")
+
+    def test_invalid_token_is_ignored(self):
+        """Test that a forged or tampered token doesn't profile"""
+        with self.assertLogs("core.utils.profiling", "WARNING"):
+            response = self.client.get(self.url, headers={"X-Profile": "forged:abc"})
+
+        self.assertNotIn("X-Profile-Id", response)
+
+    def test_sampling_decision_is_kept(self):
+        """Test that asking twice about one request samples it once"""
+        request = RequestFactory().get(self.url)
+
+        with (
+            override_settings(PROFILE_SAMPLE_RATE=0.5),
+            mock.patch("core.utils.profiling.random.random", side_effect=[0.1, 0.9]),
+        ):
+            self.assertTrue(profiling.should_profile(request))
+            self.assertTrue(profiling.should_profile(request))
+
+    def test_sampling_and_rotation(self):
+        """Test that sampled requests are profiled and old dumps rotated"""
+        with override_settings(PROFILE_SAMPLE_RATE=1.0, PROFILE_MAX_DUMPS=2):
+            ids = [self.client.get(self.url)["X-Profile-Id"] for _ in range(3)]
+
+        remaining = {name.rsplit(".", 1)[0] for name in self._dumps()}
+        self.assertEqual(len(self._dumps()), 4)
+        self.assertEqual(remaining, set(ids[1:]))
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTestCase(APITestCase):
+    """Test the Prometheus middleware and /metrics endpoint"""
+
+    def _sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_recorded(self):
+        """Test that latency, status and queries are recorded per route"""
+        labels = {"method": "GET", "route": "core:health_check"}
+        before = self._sample("tasti_http_requests_total", status="200", **labels)
+        count = self._sample("tasti_http_request_duration_seconds_count", **labels)
+
+        self.client.get(reverse("core:health_check"))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        for name in (
+            "tasti_http_requests_in_flight",
+            "tasti_db_queries_total",
+            "tasti_bucket_call_duration_seconds",
+            "tasti_cache_requests_total",
+        ):
+            self.assertIn(name, body)
+        self.assertEqual(
+            self._sample("tasti_http_requests_total", status="200", **labels),
+            before + 1,
+        )
+        self.assertEqual(
+            self._sample("tasti_http_request_duration_seconds_count", **labels),
+            count + 1,
+        )
+        # Only the scrape itself is in flight while it renders
+        self.assertEqual(self._sample("tasti_http_requests_in_flight"), 0)
+
+    def test_queries_are_counted_per_route(self):
+        """Test that database queries are attributed to the route"""
+
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.resolver_match = mock.Mock(view_name="test:view")
+        before = self._sample("tasti_db_queries_total", route="test:view")
+
+        ServerTimingMiddleware(MetricsMiddleware(view))(request)
+
+        self.assertEqual(
+            self._sample("tasti_db_queries_total", route="test:view"), before + 2
+        )
+
+    def test_cache_hits_and_misses(self):
+        """Test that presigned URL cache lookups are counted"""
+        bucket.presigned_url_cache.clear()
+        hits = self._sample(
+            "tasti_cache_requests_total", cache="presigned_url", result="hit"
+        )
+        misses = self._sample(
+            "tasti_cache_requests_total", cache="presigned_url", result="miss"
+        )
+
+        bucket.get_cached_presigned_url("recipes/metrics.jpg")
+        bucket.get_cached_presigned_url("recipes/metrics.jpg")
+
+        self.assertEqual(
+            self._sample(
+                "tasti_cache_requests_total", cache="presigned_url", result="hit"
+            ),
+            hits + 1,
+        )
+        self.assertEqual(
+            self._sample(
+                "tasti_cache_requests_total", cache="presigned_url", result="miss"
+            ),
+            misses + 1,
+        )
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_by_setting(self):
+        """Test that /metrics is not served when metrics are disabled"""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_token_is_required_when_set(self):
+        """Test that scrapes need the bearer token when one is configured"""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_workers_are_aggregated(self):
+        """Test that multiprocess mode sums samples written by each worker"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        script = (
+            "from core.utils import metrics; "
+            "metrics.REQUESTS.labels('GET', 'core:health_check', '200').inc(3); "
+            "metrics.IN_FLIGHT.inc()"
+        )
+        pids = []
+        for _ in range(2):
+            worker = subprocess.Popen(
+                [sys.executable, "-c", script],
+                cwd=settings.BASE_DIR,
+                env={**os.environ, metrics.MULTIPROC_DIR_ENV: directory},
+            )
+            self.assertEqual(worker.wait(), 0)
+            pids.append(worker.pid)
+
+        def scrape():
+            with mock.patch.dict(os.environ, {metrics.MULTIPROC_DIR_ENV: directory}):
+                body, _ = metrics.render_metrics()
+            return {
+                (sample.name, sample.labels.get("status")): sample.value
+                for family in text_string_to_metric_families(body.decode())
+                for sample in family.samples
+            }
+
+        samples = scrape()
+        self.assertEqual(samples[("tasti_http_requests_total", "200")], 6)
+        self.assertEqual(samples[("tasti_http_requests_in_flight", None)], 2)
+
+        # What gunicorn's child_exit hook does once a worker is gone
+        for pid in pids:
+            multiprocess.mark_process_dead(pid, directory)
+        samples = scrape()
+        self.assertEqual(samples[("tasti_http_requests_total", "200")], 6)
+        self.assertEqual(samples.get(("tasti_http_requests_in_flight", None), 0), 0)
+
+
+class BloomFilterTestCase(SimpleTestCase):
+    """Test the Bloom filter"""
+
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        """Test that added items are always found and few others are"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        added = [uuid.uuid4().hex for _ in range(1000)]
+        for item in added:
+            bloom.add(item)
+
+        self.assertTrue(all(item in bloom for item in added))
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertEqual(len(bloom), 1000)
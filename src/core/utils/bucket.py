@@ -1,27 +1,113 @@
+import hashlib
 import logging
 import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 import boto3
 from botocore.client import Config
+from botocore.exceptions import ClientError
 from django.conf import settings
+from django.core.cache import cache
+
+from core.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.utils.metrics import observe_bucket_call, record_cache
+from core.utils.timing import BUCKET, track
 
 logger = logging.getLogger(__name__)
 
-_bucket = None
+DEFAULT_PRESIGNED_URL_WINDOW = 3600
+DEFAULT_PRESIGNED_URL_CACHE_SIZE = 10000
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_CONNECT_TIMEOUT = 2
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_RETRY_MODE = "standard"
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_TCP_KEEPALIVE = True
+DEFAULT_CALL_DEADLINE = 5
+DEFAULT_BREAKER_FAILURE_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_TIMEOUT = 30
 
+# S3 DeleteObjects accepts at most 1000 keys per call
+DELETE_OBJECTS_BATCH_SIZE = 1000
 
-def get_bucket():
-    global _bucket
-    if _bucket is None:
+
+class BucketClientManager:
+    """
+    Owns the process-wide S3 client.
+
+    The client is created once under a lock (and again after a fork, so
+    workers never share sockets with the parent). Connection pool size,
+    timeouts, retries and TCP keep-alive come from settings. botocore clients
+    are thread-safe, so every thread shares the one client and its pool.
+
+    `stats()` reports requests in flight against the pool size; `saturated`
+    counts requests sent while every pooled connection was already busy,
+    i.e. requests that had to wait for or open an extra connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self._stats_lock = threading.Lock()
+        self._max_pool_connections = 0
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._requests = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._saturated = 0
+
+    def get_client(self):
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                self._client = self._create_client()
+                self._pid = os.getpid()
+            return self._client
+
+    def reset(self):
+        """Drop the client; the next `get_client` call builds a new one"""
+        with self._lock:
+            self._client = None
+            self._pid = None
+        with self._stats_lock:
+            self._reset_stats()
+
+    def _create_client(self):
+        self._max_pool_connections = getattr(
+            settings, "AWS_S3_MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS
+        )
         config = Config(
             signature_version="s3v4",
             s3={"addressing_style": "path"},
+            max_pool_connections=self._max_pool_connections,
+            connect_timeout=getattr(
+                settings, "AWS_S3_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT
+            ),
+            read_timeout=getattr(settings, "AWS_S3_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+            retries={
+                "mode": getattr(settings, "AWS_S3_RETRY_MODE", DEFAULT_RETRY_MODE),
+                "total_max_attempts": getattr(
+                    settings, "AWS_S3_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS
+                ),
+            },
+            tcp_keepalive=getattr(
+                settings, "AWS_S3_TCP_KEEPALIVE", DEFAULT_TCP_KEEPALIVE
+            ),
         )
 
         endpoint_url = getattr(settings, "AWS_S3_ENDPOINT_URL", None)
 
-        _bucket = boto3.client(
+        client = boto3.client(
             "s3",
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
@@ -29,32 +115,323 @@ def get_bucket():
             endpoint_url=endpoint_url,
             config=config,
         )
-    return _bucket
+        client.meta.events.register("before-send.s3", self._on_send)
+        client.meta.events.register("response-received.s3", self._on_response)
+        return client
+
+    def _on_send(self, **kwargs):
+        with self._stats_lock:
+            if self._in_flight >= self._max_pool_connections:
+                self._saturated += 1
+            self._requests += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def _on_response(self, **kwargs):
+        with self._stats_lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+
+    def stats(self):
+        """Snapshot of the connection pool usage counters"""
+        with self._stats_lock:
+            return {
+                "max_pool_connections": self._max_pool_connections,
+                "requests": self._requests,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "saturated": self._saturated,
+            }
+
+
+client_manager = BucketClientManager()
+
+
+def get_bucket():
+    return client_manager.get_client()
+
+
+class BucketUnavailable(Exception):
+    """The bucket is failing or too slow; callers should degrade, not wait"""
+
+
+# Per process, and only fed by calls that reach the network (uploads,
+# deletes, listings). Web workers sign URLs locally, so there it stays
+# closed unless an upload or delete runs in the same process.
+bucket_breaker = CircuitBreaker(
+    "bucket",
+    failure_threshold=getattr(
+        settings, "BUCKET_BREAKER_FAILURE_THRESHOLD", DEFAULT_BREAKER_FAILURE_THRESHOLD
+    ),
+    reset_timeout=getattr(
+        settings, "BUCKET_BREAKER_RESET_TIMEOUT", DEFAULT_BREAKER_RESET_TIMEOUT
+    ),
+)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Error codes that mean the store is overloaded rather than the request wrong
+_THROTTLING_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestTimeout"}
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(
+                    settings,
+                    "AWS_S3_MAX_POOL_CONNECTIONS",
+                    DEFAULT_MAX_POOL_CONNECTIONS,
+                ),
+                thread_name_prefix="bucket",
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _is_outage(error):
+    """Whether an error means the store is unhealthy, not that the call was bad"""
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in _THROTTLING_CODES or status >= 500
+    return True
+
+
+def call_bucket(operation, func, *args, **kwargs):
+    """
+    Run a blocking bucket call under the circuit breaker and a deadline.
+
+    The caller stops waiting after `BUCKET_CALL_DEADLINE` seconds; the call
+    itself is still bounded by the client's connect and read timeouts.
+    Raises `BucketUnavailable` when the breaker is open or time runs out.
+    """
+    with track(BUCKET), observe_bucket_call(operation):
+        return _call_bucket(operation, func, *args, **kwargs)
+
+
+def _call_bucket(operation, func, *args, **kwargs):
+    timeout = getattr(settings, "BUCKET_CALL_DEADLINE", DEFAULT_CALL_DEADLINE)
+    try:
+        bucket_breaker.before_call()
+    except CircuitOpenError as e:
+        raise BucketUnavailable(str(e)) from e
+
+    try:
+        future = _get_executor().submit(func, *args, **kwargs)
+        result = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        bucket_breaker.record_failure()
+        raise BucketUnavailable(f"{operation} exceeded its {timeout:.2f}s deadline")
+    except Exception as e:
+        if _is_outage(e):
+            bucket_breaker.record_failure()
+        else:
+            # The store answered, so it is healthy even if the call failed
+            bucket_breaker.record_success()
+        raise
+    bucket_breaker.record_success()
+    return result
+
+
+def bucket_status():
+    """Breaker state and connection pool usage, for health checks and metrics"""
+    return {"breaker": bucket_breaker.stats(), "pool": client_manager.stats()}
+
+
+PRESIGNED_URL_METHODS = {
+    "GET": "get_object",
+    "PUT": "put_object",
+    "DELETE": "delete_object",
+}
 
 
 def get_presigned_url(key, method, expiration=3600):
-    url_method = {"GET": "get_object", "PUT": "put_object", "DELETE": "delete_object"}.get(
-        method.upper()
-    )
+    url_method = PRESIGNED_URL_METHODS.get(method.upper())
 
     if not url_method:
         return None
 
+    # Signing is local, but a URL pointing at an unhealthy store is useless
+    if bucket_breaker.is_open():
+        raise BucketUnavailable("bucket circuit breaker is open")
+
     bucket = get_bucket()
     bucket_name = getattr(settings, "AWS_STORAGE_BUCKET_NAME", "default")
 
     try:
-        url = bucket.generate_presigned_url(
-            ClientMethod=url_method,
-            Params={"Bucket": bucket_name, "Key": key},
-            ExpiresIn=expiration,
-        )
+        with track(BUCKET), observe_bucket_call("generate_presigned_url"):
+            url = bucket.generate_presigned_url(
+                ClientMethod=url_method,
+                Params={"Bucket": bucket_name, "Key": key},
+                ExpiresIn=expiration,
+            )
         return url
     except Exception as e:
         logger.error(f"Error generating presigned URL: {e}")
         raise
 
 
+def get_presigned_urls(requests):
+    """
+    Sign a batch of (key, method, expiration) requests.
+
+    The breaker is checked and the client and bucket name looked up once for
+    the whole batch. Returns a (url, error) pair per request, in order, so a
+    request that fails to sign doesn't fail the others.
+    """
+    if bucket_breaker.is_open():
+        raise BucketUnavailable("bucket circuit breaker is open")
+
+    bucket = get_bucket()
+    bucket_name = getattr(settings, "AWS_STORAGE_BUCKET_NAME", "default")
+
+    results = []
+    for key, method, expiration in requests:
+        url_method = PRESIGNED_URL_METHODS.get(method.upper())
+        if not url_method:
+            results.append((None, ValueError(f"Unsupported method: {method}")))
+            continue
+        try:
+            with track(BUCKET), observe_bucket_call("generate_presigned_url"):
+                url = bucket.generate_presigned_url(
+                    ClientMethod=url_method,
+                    Params={"Bucket": bucket_name, "Key": key},
+                    ExpiresIn=expiration,
+                )
+        except Exception as e:
+            logger.error(f"Error generating presigned URL for {key}: {e}")
+            results.append((None, e))
+            continue
+        results.append((url, None))
+    return results
+
+
+class PresignedUrlCache:
+    """Thread-safe LRU of presigned URLs with a bounded number of entries"""
+
+    def __init__(self, maxsize=DEFAULT_PRESIGNED_URL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self._lock:
+            url = self._urls.get(cache_key)
+            if url is not None:
+                self._urls.move_to_end(cache_key)
+            return url
+
+    def set(self, cache_key, url):
+        with self._lock:
+            self._urls[cache_key] = url
+            self._urls.move_to_end(cache_key)
+            while len(self._urls) > self.maxsize:
+                self._urls.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+
+    def __len__(self):
+        return len(self._urls)
+
+
+presigned_url_cache = PresignedUrlCache(
+    getattr(settings, "PRESIGNED_URL_CACHE_SIZE", DEFAULT_PRESIGNED_URL_CACHE_SIZE)
+)
+
+
+def get_presigned_url_window(now=None):
+    """Return the (start, end) epoch seconds of the current signing window"""
+    if now is None:
+        now = time.time()
+    window = getattr(settings, "PRESIGNED_URL_WINDOW", DEFAULT_PRESIGNED_URL_WINDOW)
+    start = int(now // window * window)
+    return start, start + window
+
+
+def _shared_url_key(key, expiration, window_start):
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return f"bucket:presigned:{digest}:{expiration}:{window_start}"
+
+
+def get_cached_presigned_url(key, expiration=3600):
+    """
+    Return a presigned GET URL for `key`, signed at most once per window.
+
+    Everyone asking for the same key within a window gets the same URL, so
+    browsers and CDNs can cache the image. The first URL signed in a window
+    is kept in the shared Django cache until the window closes, so every
+    worker serves that one URL; this process also keeps it in
+    `presigned_url_cache`. It stays valid for `expiration` seconds after
+    the window closes, so it never expires sooner than an uncached one would.
+    """
+    if bucket_breaker.is_open():
+        raise BucketUnavailable("bucket circuit breaker is open")
+
+    now = time.time()
+    window_start, window_end = get_presigned_url_window(now)
+    cache_key = (key, expiration, window_start)
+
+    url = presigned_url_cache.get(cache_key)
+    record_cache("presigned_url", url is not None)
+    if url is None:
+        shared_key = _shared_url_key(key, expiration, window_start)
+        url = cache.get(shared_key)
+        if url is None:
+            signed = get_presigned_url(
+                key, "GET", expiration=int(window_end - now) + expiration
+            )
+            # Another worker may have signed first; keep whichever URL won
+            timeout = max(int(window_end - now), 1)
+            cache.add(shared_key, signed, timeout)
+            url = cache.get(shared_key) or signed
+        presigned_url_cache.set(cache_key, url)
+    return url
+
+
+async def aprefetch_presigned_urls(keys, expiration=3600):
+    """
+    Load the URLs `get_cached_presigned_url` would return for `keys` into
+    `presigned_url_cache`, using the async cache API. Async views call this
+    before serializing, so serialization finds every URL in this process
+    and never makes a blocking cache call on the event loop.
+    """
+    if bucket_breaker.is_open():
+        return
+
+    now = time.time()
+    window_start, window_end = get_presigned_url_window(now)
+    wanted = {}
+    for key in set(filter(None, keys)):
+        if presigned_url_cache.get((key, expiration, window_start)) is None:
+            wanted[_shared_url_key(key, expiration, window_start)] = key
+    if not wanted:
+        return
+
+    urls = await cache.aget_many(wanted)
+    unsigned = [shared_key for shared_key in wanted if shared_key not in urls]
+    if unsigned:
+        signed = get_presigned_urls(
+            [
+                (wanted[shared_key], "GET", int(window_end - now) + expiration)
+                for shared_key in unsigned
+            ]
+        )
+        timeout = max(int(window_end - now), 1)
+        for shared_key, (url, _) in zip(unsigned, signed):
+            if url is not None:
+                await cache.aadd(shared_key, url, timeout)
+        # Another worker may have signed first; keep whichever URL won
+        urls.update(await cache.aget_many(unsigned))
+
+    for shared_key, url in urls.items():
+        presigned_url_cache.set((wanted[shared_key], expiration, window_start), url)
+
+
 def put_object(key, data, content_type=None):
     """Upload an object to the bucket"""
     bucket = get_bucket()
@@ -63,7 +440,7 @@ def put_object(key, data, content_type=None):
         params = {"Bucket": bucket_name, "Key": key, "Body": data}
         if content_type:
             params["ContentType"] = content_type
-        bucket.put_object(**params)
+        call_bucket("put_object", bucket.put_object, **params)
     except Exception as e:
         logger.error(f"Error uploading object {key}: {e}")
         raise
@@ -80,7 +457,67 @@ def delete_object(key):
     bucket = get_bucket()
     bucket_name = getattr(settings, "AWS_STORAGE_BUCKET_NAME", "default")
     try:
-        bucket.delete_object(Bucket=bucket_name, Key=key)
+        call_bucket("delete_object", bucket.delete_object, Bucket=bucket_name, Key=key)
     except Exception as e:
         logger.error(f"Error deleting object {key}: {e}")
         raise
+
+
+def delete_objects(keys):
+    """
+    Delete objects in batches of up to 1000 keys per DeleteObjects call.
+
+    Returns a dict of key -> error message for keys that couldn't be deleted.
+    """
+    bucket = get_bucket()
+    bucket_name = getattr(settings, "AWS_STORAGE_BUCKET_NAME", "default")
+    keys = list(keys)
+    errors = {}
+    for start in range(0, len(keys), DELETE_OBJECTS_BATCH_SIZE):
+        batch = keys[start : start + DELETE_OBJECTS_BATCH_SIZE]
+        try:
+            response = call_bucket(
+                "delete_objects",
+                bucket.delete_objects,
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+        except Exception as e:
+            logger.error(f"Error deleting {len(batch)} objects: {e}")
+            errors.update((key, str(e)) for key in batch)
+            continue
+        for error in response.get("Errors", []):
+            errors[error["Key"]] = f"{error.get('Code')}: {error.get('Message')}"
+    return errors
+
+
+def _list_pages(prefix, page_size=1000, delimiter=None):
+    bucket = get_bucket()
+    bucket_name = getattr(settings, "AWS_STORAGE_BUCKET_NAME", "default")
+    paginator = bucket.get_paginator("list_objects_v2")
+    kwargs = {"Bucket": bucket_name, "Prefix": prefix}
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+    pages = iter(paginator.paginate(**kwargs, PaginationConfig={"PageSize": page_size}))
+    # Each page is one ListObjectsV2 request, fetched under the breaker
+    while (page := call_bucket("list_objects_v2", next, pages, None)) is not None:
+        yield page
+
+
+def iter_objects(prefix="", page_size=1000, delimiter=None):
+    """
+    Stream object summaries under `prefix`, following continuation tokens.
+
+    With a `delimiter`, only objects directly under `prefix` are returned.
+    """
+    for page in _list_pages(prefix, page_size, delimiter):
+        yield from page.get("Contents", [])
+
+
+def list_common_prefixes(prefix="", delimiter="/"):
+    """Return the key prefixes one `delimiter` level below `prefix`"""
+    return [
+        common["Prefix"]
+        for page in _list_pages(prefix, delimiter=delimiter)
+        for common in page.get("CommonPrefixes", [])
+    ]
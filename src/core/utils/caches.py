@@ -0,0 +1,21 @@
+"""
+Whether a Django cache is shared between server processes.
+
+The response cache, presigned URL sharing and user change stamps all rely
+on every worker seeing the same cache. Local memory (the default when
+`REDIS_URL` is unset) is private to one process, so with several workers
+each one keeps its own copy and misses the others' invalidations.
+"""
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+PROCESS_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """Whether every server process sees the same entries in this cache"""
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_BACKENDS
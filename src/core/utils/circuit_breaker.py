@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    calls fail fast with `CircuitOpenError`. Once `reset_timeout` seconds
+    have passed, a single trial call is let through (half-open): success
+    closes the breaker, failure opens it again for another `reset_timeout`.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._rejected = 0
+        self._times_opened = 0
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= (
+            self.reset_timeout
+        ):
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def is_open(self):
+        """Whether calls are currently being rejected (no trial call taken)"""
+        return self.state == OPEN
+
+    def before_call(self):
+        """Reserve a call, raising `CircuitOpenError` if it must fail fast"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._state = HALF_OPEN
+                self._trial_in_flight = True
+                return
+            self._rejected += 1
+        raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.warning(f"{self.name} circuit breaker closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._times_opened += 1
+                    logger.error(
+                        f"{self.name} circuit breaker opened after "
+                        f"{self._failures} consecutive failures"
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+            self._rejected = 0
+            self._times_opened = 0
+
+    def stats(self):
+        """Snapshot of the breaker state for health checks and metrics"""
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                retry_in = round(max(self.reset_timeout - elapsed, 0), 3)
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected,
+                "retry_in": retry_in,
+            }
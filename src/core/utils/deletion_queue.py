@@ -0,0 +1,108 @@
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import PendingObjectDeletion
+from core.utils.bucket import DELETE_OBJECTS_BATCH_SIZE, delete_objects
+
+logger = logging.getLogger(__name__)
+
+# How long a drainer may hold a batch before others can take it over
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def enqueue_object_deletion(*keys):
+    """
+    Queue bucket keys for deletion.
+
+    The queue is a table in the same database, so the entry commits or rolls
+    back together with the change that orphaned the object. Keys already
+    queued are ignored.
+    """
+    keys = [key for key in keys if key]
+    if keys:
+        PendingObjectDeletion.objects.bulk_create(
+            [PendingObjectDeletion(key=key) for key in keys],
+            ignore_conflicts=True,
+        )
+
+
+def _claim_batch(batch_size, exclude):
+    """Claim up to `batch_size` queued rows and commit, so no lock is held"""
+    now = timezone.now()
+    with transaction.atomic():
+        pending = list(
+            PendingObjectDeletion.objects.select_for_update(skip_locked=True)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .exclude(pk__in=exclude)
+            .order_by("attempts", "created_at", "id")
+            .values_list("id", "key")[:batch_size]
+        )
+        PendingObjectDeletion.objects.filter(pk__in=[pk for pk, _ in pending]).update(
+            claimed_until=now + CLAIM_TIMEOUT
+        )
+    return pending
+
+
+def _referenced_keys(keys):
+    """The keys a recipe points at again, e.g. after an image was restored"""
+    # Resolved lazily: the recipes models import this module
+    Recipe = apps.get_model("recipes", "Recipe")
+    return set(
+        Recipe.objects.filter(image_bucket_key__in=keys).values_list(
+            "image_bucket_key", flat=True
+        )
+    )
+
+
+def drain_deletion_queue(batch_size=DELETE_OBJECTS_BATCH_SIZE, max_batches=None):
+    """
+    Delete queued objects in DeleteObjects batches, oldest first.
+
+    Each batch is claimed in a short transaction before the bucket is
+    called, so several drainers can run at once without holding row locks
+    during network calls. A claim left by a crashed drainer expires after
+    `CLAIM_TIMEOUT`. Keys a recipe references again are dropped from the
+    queue without being deleted. Deleted keys leave the queue; failures
+    stay queued with their error and are not retried until the next drain.
+    Stops early when a whole batch fails (e.g. the bucket is unreachable).
+    Returns (deleted, failed) counts.
+    """
+    deleted = failed = batches = 0
+    failed_ids = []
+    while max_batches is None or batches < max_batches:
+        pending = _claim_batch(batch_size, failed_ids)
+        if not pending:
+            break
+
+        referenced = _referenced_keys([key for _, key in pending])
+        orphaned = [(pk, key) for pk, key in pending if key not in referenced]
+        errors = delete_objects(key for _, key in orphaned) if orphaned else {}
+        done = [pk for pk, key in orphaned if key not in errors]
+        released = [pk for pk, key in pending if key in referenced]
+        with transaction.atomic():
+            PendingObjectDeletion.objects.filter(pk__in=done + released).delete()
+            for pk, key in pending:
+                if key in errors:
+                    failed_ids.append(pk)
+                    PendingObjectDeletion.objects.filter(pk=pk).update(
+                        attempts=F("attempts") + 1,
+                        last_error=errors[key],
+                        claimed_until=None,
+                    )
+
+        deleted += len(done)
+        failed += len(errors)
+        batches += 1
+        if released:
+            logger.info(f"Kept {len(released)} queued objects still in use")
+        if errors:
+            logger.warning(f"Failed to delete {len(errors)} queued objects")
+            if not done:
+                break
+
+    return deleted, failed
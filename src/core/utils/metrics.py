@@ -0,0 +1,108 @@
+"""
+Prometheus metrics.
+
+Under gunicorn, set `PROMETHEUS_MULTIPROC_DIR` (`config/gunicorn.py` does)
+before the app is imported: every worker then writes its samples to files in
+that directory and `/metrics` adds them up across workers, so any worker
+can answer a scrape.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+REQUEST_SECONDS = Histogram(
+    "tasti_http_request_duration_seconds",
+    "Request latency by route",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    "tasti_http_requests",
+    "Responses by route and status code",
+    ["method", "route", "status"],
+)
+IN_FLIGHT = Gauge(
+    "tasti_http_requests_in_flight",
+    "Requests being handled",
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter(
+    "tasti_db_queries",
+    "Database queries run by requests, by route",
+    ["route"],
+)
+DB_SECONDS = Counter(
+    "tasti_db_query_seconds",
+    "Time requests spent in database queries, by route",
+    ["route"],
+)
+BUCKET_CALL_SECONDS = Histogram(
+    "tasti_bucket_call_duration_seconds",
+    "Latency of bucket calls and URL signing",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+BUCKET_CALL_ERRORS = Counter(
+    "tasti_bucket_call_errors",
+    "Failed bucket calls by operation and error type",
+    ["operation", "error"],
+)
+CACHE_REQUESTS = Counter(
+    "tasti_cache_requests",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+
+
+def route_name(request):
+    """Bounded route label: the URL name, or "unmatched" for 404s"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route
+
+
+def method_name(request):
+    return request.method if request.method in HTTP_METHODS else "other"
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+@contextmanager
+def observe_bucket_call(operation):
+    """Record the latency of a bucket operation, and its error type if any"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        BUCKET_CALL_ERRORS.labels(operation, type(e).__name__).inc()
+        raise
+    finally:
+        BUCKET_CALL_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+
+def render_metrics():
+    """Return (body, content type) for a scrape, merging worker files if any"""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
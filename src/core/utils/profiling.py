@@ -0,0 +1,194 @@
+"""
+Opt-in request profiling.
+
+A request is profiled when it carries a valid signed `X-Profile` header
+(see the `profile_token` command) or is picked by `PROFILE_SAMPLE_RATE`.
+While it runs, cProfile records the call graph and a sampler thread
+records the request thread's stack every `PROFILE_SAMPLE_INTERVAL`
+seconds. Each profile is written to `PROFILE_DIR` as a `.prof` file
+(load with `pstats` or snakeviz) and a `.collapsed` file of stack counts
+(feed to flamegraph.pl or speedscope). Only the newest `PROFILE_MAX_DUMPS`
+profiles are kept, and only one request per process is profiled at a time.
+"""
+
+import cProfile
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+TOKEN_SALT = "core.profiling"
+DEFAULT_PROFILE_SAMPLE_RATE = 0.0
+DEFAULT_PROFILE_TOKEN_MAX_AGE = 3600
+DEFAULT_PROFILE_SAMPLE_INTERVAL = 0.005
+DEFAULT_PROFILE_MAX_DUMPS = 50
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "tasti-profiles")
+
+# cProfile can't run for two requests at once (and on 3.12+ not at all
+# alongside another profiler), so a busy profiler skips the request
+_active = threading.Lock()
+
+
+def make_profile_token():
+    """Signed value for the `X-Profile` header, valid for PROFILE_TOKEN_MAX_AGE"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(uuid.uuid4().hex)
+
+
+def _has_valid_token(request):
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return False
+    max_age = getattr(settings, "PROFILE_TOKEN_MAX_AGE", DEFAULT_PROFILE_TOKEN_MAX_AGE)
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age)
+    except signing.BadSignature:
+        logger.warning("Ignoring invalid or expired profiling token")
+        return False
+    return True
+
+
+def should_profile(request):
+    """
+    Whether to profile this request; cheap when profiling is off. The
+    answer is kept on the request, so asking again doesn't sample again.
+    """
+    decision = getattr(request, "_should_profile", None)
+    if decision is None:
+        rate = getattr(settings, "PROFILE_SAMPLE_RATE", DEFAULT_PROFILE_SAMPLE_RATE)
+        decision = bool(rate and random.random() < rate) or (
+            "HTTP_X_PROFILE" in request.META and _has_valid_token(request)
+        )
+        request._should_profile = decision
+    return decision
+
+
+def _frame_name(code):
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class StackSampler(threading.Thread):
+    """Count the stacks one thread is in, sampled at a fixed interval"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        """Stacks in the collapsed format: `root;...;leaf count` per line"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class RequestProfile:
+    """cProfile and a stack sampler running for one request"""
+
+    def __init__(self):
+        interval = getattr(
+            settings, "PROFILE_SAMPLE_INTERVAL", DEFAULT_PROFILE_SAMPLE_INTERVAL
+        )
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), interval)
+        self.started = time.perf_counter()
+
+    def start(self):
+        self.sampler.start()
+        self.profiler.enable()
+
+    def stop(self, label):
+        """Stop profiling, write the dumps and return the profile id"""
+        self.profiler.disable()
+        self.sampler.stop()
+        elapsed = (time.perf_counter() - self.started) * 1000
+        profile_id = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{label}-{elapsed:.0f}ms-"
+            f"{uuid.uuid4().hex[:8]}"
+        )
+        directory = getattr(settings, "PROFILE_DIR", DEFAULT_PROFILE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, profile_id)
+        self.profiler.dump_stats(f"{base}.prof")
+        with open(f"{base}.collapsed", "w") as f:
+            f.write(self.sampler.collapsed())
+        rotate_dumps(directory)
+        return profile_id
+
+
+def rotate_dumps(directory):
+    """Delete the oldest profiles beyond PROFILE_MAX_DUMPS"""
+    keep = getattr(settings, "PROFILE_MAX_DUMPS", DEFAULT_PROFILE_MAX_DUMPS)
+    dumps = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".prof"):
+                dumps.append((entry.stat().st_mtime_ns, entry.name[: -len(".prof")]))
+    dumps.sort(reverse=True)
+    for _, name in dumps[keep:]:
+        for suffix in (".prof", ".collapsed"):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+class ProfiledViewMixin:
+    """Profile `dispatch` for requests picked by `should_profile()`"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not should_profile(request) or not _active.acquire(blocking=False):
+            return super().dispatch(request, *args, **kwargs)
+
+        try:
+            profile = RequestProfile()
+            try:
+                profile.start()
+            except ValueError as e:
+                # Another profiler is active in this process
+                profile.sampler.stop()
+                logger.warning(f"Skipping profile: {e}")
+                return super().dispatch(request, *args, **kwargs)
+            try:
+                response = super().dispatch(request, *args, **kwargs)
+            finally:
+                label = f"{request.method}-{type(self).__name__}"
+                try:
+                    profile_id = profile.stop(label)
+                except OSError as e:
+                    logger.error(f"Error writing profile: {e}")
+                    profile_id = None
+        finally:
+            _active.release()
+
+        if profile_id:
+            response[PROFILE_ID_HEADER] = profile_id
+            logger.info(f"Wrote profile {profile_id}")
+        return response
@@ -0,0 +1,111 @@
+"""
+Per-request time accounting for the Server-Timing middleware.
+
+`ServerTimingMiddleware` starts a `RequestTimings` for each request and
+the code that talks to Postgres or the bucket, serializes or renders marks
+its work with `track()`. Times are exclusive: a query run while serializing
+counts as `db`, not `serialize`, so the categories never add up to more
+than the request's wall time. Outside a timed request `track()` is a no-op.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+from rest_framework import serializers
+
+DB = "db"
+BUCKET = "bucket"
+SERIALIZE = "serialize"
+RENDER = "render"
+CATEGORIES = (DB, BUCKET, SERIALIZE, RENDER)
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Wall time, call count and exclusive time per category for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys(CATEGORIES, 0.0)
+        self.counts = dict.fromkeys(CATEGORIES, 0)
+        # [category, start, time spent in nested categories]
+        self._stack = []
+
+    def enter(self, category):
+        self._stack.append([category, time.perf_counter(), 0.0])
+
+    def exit(self):
+        category, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.durations[category] += elapsed - nested
+        self.counts[category] += 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def start_request():
+    """Start timing the current request; pass the token to `end_request`"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_timings():
+    """The `RequestTimings` of the request being handled, if any"""
+    return _current.get()
+
+
+@contextmanager
+def track(category):
+    """Count the enclosed block toward `category` for the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    timings.enter(category)
+    try:
+        yield
+    finally:
+        timings.exit()
+
+
+def record_query(execute, sql, params, many, context):
+    """`execute_wrapper` installed on every connection by `CoreConfig`"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    # Runs for every query, so skip the contextmanager overhead of track()
+    timings.enter(DB)
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.exit()
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """List serializer whose `.data` counts as serialization time"""
+
+    @property
+    def data(self):
+        with track(SERIALIZE):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """
+    Count `.data` as serialization time. Pair with
+    `Meta.list_serializer_class = TimedListSerializer` for `many=True`.
+    """
+
+    @property
+    def data(self):
+        with track(SERIALIZE):
+            return super().data
@@ -1,10 +1,43 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotFound
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from core.middleware import DEFAULT_METRICS_ENABLED
+from core.utils.bucket import bucket_status
+from core.utils.circuit_breaker import OPEN
+from core.utils.metrics import render_metrics
+
 
 @api_view(["GET"])
 def health_check(request):
     """Simple health check endpoint"""
+    bucket = bucket_status()
     return Response(
-        {"status": "healthy", "message": "Tasti API is running!", "version": "1.0.0"}
+        {
+            "status": "degraded" if bucket["breaker"]["state"] == OPEN else "healthy",
+            "message": "Tasti API is running!",
+            "version": "1.0.0",
+            "bucket": bucket,
+        }
     )
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint, 404 unless METRICS_ENABLED. When
+    METRICS_TOKEN is set, scrapers must send it as
+    `Authorization: Bearer <token>`.
+    """
+    if not getattr(settings, "METRICS_ENABLED", DEFAULT_METRICS_ENABLED):
+        return HttpResponseNotFound()
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        expected = f"Bearer {token}"
+        received = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(received.encode(), expected.encode()):
+            return HttpResponse(status=401)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)